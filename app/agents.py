@@ -2,12 +2,21 @@
 from __future__ import annotations
 
 import asyncio
-from typing import List, Sequence
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
 
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
 
+from app.cal_client import BookingResult
 from app.tools import CancelBookingTool, ListBookingsTool, RescheduleBookingTool
-from app.utils import all_errors, extract_tool_name, prune_history, rewrite_times_for_human
+from app.utils import (
+    DEFAULT_TZ_NAME,
+    all_errors,
+    extract_tool_name,
+    prune_history,
+    rewrite_times_for_human,
+)
 
 
 from langchain_core.messages import (
@@ -17,15 +26,75 @@ from langchain_core.messages import (
     ToolMessage,
 )
 
-from langchain.tools.base import BaseTool
+from langchain_core.tools import BaseTool
 
+from . import jsonio
+from .arg_validation import ToolArgumentError, normalize_args
+from .conversation_state import ConversationState
+from .inflight import InFlightTracker
+from .model_router import ModelRouter, ModelTier
+from .profiling import span
 from .prompt_builder import PromptBuilder
+from .reply_templates import render_reply
+from .response_cache import CacheProbe, ResponseCache
 from .response_parser import ResponseParser
 import sys
 import asyncio
 from app.utils import to_openai_function_dict
 
 
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+BOOKING_INTENT_RE = re.compile(
+    r"\b(cancel\w*|resched\w*|move|list|show|upcoming|meetings?|bookings?|scheduled)\b",
+    re.IGNORECASE,
+)
+
+# tools that leave bookings as they are; any other call outdates a prefetch
+READ_ONLY_TOOLS = frozenset({"list_bookings", "get_booking_details", "find_free_slots"})
+
+# receives progress events while a turn runs (see ``AIAgent.reply``)
+EventSink = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class _Prefetch:
+    """A speculative ``list_bookings`` lookup started next to the first LLM call."""
+
+    email: str
+    tool: ListBookingsTool
+    task: "asyncio.Task[BookingResult]"
+    # set once the turn changed a booking: the result predates the change
+    stale: bool = False
+
+    def serves(self, name: str, args: dict) -> bool:
+        return (
+            not self.stale
+            and name == self.tool.name
+            and str(args.get("attendeeEmail", "")).lower() == self.email
+            and args.get("status") in (None, "", "upcoming")
+        )
+
+    async def answer(self, args: dict) -> Optional[dict]:
+        """Tool output built from the prefetched result, or None to fall back."""
+        try:
+            result = await self.task
+            if not result.ok:
+                return None
+            return await self.tool.summarize(
+                result,
+                after_start=args.get("afterStart"),
+                before_end=args.get("beforeEnd"),
+                limit=int(args.get("limit", 10)),
+                offset=int(args.get("offset", 0)),
+            )
+        except Exception:  # noqa: BLE001 – just do the real call instead
+            return None
+
+
+async def _resolved(message: ToolMessage) -> ToolMessage:
+    return message
+
+
 class AIAgent:
     """
     Conversation orchestrator.
@@ -33,32 +102,74 @@ class AIAgent:
     Responsibilities
     ----------------
     1. Build prompt  (history + user turn)               -> PromptBuilder
-    2. Call LLM with tool schema(s) attached             -> ChatOpenAI
+    2. Call LLM with tool schema(s) attached             -> ModelRouter tier
     3. Detect function / tool calls in the LLM reply
     4. Execute those tool calls (in parallel if possible)
     5. Feed tool results back to the LLM, repeat loop
     6. Return final natural-language answer
+
+    If a ``ResponseCache`` is given, turns that the LLM answered without any
+    tool call are cached and served without an LLM round trip next time.
+    Turns that look like booking work (``BOOKING_INTENT_RE``) skip the cache
+    – they end in a tool call anyway – and so does their embedding lookup.
+    Stateless general questions are shared per ``tenant``, date and time
+    zone; turns with history or slots only by the same caller with the same
+    ``ConversationState``.
+
+    With ``prefetch=True`` a turn that names an e-mail and talks about
+    listing / cancelling / rescheduling starts ``list_bookings`` for that
+    e-mail concurrently with the first LLM call; a matching tool call is
+    then answered from that result, until a call in the turn changes
+    bookings.
+
+    With ``template_replies=True`` a loop whose tool calls are all
+    successful mutations (create / cancel / reschedule) ends with a reply
+    rendered from the results instead of one more LLM call.
+
+    With a ``ConversationState``, every tool call is folded into it and the
+    prompt carries it instead of most of the raw history.
+
+    With an ``on_event`` sink, ``reply`` streams the LLM output and reports
+    tool activity as it happens (used by the WebSocket transport).
     """
 
     def __init__(
         self,
-        llm: ChatOpenAI,
+        llm: BaseChatModel | ModelRouter,
         builder: PromptBuilder,
         parser: ResponseParser,
         tools: Sequence[BaseTool] | None = None,
         max_loops: int = 3,
+        cache: ResponseCache | None = None,
+        inflight: InFlightTracker | None = None,
+        prefetch: bool = False,
+        template_replies: bool = False,
+        tenant: str | None = None,
     ) -> None:
-        self._llm = llm
+        # a bare model is a single-tier router
+        self._router = llm if isinstance(llm, ModelRouter) else ModelRouter.single(llm)
         self._builder = builder
         self._parser = parser
         self._tool_map: dict[str, BaseTool] = {t.name: t for t in tools or []}
         self._max_loops = max_loops
+        self._cache = cache
+        self._inflight = inflight
+        self._prefetch = prefetch
+        self._template_replies = template_replies
+        self._tenant = tenant
 
     # --------------------------------------------------------------------- #
     # public API
     # --------------------------------------------------------------------- #
     async def reply(
-        self, user_msg: str, history: List[BaseMessage] | None = None
+        self,
+        user_msg: str,
+        history: List[BaseMessage] | None = None,
+        *,
+        time_zone: str | None = None,
+        email: str | None = None,
+        on_event: EventSink | None = None,
+        state: ConversationState | None = None,
     ) -> str:
         """
         Handle ONE user turn, possibly executing tools behind the scenes.
@@ -69,6 +180,19 @@ class AIAgent:
             Raw user input.
         history : list[BaseMessage] | None
             Previous turns (already role-tagged).
+        time_zone : str | None
+            IANA zone for datetimes shown to the user (default: DEFAULT_TZ_NAME).
+        email : str | None
+            The requesting user's e-mail (fallback for prefetching).
+        on_event : EventSink | None
+            Awaited with ``{"type": "token", "text"}`` for streamed LLM text
+            and ``{"type": "tool_call", "name", "args"}`` /
+            ``{"type": "tool_result", "name", "ok"}`` around tool runs.
+            Streamed text is raw model output; the return value is the final
+            reply (times rewritten for the user).
+        state : ConversationState | None
+            Slot state of this conversation; updated in place from tool
+            arguments and results.
 
         Returns
         -------
@@ -80,25 +204,58 @@ class AIAgent:
         RuntimeError
             If the model enters an infinite tool-call loop.
         """
-        messages: list[BaseMessage] = self._builder.build(user_msg, (history or []))
+        probe = None
+        if self._cache is not None and not BOOKING_INTENT_RE.search(user_msg):
+            cached, probe = await self._cache.get(
+                user_msg, history or [],
+                email=email, time_zone=time_zone, tenant=self._tenant, state=state,
+            )
+            if cached is not None:
+                return rewrite_times_for_human(cached, time_zone)
+
+        prefetch = self._start_prefetch(user_msg, email)
+        try:
+            return await self._loop(
+                user_msg, history, time_zone, probe, prefetch, on_event, state
+            )
+        finally:
+            if prefetch is not None:
+                prefetch.task.cancel()
+
+    async def _loop(
+        self,
+        user_msg: str,
+        history: List[BaseMessage] | None,
+        time_zone: str | None,
+        probe: CacheProbe | None,
+        prefetch: _Prefetch | None,
+        on_event: EventSink | None = None,
+        state: ConversationState | None = None,
+    ) -> str:
+        with span("cpu", "build_prompt"):
+            messages: list[BaseMessage] = self._builder.build(
+                user_msg, (history or []), time_zone, state
+            )
         print(messages, len(messages))
         print("history", history, len(history) if history else 0)
         print(self._tool_map)
 
-        for _ in range(self._max_loops):
-            messages = prune_history(messages)
-            llm_reply: AIMessage = await self._llm.ainvoke(
-                messages,
-                tools=list(to_openai_function_dict(t) for t in self._tool_map.values()),
-                tool_choice="auto",
-            ) # type: ignore
+        tool_messages: list[ToolMessage] = []
+        for loop_idx in range(self._max_loops):
+            tier = self._router.pick(tool_messages)
+            with span("cpu", "prune_history"):
+                messages = prune_history(messages, tier.max_prompt_tokens, tier.model)
+            async with span("llm", tier.name):
+                llm_reply = await self._call_llm(tier, messages, on_event)
             messages.append(llm_reply)
 
             tool_calls = llm_reply.additional_kwargs.get("tool_calls")
             
 
             if not tool_calls:  # ✅ no function call -- we're done
-                llm_reply.content = rewrite_times_for_human(llm_reply.content)
+                if probe is not None and loop_idx == 0:  # tool-free turn only
+                    await self._cache.put(probe, llm_reply.content)  # type: ignore[union-attr]
+                llm_reply.content = rewrite_times_for_human(llm_reply.content, time_zone)
                 return llm_reply.content
 
             # ----------------------------------------------------------------
@@ -125,15 +282,50 @@ class AIAgent:
                     f"(requested: {unknown_str})."
                 )
 
+            # --- local argument checks: bad calls never reach Cal.com -----
+            with span("cpu", "validate_args"):
+                prepared = [self._prepare_call(*call) for call in valid_calls]
+            valid_calls = [call for call, _ in prepared]
+
             # --- run the ones we *do* support ------------------------------
+            if on_event is not None:
+                for name, args, _ in valid_calls:
+                    await on_event({"type": "tool_call", "name": name, "args": args})
             tool_tasks = [
-                self._run_tool(name, args, call_id)
-                for name, args, call_id in valid_calls
+                self._run_tool(name, args, call_id, prefetch)
+                if rejected is None else _resolved(rejected)
+                for (name, args, call_id), rejected in prepared
             ]
-            tool_messages = await asyncio.gather(*tool_tasks)
+            tool_messages = list(await asyncio.gather(*tool_tasks))
             messages.extend(tool_messages)
+            if prefetch is not None and any(
+                rejected is None and name not in READ_ONLY_TOOLS
+                for (name, *_), rejected in prepared
+            ):
+                prefetch.stale = True       # later listings must see this turn's changes
+            if state is not None:
+                # rejected calls carry the model's raw arguments: keep them out
+                for ((name, args, _), rejected), msg in zip(prepared, tool_messages):
+                    if rejected is None:
+                        state.update_from_tool(name, args, msg.artifact)
+            if on_event is not None:
+                for (name, *_), msg in zip(valid_calls, tool_messages):
+                    ok = not str(msg.content).lstrip().startswith("[error]")
+                    await on_event({"type": "tool_result", "name": name, "ok": ok})
+
+            # ─── successful mutations: answer from templates, skip the LLM ───
+            if self._template_replies:
+                rendered = self._render_from_templates(valid_calls, tool_messages, time_zone)
+                if rendered is not None:
+                    return rendered
             # ─── if every tool failed, surface the validation error to the user ───
-            if all_errors(tool_messages):
+            # (unless all were rejected locally – the model fixes its own
+            # arguments on the next loop without a Cal.com round trip)
+            model_can_fix = (
+                all(rejected is not None for _, rejected in prepared)
+                and loop_idx + 1 < self._max_loops
+            )
+            if all_errors(tool_messages) and not model_can_fix:
                 # you could merge multiple error strings; here we show only the first
                 first_error = tool_messages[0].content
                 return (
@@ -147,7 +339,65 @@ class AIAgent:
     # --------------------------------------------------------------------- #
     # helpers
     # --------------------------------------------------------------------- #
-    async def _run_tool(self, name: str, args: dict, call_id: str) -> ToolMessage:
+    async def _call_llm(
+        self, tier: ModelTier, messages: List[BaseMessage], on_event: EventSink | None
+    ) -> AIMessage:
+        tools = [to_openai_function_dict(t) for t in self._tool_map.values()]
+        if on_event is None:
+            return await tier.ainvoke(messages, tools=tools, tool_choice="auto")
+
+        # streaming: forward text deltas, then merge the chunks (no hedging –
+        # two streams would interleave)
+        merged = None
+        async for chunk in tier.llm.astream(messages, tools=tools, tool_choice="auto"):
+            if chunk.content:
+                await on_event({"type": "token", "text": chunk.content})
+            merged = chunk if merged is None else merged + chunk
+        if merged is None:
+            return AIMessage(content="")
+        # rebuild the OpenAI-shaped tool_calls the loop reads
+        raw_calls = [
+            {
+                "id": tc["id"],
+                "type": "function",
+                "function": {"name": tc["name"], "arguments": jsonio.dumps(tc["args"])},
+            }
+            for tc in merged.tool_calls
+        ]
+        return AIMessage(
+            content=merged.content,
+            tool_calls=merged.tool_calls,
+            additional_kwargs={"tool_calls": raw_calls} if raw_calls else {},
+        )
+
+    def _prepare_call(
+        self, name: str, args: dict, call_id: str
+    ) -> tuple[tuple[str, dict, str], ToolMessage | None]:
+        """Normalized call, plus an error ToolMessage if the args are unusable."""
+        try:
+            args = normalize_args(self._tool_map[name], args)
+        except ToolArgumentError as exc:
+            return (name, args, call_id), ToolMessage(
+                tool_call_id=call_id, content=f"[error] {exc}"
+            )
+        return (name, args, call_id), None
+
+    def _start_prefetch(self, user_msg: str, email: str | None) -> _Prefetch | None:
+        if not self._prefetch or not BOOKING_INTENT_RE.search(user_msg):
+            return None
+        tool = self._tool_map.get("list_bookings")
+        if not isinstance(tool, ListBookingsTool):
+            return None
+        # an address in the message is the invitee; else fall back to the user
+        match = EMAIL_RE.search(user_msg)
+        target = (match.group(0) if match else email or "").lower()
+        if not target:
+            return None
+        return _Prefetch(target, tool, asyncio.create_task(tool.prefetch(target)))
+
+    async def _run_tool(
+        self, name: str, args: dict, call_id: str, prefetch: _Prefetch | None = None
+    ) -> ToolMessage:
         print("running tool")
         print(name, call_id, args, self._tool_map.get(name))
         """Locate the tool, execute it, wrap result as a ToolMessage."""
@@ -158,16 +408,49 @@ class AIAgent:
                 content=f"[error] Unknown tool: {name}",
             )
 
+        if prefetch is not None and prefetch.serves(name, args):
+            result = await prefetch.answer(args)
+            if result is not None:
+                return ToolMessage(tool_call_id=call_id, content=jsonio.tool_content(result), artifact=result)
+
+        async with span("tool", name):
+            if self._inflight is None:
+                result = await self._invoke_tool(tool, args)
+            elif self._inflight.closing:
+                result = "[error] Server is shutting down, please retry shortly."
+            else:
+                async with self._inflight.track():
+                    result = await self._invoke_tool(tool, args)
+
+        # keep the raw result around for template replies
+        return ToolMessage(tool_call_id=call_id, content=jsonio.tool_content(result), artifact=result)
+
+    @staticmethod
+    def _render_from_templates(
+        calls: list[tuple[str, dict, str]],
+        tool_messages: Sequence[ToolMessage],
+        time_zone: str | None,
+    ) -> str | None:
+        """One line per mutation, or None if any call needs the LLM."""
+        lines = []
+        for (name, _args, _call_id), msg in zip(calls, tool_messages):
+            line = render_reply(name, msg.artifact, time_zone or DEFAULT_TZ_NAME)
+            if line is None:
+                return None
+            lines.append(line)
+        return "\n".join(lines)
+
+    @staticmethod
+    async def _invoke_tool(tool: BaseTool, args: dict):
         try:
-            result = await tool.ainvoke(args)
+            return await tool.ainvoke(args)
         except Exception as exc:  # noqa: BLE001
-            result = f"[error] {type(exc).__name__}: {exc}"
-
-        return ToolMessage(tool_call_id=call_id, content=str(result))
+            return f"[error] {type(exc).__name__}: {exc}"
 
 if __name__ == "__main__":
     from .tools import CreateBookingTool  # assumes you have a 'tools' list in tools.py
     from app.cal_client import CalComClient
+    from langchain_openai import ChatOpenAI
 
     # Initialize the CalComClient (provide any required arguments)
     client = CalComClient()
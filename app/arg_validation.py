@@ -0,0 +1,200 @@
+# app/arg_validation.py
+"""
+Local checks for LLM tool arguments, run before anything goes to Cal.com.
+
+``normalize_args`` canonicalizes datetimes to ``…Z`` UTC, fills the
+defaults the prompt promises (end = start + 30 min, eventTypeId, the
+responses ↔ attendees e-mail), checks e-mails and time-zone names and
+finally validates against the tool's own ``args_schema``. Anything wrong
+raises ``ToolArgumentError`` with one precise line per problem, so the
+model can fix it without a wasted upstream round trip.
+"""
+from __future__ import annotations
+
+import copy
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool
+from pydantic import ValidationError, validate_email
+from pydantic_core import PydanticCustomError
+from zoneinfo import ZoneInfoNotFoundError
+
+from .utils import get_zone
+
+DEFAULT_MEETING_MINUTES = int(os.getenv("DEFAULT_MEETING_MINUTES", "30"))
+DEFAULT_EVENT_TYPE_ID = int(os.getenv("CALCOM_EVENT_TYPE_ID", "2874092"))
+# comma-separated allow-list; empty → any id is accepted
+ALLOWED_EVENT_TYPE_IDS = {
+    int(x) for x in os.getenv("CALCOM_EVENT_TYPE_IDS", "").split(",") if x.strip()
+}
+
+# (start, end) pairs: end defaults from start when the pair is in DEFAULT_END
+DATETIME_PAIRS: List[Tuple[str, str]] = [
+    ("start", "end"),
+    ("new_start", "new_end"),
+    ("afterStart", "beforeEnd"),
+    ("rangeStart", "rangeEnd"),
+]
+DEFAULT_END = {"end", "new_end"}
+SINGLE_DATETIMES = ("approx_start",)
+
+
+class ToolArgumentError(ValueError):
+    """Tool arguments that cannot be sent upstream; ``problems`` lists why."""
+
+    def __init__(self, tool: str, problems: List[str]) -> None:
+        self.tool = tool
+        self.problems = problems
+        super().__init__(f"invalid arguments for {tool}: " + "; ".join(problems))
+
+
+def normalize_args(tool: BaseTool, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical copy of ``args`` for ``tool``; raises ``ToolArgumentError``."""
+    out = copy.deepcopy(args)
+    problems: List[str] = []
+    fields = _schema_fields(tool)
+
+    _normalize_times(out, fields, problems, prefix="")
+    for i, move in enumerate(out.get("moves") or []):
+        if isinstance(move, dict):
+            _normalize_times(move, {"new_start", "new_end"}, problems, prefix=f"moves[{i}].")
+    if "eventTypeId" in fields:
+        _check_event_type(out, tool.name, problems)
+    _normalize_people(out, fields, problems)
+    if out.get("timeZone") is not None:
+        try:
+            get_zone(str(out["timeZone"]))
+        except (ZoneInfoNotFoundError, ValueError):
+            problems.append(f"timeZone: unknown IANA zone {out['timeZone']!r}")
+
+    if not problems and tool.args_schema is not None and isinstance(tool.args_schema, type):
+        try:
+            tool.args_schema.model_validate(out)
+        except ValidationError as exc:
+            problems.extend(_describe(exc))
+    if problems:
+        raise ToolArgumentError(tool.name, problems)
+    return out
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# datetimes
+# ────────────────────────────────────────────────────────────────────────────
+def parse_utc(value: Any) -> datetime:
+    """ISO-8601 → aware UTC datetime; naive values are taken as UTC."""
+    if not isinstance(value, str):
+        raise ValueError("expected an ISO-8601 string")
+    dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _iso_z(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _normalize_times(
+    args: Dict[str, Any], fields: set, problems: List[str], prefix: str
+) -> None:
+    parsed: Dict[str, Optional[datetime]] = {}
+    names = [n for pair in DATETIME_PAIRS for n in pair] + list(SINGLE_DATETIMES)
+    for name in names:
+        if args.get(name) in (None, ""):
+            continue
+        try:
+            parsed[name] = parse_utc(args[name])
+            args[name] = _iso_z(parsed[name])
+        except ValueError:
+            problems.append(
+                f"{prefix}{name}: {args[name]!r} is not an absolute ISO-8601 datetime "
+                "(convert relative dates, send e.g. 2025-07-21T17:00:00Z)"
+            )
+            parsed[name] = None
+
+    for start_key, end_key in DATETIME_PAIRS:
+        start, end = parsed.get(start_key), parsed.get(end_key)
+        if start is not None and end_key not in parsed and end_key in DEFAULT_END & fields:
+            args[end_key] = _iso_z(start + timedelta(minutes=DEFAULT_MEETING_MINUTES))
+        elif start is not None and end is not None and end <= start:
+            problems.append(f"{prefix}{end_key} ({args[end_key]}) must be after {start_key} ({args[start_key]})")
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# people / event type
+# ────────────────────────────────────────────────────────────────────────────
+def _check_email(value: Any, where: str, problems: List[str]) -> Optional[str]:
+    try:
+        return validate_email(str(value).strip())[1]
+    except PydanticCustomError:
+        problems.append(f"{where}: {value!r} is not a valid e-mail address")
+        return None
+
+
+def _normalize_people(args: Dict[str, Any], fields: set, problems: List[str]) -> None:
+    if args.get("attendeeEmail"):
+        args["attendeeEmail"] = _check_email(args["attendeeEmail"], "attendeeEmail", problems)
+    if isinstance(args.get("attendeeEmails"), list):
+        args["attendeeEmails"] = [
+            _check_email(e, f"attendeeEmails[{i}]", problems)
+            for i, e in enumerate(args["attendeeEmails"])
+        ]
+
+    attendees = args.get("attendees")
+    responses = args.get("responses")
+    if "responses" not in fields or (responses is None and not attendees):
+        return
+    responses = responses if isinstance(responses, dict) else {}
+    attendees = attendees if isinstance(attendees, list) else []
+    first = next((a.get("email") for a in attendees if isinstance(a, dict) and a.get("email")), None)
+
+    # the invitee e-mail may be given in only one of the two places
+    email = responses.get("email") or first
+    if not email:
+        problems.append("responses.email: the invitee e-mail is required")
+        return
+    email = _check_email(email, "responses.email", problems)
+    if email is None:
+        return
+    responses["email"] = email
+    responses.setdefault("name", email.split("@")[0])
+    args["responses"] = responses
+    if "attendees" in fields and not attendees:
+        args["attendees"] = [{"email": email}]
+    for i, a in enumerate(args.get("attendees") or []):
+        if isinstance(a, dict) and a.get("email"):
+            a["email"] = _check_email(a["email"], f"attendees[{i}].email", problems)
+
+
+def _check_event_type(args: Dict[str, Any], tool: str, problems: List[str]) -> None:
+    value = args.get("eventTypeId")
+    if value in (None, ""):
+        # reschedule_booking_by_time keeps the booking's own event type
+        if tool != "reschedule_booking_by_time":
+            args["eventTypeId"] = DEFAULT_EVENT_TYPE_ID
+        return
+    try:
+        args["eventTypeId"] = int(value)
+    except (TypeError, ValueError):
+        problems.append(f"eventTypeId: {value!r} is not an integer")
+        return
+    if ALLOWED_EVENT_TYPE_IDS and args["eventTypeId"] not in ALLOWED_EVENT_TYPE_IDS:
+        allowed = ", ".join(map(str, sorted(ALLOWED_EVENT_TYPE_IDS)))
+        problems.append(f"eventTypeId: {value} is not one of {allowed}")
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# helpers
+# ────────────────────────────────────────────────────────────────────────────
+def _schema_fields(tool: BaseTool) -> set:
+    schema = getattr(tool, "args_schema", None)
+    return set(getattr(schema, "model_fields", {}) or {})
+
+
+def _describe(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(p) for p in err['loc']) or '(root)'}: {err['msg']}"
+        for err in exc.errors(include_url=False)
+    ]
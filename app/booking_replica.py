@@ -0,0 +1,222 @@
+# app/booking_replica.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from redis.asyncio import Redis
+
+from . import jsonio, keys
+
+if TYPE_CHECKING:
+    from .cal_client import CalComClient
+
+logger = logging.getLogger(__name__)
+
+INACTIVE_STATUSES = {"cancelled", "rejected"}
+
+
+def _epoch(iso: str | None) -> Optional[float]:
+    if not iso:
+        return None
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """Cal.com signs the raw body with HMAC-SHA256 (``X-Cal-Signature-256``)."""
+    if not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def booking_from_webhook(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise a webhook ``payload`` to the v2 ``GET /bookings`` item shape."""
+    return {
+        "uid": payload.get("uid"),
+        "id": payload.get("bookingId"),
+        "title": payload.get("title"),
+        "start": payload.get("startTime") or payload.get("start"),
+        "end": payload.get("endTime") or payload.get("end"),
+        "status": (payload.get("status") or "accepted").lower(),
+        "eventTypeId": payload.get("eventTypeId"),
+        "attendees": [
+            {k: a.get(k) for k in ("name", "email", "timeZone")}
+            for a in payload.get("attendees") or []
+        ],
+    }
+
+
+class RedisBookingReplica:
+    """
+    Local copy of upcoming Cal.com bookings, indexed per attendee e-mail.
+
+    Layout
+    ------
+    (all under ``keys.replica`` = ``<ns>:{bk}:`` – one cluster slot)
+
+    ``booking:<uid>``   JSON booking (v2 item shape)
+    ``email:<email>``   sorted set  uid → start (epoch seconds)
+    ``synced:<email>``  marker, expires after ``max_age`` – the index for
+                        that e-mail is complete and may answer queries
+    ``emails``          sorted set  email → last lookup, drives reconcile
+
+    A full remote fetch marks an e-mail as synced; webhooks keep it current
+    in between; the reconciler re-fetches recently used e-mails before their
+    marker runs out so drift from missed webhooks is bounded by ``max_age``.
+    """
+
+    def __init__(self, redis: Redis, max_age_seconds: int = 300) -> None:
+        self.redis = redis
+        self.max_age = max_age_seconds
+
+    # --------------------------------------------------------------------- #
+    # reads
+    # --------------------------------------------------------------------- #
+    async def is_fresh(self, email: str) -> bool:
+        email = email.lower()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.exists(keys.replica("synced", email))
+        pipe.zadd(keys.replica("emails"), {email: time.time()})
+        fresh, _ = await pipe.execute()
+        return bool(fresh)
+
+    async def query(
+        self,
+        email: str,
+        after_start: str | None = None,
+        before_end: str | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Upcoming, non-cancelled bookings for ``email`` (ordered by start)."""
+        lo = _epoch(after_start) or "-inf"
+        hi = _epoch(before_end) or "+inf"
+        uids = await self.redis.zrangebyscore(keys.replica("email", email.lower()), lo, hi)
+        if not uids:
+            return []
+        raw = await self.redis.mget([keys.replica("booking", u.decode()) for u in uids])
+
+        now = time.time()
+        end_limit = _epoch(before_end)
+        out = []
+        for item in raw:
+            if not item:
+                continue
+            booking = jsonio.loads(item)
+            end = _epoch(booking.get("end")) or 0
+            if booking.get("status") in INACTIVE_STATUSES or end < now:
+                continue
+            if end_limit is not None and end > end_limit:
+                continue
+            out.append(booking)
+        return out
+
+    # --------------------------------------------------------------------- #
+    # writes
+    # --------------------------------------------------------------------- #
+    async def replace_for_email(self, email: str, bookings: List[Dict[str, Any]]) -> None:
+        """Install the result of a full remote fetch and mark it fresh."""
+        email = email.lower()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(keys.replica("email", email))
+        for b in bookings:
+            self._stage_upsert(pipe, b, emails=[email])
+        pipe.set(keys.replica("synced", email), int(time.time()), ex=self.max_age)
+        await pipe.execute()
+
+    async def upsert(self, *bookings: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        for booking in bookings:
+            self._stage_upsert(pipe, booking)
+        await pipe.execute()
+
+    async def remove(self, uid: str, *, resync: bool = False) -> None:
+        """
+        Drop one booking. ``resync=True`` also expires the ``synced:`` marker
+        of its attendees, for changes the replica cannot apply exactly (e.g.
+        a cancelled series).
+        """
+        data = await self.redis.get(keys.replica("booking", uid))
+        pipe = self.redis.pipeline(transaction=True)
+        if data:
+            for a in jsonio.loads(data).get("attendees") or []:
+                if a.get("email"):
+                    pipe.zrem(keys.replica("email", a['email'].lower()), uid)
+                    if resync:
+                        pipe.delete(keys.replica("synced", a["email"].lower()))
+        pipe.delete(keys.replica("booking", uid))
+        await pipe.execute()
+
+    async def forget(self, *emails: str) -> None:
+        """Next lookup for these e-mails goes to Cal.com (and refreshes them)."""
+        if emails:
+            await self.redis.delete(*(keys.replica("synced", e.lower()) for e in emails))
+
+    def _stage_upsert(self, pipe, booking: Dict[str, Any], emails: List[str] | None = None) -> None:
+        uid, start = booking.get("uid"), _epoch(booking.get("start"))
+        if not uid or start is None:
+            return
+        ttl = max(int((_epoch(booking.get("end")) or start) - time.time()), 0) + 86_400
+        pipe.set(keys.replica("booking", uid), jsonio.dumpb(booking), ex=ttl)
+        for a in booking.get("attendees") or []:
+            if a.get("email"):
+                emails = (emails or []) + [a["email"].lower()]
+        for email in set(emails or []):
+            pipe.zadd(keys.replica("email", email), {uid: start})
+
+    # --------------------------------------------------------------------- #
+    # webhooks
+    # --------------------------------------------------------------------- #
+    async def apply_webhook(self, event: Dict[str, Any]) -> str:
+        """Apply one Cal.com webhook event; returns the trigger handled."""
+        trigger = event.get("triggerEvent", "")
+        payload = event.get("payload") or {}
+
+        if trigger == "BOOKING_CANCELLED":
+            if payload.get("uid"):
+                await self.remove(payload["uid"])
+        elif trigger == "BOOKING_RESCHEDULED":
+            old_uid = (
+                payload.get("rescheduleUid")
+                or payload.get("rescheduledFromUid")
+                or payload.get("fromReschedule")
+            )
+            if old_uid:
+                await self.remove(old_uid)
+            await self.upsert(booking_from_webhook(payload))
+        elif trigger == "BOOKING_CREATED":
+            await self.upsert(booking_from_webhook(payload))
+        else:
+            return "ignored"
+        return trigger
+
+    # --------------------------------------------------------------------- #
+    # reconciliation
+    # --------------------------------------------------------------------- #
+    async def reconcile(self, client: "CalComClient", active_within: int = 3600) -> int:
+        """
+        Re-fetch every e-mail looked up within ``active_within`` seconds.
+        ``client.replica`` must be this replica: the remote fetch writes
+        through to it (see ``CalComClient.list_bookings``).
+        """
+        cutoff = time.time() - active_within
+        await self.redis.zremrangebyscore(keys.replica("emails"), "-inf", cutoff)
+        emails = [e.decode() for e in await self.redis.zrange(keys.replica("emails"), 0, -1)]
+        for email in emails:
+            await client.list_bookings(email, use_replica=False)
+        return len(emails)
+
+    async def run_reconciler(self, client: "CalComClient", interval: float) -> None:
+        """Periodic reconcile; one worker at a time via a Redis lock."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.redis.set(keys.replica("reconcile", "lock"), 1, nx=True, ex=int(interval)):
+                    n = await self.reconcile(client)
+                    logger.info("booking replica: reconciled %d e-mail(s)", n)
+            except Exception:  # noqa: BLE001 – keep the loop alive
+                logger.exception("booking replica reconcile failed")
@@ -1,10 +1,32 @@
+import asyncio
 import os
 import pprint
-from typing import List, Dict, Any, Optional
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Any, Optional, Tuple
 import httpx
 from pydantic import BaseModel, EmailStr, Field
 
+from . import jsonio
+from .booking_replica import booking_from_webhook
+from .profiling import span
+from .projection import bookings_from_body
+
+if TYPE_CHECKING:
+    from .booking_replica import RedisBookingReplica
+    from .tenants import FairScheduler, TokenBucket
+
 CALCOM_BASE_URL = "https://api.cal.com/v1"
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _parse_iso(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _iso_z(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 class Attendee(BaseModel):
@@ -50,7 +72,15 @@ class CalComClient:
     BASE_URL_V2 = "https://api.cal.com/v2"
     _API_VERSION = "2024-08-13"
 
-    def __init__(self, api_key: str | None = None):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        http: httpx.AsyncClient | None = None,
+        *,
+        base_url: str | None = None,
+        base_url_v2: str | None = None,
+        tenant: str = "default",
+    ):
         # prefer env var so you don’t hard-code secrets
         self.api_key = api_key or os.getenv("CALCOM_API_KEY")
         if not self.api_key:
@@ -58,6 +88,88 @@ class CalComClient:
                 "No Cal.com API key found ─ set CALCOM_API_KEY in your environment "
                 "or pass api_key='…' to CalComClient()."
             )
+        # e.g. a local Cal.com stand-in
+        self.BASE_URL = base_url or os.getenv("CALCOM_BASE_URL") or self.BASE_URL
+        self.BASE_URL_V2 = base_url_v2 or os.getenv("CALCOM_BASE_URL_V2") or self.BASE_URL_V2
+        # shared keep-alive client; None → one short-lived client per call
+        self._http = http
+        # multi-tenant mode (``app.tenants``): per-tenant rate budget and a
+        # fair share of the worker's upstream concurrency
+        self.tenant = tenant
+        self.budget: "TokenBucket | None" = None
+        self.scheduler: "FairScheduler | None" = None
+        # optional webhook-fed local copy that answers list_bookings
+        self.replica: "RedisBookingReplica | None" = None
+        # (email, start, end) → (expires_at, busy intervals); see busy_intervals
+        self._busy_cache: Dict[Tuple[str, str, str], Tuple[float, list]] = {}
+        self.busy_cache_ttl = float(os.getenv("CALCOM_BUSY_CACHE_TTL", "60"))
+        # longest booking expected; widens busy lookups past Cal.com's range filter
+        self.max_event_minutes = int(os.getenv("CALCOM_MAX_EVENT_MINUTES", "1440"))
+
+    @classmethod
+    def pooled(
+        cls,
+        api_key: str | None = None,
+        *,
+        max_connections: int | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        **kwargs: Any,
+    ) -> "CalComClient":
+        """Client owning a keep-alive connection pool (one per worker / tenant)."""
+        max_connections = max_connections or int(os.getenv("CALCOM_MAX_CONNECTIONS", "20"))
+        http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(
+                    int(os.getenv("CALCOM_MAX_KEEPALIVE", "10")), max_connections
+                ),
+            ),
+            timeout=float(os.getenv("CALCOM_TIMEOUT", "15")),
+            transport=transport,
+        )
+        return cls(api_key=api_key, http=http, **kwargs)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+
+    async def warm_connections(self, n: int = 2) -> int:
+        """
+        Open ``n`` keep-alive connections (DNS + TLS) to the API host ahead of
+        the first request. Any HTTP status counts; bypasses quotas.
+        """
+        if self._http is None or n <= 0:
+            return 0
+        # concurrent requests force separate connections into the pool
+        results = await asyncio.gather(
+            *(self._http.head(f"{self.BASE_URL_V2}/") for _ in range(n)),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if len(errors) == n:
+            raise errors[0]
+        return n - len(errors)
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Yield the shared client if there is one, else a one-off client."""
+        async with self._upstream_slot(), span("calcom", self.tenant):
+            if self._http is not None:
+                yield self._http
+            else:
+                async with httpx.AsyncClient() as client:
+                    yield client
+
+    @asynccontextmanager
+    async def _upstream_slot(self) -> AsyncIterator[None]:
+        """Wait for this tenant's rate budget and its turn at the upstream."""
+        if self.budget is not None:
+            await self.budget.acquire()
+        if self.scheduler is None:
+            yield
+        else:
+            async with self.scheduler.slot(self.tenant):
+                yield
 
     # ---------- helper (build full URL with ?apiKey=…) ----------
     def _url(self, path: str, use_v2=False) -> tuple[str, dict]:
@@ -80,10 +192,11 @@ class CalComClient:
         No exceptions are bubbled up to the caller.
         """
         url, params = self._url("/bookings")
-        async with httpx.AsyncClient() as client:
+        async with self._session() as client:
             try:
                 resp = await client.post(url, params=params,
-                                          json=payload.model_dump())
+                                          content=jsonio.dumpb(payload),
+                                          headers=JSON_HEADERS)
             except httpx.RequestError as exc:
                 # Network / DNS / TLS failure
                 return BookingResult(
@@ -94,11 +207,14 @@ class CalComClient:
         # ---- We got an HTTP response ----
         status = resp.status_code
         try:
-            body = resp.json()
+            body = jsonio.loads(resp.content)
         except ValueError:
             body = {"raw_text": resp.text or "<empty>"}
 
         if 200 <= status < 300:
+            self._busy_cache.clear()
+            if self.replica is not None:
+                await self._replica_add(body, payload)
             return BookingResult(ok=True, status=status, data=body)
 
         # Pretty-print once for local debugging (optional)
@@ -132,15 +248,34 @@ class CalComClient:
         if all_remaining_bookings:
             body["allRemainingBookings"] = True
 
-        async with httpx.AsyncClient() as client:
-            r = await client.post(url, json=body, headers=headers)
+        self._busy_cache.clear()
+        async with self._session() as client:
+            r = await client.post(
+                url, content=jsonio.dumpb(body), headers={**headers, **JSON_HEADERS}
+            )
             if r.status_code >= 400:
                 try:
-                    pprint.pp(r.json())
+                    pprint.pp(jsonio.loads(r.content))
                 except Exception:
                     print(r.text)
                 r.raise_for_status()
-            return r.json()
+        if self.replica is not None:
+            # a cancelled series leaves occurrences the replica can't name
+            await self.replica.remove(booking_uid, resync=all_remaining_bookings)
+        return jsonio.loads(r.content)
+
+    async def _replica_add(self, body: Dict[str, Any], payload: BookingPayload) -> None:
+        """Write a created booking through to the replica."""
+        created = body.get("data") if isinstance(body.get("data"), dict) else body
+        booking = booking_from_webhook(created)
+        if not booking["attendees"]:
+            booking["attendees"] = [{"name": payload.responses.name,
+                                     "email": payload.responses.email,
+                                     "timeZone": payload.timeZone}]
+        if booking["uid"] and booking["start"]:
+            await self.replica.upsert(booking)
+        else:                           # unexpected shape: let the next lookup re-fetch
+            await self.replica.forget(*(a["email"] for a in booking["attendees"] if a.get("email")))
         
 
     # ─────────────────────────────────────────────────────────────
@@ -152,21 +287,34 @@ class CalComClient:
         after_start: str | None = None,
         before_end: str | None = None,
         status: str = "upcoming",
+        *,
+        use_replica: bool = True,
     ) -> BookingResult:
         """
         Return every booking whose *invitee* matches `email`, optionally filtered by start/end and status.
+
+        Upcoming-bookings lookups are answered from ``self.replica`` when it
+        holds a fresh copy for ``email``; otherwise Cal.com is queried and an
+        unfiltered result refreshes the replica.
         """
+        upcoming = status in (None, "", "upcoming")
+        replica = self.replica if use_replica and upcoming else None
+        if replica is not None and await replica.is_fresh(email):
+            bookings = await replica.query(email, after_start, before_end)
+            return BookingResult(
+                ok=True, status=200, data={"status": "success", "data": bookings}
+            )
+
         url, params = self._url("/bookings", use_v2=True)
         params["attendeeEmail"] = email
-        if not status:
-            params["status"] = "upcoming"
+        params["status"] = status or "upcoming"
         if after_start:
             params["afterStart"] = after_start
         if before_end:
             params["beforeEnd"] = before_end
         headers = self._auth_headers()
 
-        async with httpx.AsyncClient() as client:
+        async with self._session() as client:
             try:
                 resp = await client.get(url, params=params, headers=headers)
             except httpx.RequestError as exc:           # network/DNS failure
@@ -175,11 +323,16 @@ class CalComClient:
 
         status_code = resp.status_code
         try:
-            body = resp.json()
+            body = jsonio.loads(resp.content)
         except ValueError:
             body = {"raw_text": resp.text or ""}
 
         if 200 <= status_code < 300:
+            if self.replica is not None and upcoming:
+                if after_start or before_end:    # partial view: merge only
+                    await self.replica.upsert(*bookings_from_body(body))
+                else:
+                    await self.replica.replace_for_email(email, bookings_from_body(body))
             return BookingResult(ok=True, status=status_code, data=body)
 
         error_msg = (
@@ -197,6 +350,55 @@ class CalComClient:
             raw=body,
         )
     
+    # ─────────────────────────────────────────────────────────────
+    # busy intervals for the free-slot finder
+    # ─────────────────────────────────────────────────────────────
+    async def busy_intervals(
+        self, emails: List[str], start: str, end: str
+    ) -> Tuple[List[Tuple[datetime, datetime]], Optional[str]]:
+        """
+        Upcoming bookings of every e-mail overlapping ``[start, end)`` as
+        ``(start, end)`` datetimes, fetched concurrently. Per-e-mail results
+        are cached for ``busy_cache_ttl`` seconds (cleared by any booking
+        mutation through this client). Returns ``(intervals, error)``.
+
+        Cal.com's ``afterStart`` / ``beforeEnd`` only match bookings that lie
+        entirely inside the range, so the lookup is widened by
+        ``max_event_minutes`` on both sides (a meeting in progress at
+        ``start`` still counts) and trimmed to overlapping bookings here.
+        """
+        now = time.monotonic()
+        lo, hi = _parse_iso(start), _parse_iso(end)
+        margin = timedelta(minutes=self.max_event_minutes)
+        wide_start, wide_end = _iso_z(lo - margin), _iso_z(hi + margin)
+        # read the cache once: a mutation may clear it while we await below
+        found: Dict[str, list] = {}
+        for e in emails:
+            expires_at, intervals = self._busy_cache.get((e, start, end), (0.0, None))
+            if expires_at > now:
+                found[e] = intervals
+        missing = [e for e in emails if e not in found]
+        results = await asyncio.gather(
+            *(self.list_bookings(e, after_start=wide_start, before_end=wide_end) for e in missing)
+        )
+        for email, result in zip(missing, results):
+            if not result.ok:
+                return [], f"list_bookings failed for {email}: {result.error or result.status}"
+            intervals = [
+                (_parse_iso(b.get("start") or b["startTime"]), _parse_iso(b.get("end") or b["endTime"]))
+                for b in bookings_from_body(result.data)
+                if (b.get("start") or b.get("startTime")) and (b.get("end") or b.get("endTime"))
+            ]
+            found[email] = [(s, e) for s, e in intervals if s < hi and e > lo]
+            self._busy_cache[(email, start, end)] = (now + self.busy_cache_ttl, found[email])
+
+        if len(self._busy_cache) > 512:      # drop expired entries
+            self._busy_cache = {k: v for k, v in self._busy_cache.items() if v[0] > now}
+        busy: List[Tuple[datetime, datetime]] = []
+        for email in emails:
+            busy.extend(found[email])
+        return busy, None
+
     # ────────────────────────────────────────────────────────────────
     #  PUBLIC ▸ reschedule = cancel ➊ then create ➋
     # ────────────────────────────────────────────────────────────────
@@ -0,0 +1,305 @@
+# app/cassette.py
+"""
+Record/replay of LLM calls and Cal.com HTTP exchanges ("cassettes").
+
+Recording wraps the real chat model (``RecordingChatModel``) and the
+``CalComClient`` transport (``RecordingTransport``); replay serves the same
+responses back (``ReplayChatModel`` / ``ReplayTransport``) with the
+recorded latencies, scaled by ``latency_scale`` (0 → instant).
+
+Exchanges are grouped per script turn (``Cassette.begin_turn``). Within a
+turn, LLM responses are handed out in call order – the requests are *not*
+matched, so a changed prompt or ``prune_history`` still replays the same
+workload, and its prompt tokens can be compared with the recorded ones.
+HTTP responses are matched on method, path, query (without the API key) and
+body, falling back to call order per method + path.
+
+File format: JSON lines, a ``meta`` record first, then one record per
+exchange in the order they happened.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    message_to_dict,
+    messages_from_dict,
+    messages_to_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from . import jsonio
+from .utils import num_tokens
+
+SECRET_PARAMS = {"apiKey"}
+# the body is stored decoded
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class CassetteMiss(httpx.TransportError):
+    """Replay found no recorded exchange for a request."""
+
+
+class Cassette:
+    def __init__(self, meta: Dict[str, Any] | None = None) -> None:
+        self.meta = meta or {}
+        self.records: List[Dict[str, Any]] = []
+        self.turn = 0
+        self.misses: List[str] = []
+        self._llm: Dict[int, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._http: Dict[Tuple, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._http_loose: Dict[Tuple, Deque[Dict[str, Any]]] = defaultdict(deque)
+
+    # ------------------------------------------------------------------ #
+    # files
+    # ------------------------------------------------------------------ #
+    def save(self, path: str | Path) -> None:
+        lines = [jsonio.dumps({"kind": "meta", **self.meta})]
+        lines += [jsonio.dumps(r) for r in self.records]
+        Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Cassette":
+        cassette = cls()
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            record = jsonio.loads(line)
+            kind = record.pop("kind")
+            if kind == "meta":
+                cassette.meta = record
+                continue
+            record["kind"] = kind
+            cassette.records.append(record)
+            if kind == "llm":
+                cassette._llm[record["turn"]].append(record)
+            else:
+                cassette._http[_http_key(record["turn"], record["request"])].append(record)
+                cassette._http_loose[_loose_key(record["turn"], record["request"])].append(record)
+        return cassette
+
+    def begin_turn(self, turn: int) -> None:
+        self.turn = turn
+
+    # ------------------------------------------------------------------ #
+    # record
+    # ------------------------------------------------------------------ #
+    def add_llm(
+        self, messages: List[BaseMessage], kwargs: Dict[str, Any],
+        reply: AIMessage, latency: float, model: str,
+    ) -> None:
+        self.records.append({
+            "kind": "llm",
+            "turn": self.turn,
+            "model": model,
+            "latency": round(latency, 4),
+            "prompt_tokens": sum(num_tokens(m, model) for m in messages),
+            "request": {
+                "messages": messages_to_dict(messages),
+                "tools": [t.get("name") or t.get("function", {}).get("name")
+                          for t in kwargs.get("tools") or [] if isinstance(t, dict)],
+            },
+            "response": message_to_dict(reply),
+        })
+
+    def add_http(self, request: httpx.Request, response: httpx.Response, latency: float) -> None:
+        self.records.append({
+            "kind": "http",
+            "turn": self.turn,
+            "latency": round(latency, 4),
+            "request": _describe(request),
+            "response": {
+                "status": response.status_code,
+                "headers": {"content-type": response.headers.get("content-type", "")},
+                "content": response.content.decode("utf-8", errors="replace"),
+            },
+        })
+
+    # ------------------------------------------------------------------ #
+    # replay
+    # ------------------------------------------------------------------ #
+    def next_llm(self) -> Optional[Dict[str, Any]]:
+        queue = self._llm.get(self.turn)
+        return queue.popleft() if queue else None
+
+    def next_http(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        described = _describe(request)
+        exact = self._http.get(_http_key(self.turn, described))
+        record = exact.popleft() if exact else None
+        loose = self._http_loose.get(_loose_key(self.turn, described))
+        if record is None:
+            record = loose.popleft() if loose else None
+            if record is not None:
+                self._http[_http_key(self.turn, record["request"])].remove(record)
+        elif loose is not None:
+            loose.remove(record)
+        return record
+
+    def unused(self) -> Dict[str, int]:
+        return {
+            "llm": sum(len(q) for q in self._llm.values()),
+            "http": sum(len(q) for q in self._http.values()),
+        }
+
+
+def _describe(request: httpx.Request) -> Dict[str, Any]:
+    params = sorted((k, v) for k, v in request.url.params.multi_items() if k not in SECRET_PARAMS)
+    return {
+        "method": request.method,
+        "path": request.url.path,
+        "params": params,
+        "body": request.content.decode("utf-8", errors="replace"),
+    }
+
+
+def _http_key(turn: int, req: Dict[str, Any]) -> Tuple:
+    body = hashlib.sha1(req["body"].encode()).hexdigest()
+    return turn, req["method"], req["path"], tuple(map(tuple, req["params"])), body
+
+
+def _loose_key(turn: int, req: Dict[str, Any]) -> Tuple:
+    return turn, req["method"], req["path"]
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# LLM
+# ────────────────────────────────────────────────────────────────────────────
+class RecordingChatModel(BaseChatModel):
+    """Passes calls through to ``inner`` and records each exchange."""
+
+    inner: BaseChatModel
+    model_name: str = "recording"
+    _cassette: Cassette = PrivateAttr()
+
+    def __init__(self, inner: BaseChatModel, cassette: Cassette, **data: Any) -> None:
+        super().__init__(inner=inner, model_name=getattr(inner, "model_name", "recording"), **data)
+        self._cassette = cassette
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-recorder"
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+        run_manager: Any = None, **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        reply = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._cassette.add_llm(messages, kwargs, reply, time.perf_counter() - started, self.model_name)
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+        run_manager: Any = None, **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        reply = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._cassette.add_llm(messages, kwargs, reply, time.perf_counter() - started, self.model_name)
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Serves recorded replies in call order for the current turn; collects the
+    prompt tokens it was actually sent (``prompt_tokens``) for comparison.
+    """
+
+    model_name: str = "replay"
+    latency_scale: float = 1.0
+    _cassette: Cassette = PrivateAttr()
+    _prompt_tokens: List[int] = PrivateAttr(default_factory=list)
+
+    def __init__(self, cassette: Cassette, **data: Any) -> None:
+        super().__init__(**data)
+        self._cassette = cassette
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    @property
+    def prompt_tokens(self) -> List[int]:
+        return self._prompt_tokens
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+        run_manager: Any = None, **kwargs: Any,
+    ) -> ChatResult:
+        record = self._next_record(messages)
+        if self.latency_scale:
+            time.sleep(record["latency"] * self.latency_scale)
+        return self._result(record)
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+        run_manager: Any = None, **kwargs: Any,
+    ) -> ChatResult:
+        record = self._next_record(messages)
+        if self.latency_scale:
+            await asyncio.sleep(record["latency"] * self.latency_scale)
+        return self._result(record)
+
+    def _next_record(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        self._prompt_tokens.append(sum(num_tokens(m, self.model_name) for m in messages))
+        record = self._cassette.next_llm()
+        if record is None:
+            self._cassette.misses.append(f"llm turn {self._cassette.turn}")
+            raise RuntimeError(f"cassette has no more LLM replies for turn {self._cassette.turn}")
+        return record
+
+    @staticmethod
+    def _result(record: Dict[str, Any]) -> ChatResult:
+        [reply] = messages_from_dict([record["response"]])
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# HTTP
+# ────────────────────────────────────────────────────────────────────────────
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, inner: httpx.AsyncBaseTransport | None = None) -> None:
+        self.cassette = cassette
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS}
+        response = httpx.Response(response.status_code, headers=headers, content=content, request=request)
+        self.cassette.add_http(request, response, time.perf_counter() - started)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, latency_scale: float = 1.0) -> None:
+        self.cassette = cassette
+        self.latency_scale = latency_scale
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        record = self.cassette.next_http(request)
+        if record is None:
+            miss = f"http turn {self.cassette.turn}: {request.method} {request.url.path}"
+            self.cassette.misses.append(miss)
+            raise CassetteMiss(miss, request=request)
+        if self.latency_scale:
+            await asyncio.sleep(record["latency"] * self.latency_scale)
+        resp = record["response"]
+        return httpx.Response(
+            resp["status"], headers=resp["headers"],
+            content=resp["content"].encode("utf-8"), request=request,
+        )
@@ -1,67 +1,183 @@
 
-import json, asyncio
+import asyncio
 from redis.asyncio import Redis
-from typing import List
-from langchain.schema import BaseMessage
+from typing import Any, Dict, List, Optional, Protocol
 import os
-import asyncio
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from . import jsonio, keys
+from .retention import HistoryCompactor
 from langchain_core.messages import (          
     messages_to_dict,
     messages_from_dict,
 )
-from langchain.memory import ConversationBufferMemory
-from langchain_community.chat_message_histories import RedisChatMessageHistory
+
+class ContextStore(Protocol):
+    """Conversation history backend (Redis, Postgres, cached combos)."""
+
+    async def load(self, cid: str) -> List[BaseMessage]:
+        """Return the (tail of the) history, oldest first."""
+        ...
+
+    async def save(self, cid: str, messages: List[BaseMessage]) -> None:
+        """Append *new* messages to the history of ``cid``."""
+        ...
+
+    async def load_state(self, cid: str) -> Optional[Dict[str, Any]]:
+        """Slot state (``ConversationState`` dump) kept next to the history."""
+        ...
+
+    async def save_state(self, cid: str, state: Dict[str, Any]) -> None:
+        ...
+
 
 class RedisContextStore:
-    def __init__(self, redis: Redis, ttl_seconds: int = 86_400):
+    """
+    History as a Redis list (one JSON message per item) under
+    ``keys.history(cid)``; slot state under ``keys.state(cid)``.
+
+    Appends are a single RPUSH + INCRBY + EXPIRE pipeline (the byte
+    counter feeds the size caps). Loads go to the same connection as writes
+    – the next turn must see this one's messages – and ``stage_load`` lets
+    callers fold the load into a pipeline of their own (see
+    ``ChatOrchestrator``).
+
+    With a ``retention`` compactor, a save that crosses its caps schedules
+    compaction, and a Redis tail shorter than ``keep_messages`` is topped up
+    from the archive on load (``backfill``).
+    """
+
+    # replies that ``stage_load`` adds to a pipeline
+    STAGED = 1
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl_seconds: int = 86_400,
+        retention: HistoryCompactor | None = None,
+    ):
         self.redis = redis
         self.ttl = ttl_seconds
+        self.retention = retention
+
+    async def save(
+        self, cid: str, messages: List[BaseMessage], *, create: bool = True, tail: int | None = None
+    ):
+        """
+        Append *new_messages* to any history already in Redis.
+
+        With ``create=False`` nothing is written unless the key exists – used
+        when Redis is only a cache and must not end up holding a partial tail.
+        With ``tail`` the list is trimmed to its newest ``tail`` messages.
+        """
+        if not messages:
+            return
+        key, size_key = keys.history(cid), keys.history_bytes(cid)
+        items = [jsonio.dumpb(m) for m in messages_to_dict(messages)]
+        pipe = self.redis.pipeline(transaction=True)
+        if create:
+            pipe.rpush(key, *items)
+        else:
+            pipe.rpushx(key, *items)
+        pipe.incrby(size_key, sum(len(i) for i in items))
+        pipe.expire(key, self.ttl)          # refresh TTL on every write
+        pipe.expire(size_key, self.ttl)
+        if tail is not None:
+            pipe.lrange(key, 0, -tail - 1)
+            pipe.ltrim(key, -tail, -1)
+        length, size, *rest = await pipe.execute()
+        if not length:
+            await self.redis.delete(size_key)   # RPUSHX found no list
+            return
+        if tail is not None and rest[2]:
+            dropped = sum(len(i) for i in rest[2])
+            length, size = min(length, tail), await self.redis.decrby(size_key, dropped)
+        if self.retention is not None and self.retention.policy.over(length, size):
+            self.retention.request(cid)
+
+    async def replace(self, cid: str, messages: List[BaseMessage]) -> None:
+        key = keys.history(cid)
+        pipe = self.redis.pipeline(transaction=True)
+        size_key = keys.history_bytes(cid)
+        pipe.delete(key, size_key)
+        if messages:
+            items = [jsonio.dumpb(m) for m in messages_to_dict(messages)]
+            pipe.rpush(key, *items)
+            pipe.set(size_key, sum(len(i) for i in items), ex=self.ttl)
+            pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def load(self, cid: str, *, tail: int | None = None) -> List[BaseMessage]:
+        """History from Redis; only the newest ``tail`` messages if given."""
+        items = await self.redis.lrange(keys.history(cid), -tail if tail else 0, -1)
+        return await self.backfill(cid, self.parse_history(items))
+
+    async def backfill(self, cid: str, history: List[BaseMessage]) -> List[BaseMessage]:
+        """Prepend archived messages when the Redis tail is short (cold conversation)."""
+        r = self.retention
+        if r is None or r.archive is None or len(history) >= r.policy.keep_messages:
+            return history
+        older = await r.archive.tail(cid, r.policy.keep_messages - len(history))
+        return self.parse_history(older) + history if older else history
+
+    async def load_state(self, cid: str) -> Optional[Dict[str, Any]]:
+        data = await self.redis.get(keys.state(cid))
+        return jsonio.loads(data) if data else None
+
+    async def save_state(self, cid: str, state: Dict[str, Any]) -> None:
+        await self.redis.set(keys.state(cid), jsonio.dumpb(state), ex=self.ttl)
+
+    # ------------------------------------------------------------------ #
+    # pipelining
+    # ------------------------------------------------------------------ #
+    def stage_load(self, pipe: Any, cid: str, *, with_state: bool = False) -> None:
+        pipe.lrange(keys.history(cid), 0, -1)
+        if with_state:
+            pipe.get(keys.state(cid))
 
     @staticmethod
-    def get_memory(
-        cid: str,
-    ) -> ConversationBufferMemory:
-        chat_hist = RedisChatMessageHistory(
-            url="redis://localhost:6379/0",   # or os.getenv("REDIS_URL", "...")
-            session_id=cid,
-            key_prefix="chat",                # chat:<cid>:messages
-            ttl=86_400,                       # 1 day
-        )
-        return ConversationBufferMemory(
-            chat_memory=chat_hist,
-            return_messages=True,             # agent gets BaseMessage objects
-        )
-
-    async def save(self, cid: str, messages: List[BaseMessage]):
-        """Append *new_messages* to any history already in Redis."""
-        # print("--------------------------------")
-        # print(" save message")
-        # print(cid, messages)
-
-        # print("--------------------------------")
-        # 1️⃣  Get what’s already there
-        existing = await self.redis.get(cid)
-        if existing:
-            history = messages_from_dict(json.loads(existing))
-        else:
-            history = []
+    def parse_history(items: List[bytes]) -> List[BaseMessage]:
+        return messages_from_dict([jsonio.loads(i) for i in items or []])
+
+
+class CachedContextStore:
+    """
+    ``primary`` is the source of truth; Redis keeps a hot copy of the tail.
 
-        # 2️⃣  Extend and persist
-        combined = history + messages
-        await self.redis.set(
-            cid,
-            json.dumps(messages_to_dict(combined)),
-            ex=self.ttl,           # refresh TTL on every write
-        )
+    A cache miss loads the tail from ``primary`` and installs it in Redis;
+    appends go to ``primary`` first and then to Redis only if it already
+    holds that conversation. Both stay within ``primary.max_messages`` (when
+    the primary has one), the same bound the primary's own ``load`` has.
+    """
 
+    def __init__(self, primary: ContextStore, cache: RedisContextStore):
+        self.primary = primary
+        self.cache = cache
+        self.tail: int | None = getattr(primary, "max_messages", None)
 
     async def load(self, cid: str) -> List[BaseMessage]:
-        data = await self.redis.get(cid)
-        if not data:
-            return []
-        messages_dict = json.loads(data)
-        return messages_from_dict(messages_dict)
+        cached = await self.cache.load(cid, tail=self.tail)
+        if cached:
+            return cached
+        history = await self.primary.load(cid)
+        if history:
+            await self.cache.replace(cid, history)
+        return history
+
+    async def save(self, cid: str, messages: List[BaseMessage]) -> None:
+        await self.primary.save(cid, messages)
+        await self.cache.save(cid, messages, create=False, tail=self.tail)
+
+    async def load_state(self, cid: str) -> Optional[Dict[str, Any]]:
+        state = await self.cache.load_state(cid)
+        if state is None:
+            state = await self.primary.load_state(cid)
+            if state is not None:
+                await self.cache.save_state(cid, state)
+        return state
+
+    async def save_state(self, cid: str, state: Dict[str, Any]) -> None:
+        await self.primary.save_state(cid, state)
+        await self.cache.save_state(cid, state)
 
 
 if __name__ == "__main__":
@@ -95,7 +211,7 @@ if __name__ == "__main__":
         print("Loaded messages:", loaded)
 
         # Cleanup
-        await redis.delete(cid)
+        await redis.delete(keys.history(cid))
         await redis.aclose()
 
     asyncio.run(main())
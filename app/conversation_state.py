@@ -0,0 +1,186 @@
+# app/conversation_state.py
+"""
+Per-conversation slot state for booking flows.
+
+Instead of re-reading the whole raw history every turn, the agent carries
+the details it has already pinned down (invitee, time zone, title, the
+booking being discussed, …) in a ``ConversationState``. It is filled from
+tool arguments and results, stored next to the history in the context
+store and rendered into the prompt as one small block.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .projection import project_booking
+
+MAX_CANDIDATES = 5
+
+
+class BookingRef(BaseModel):
+    uid: str
+    title: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+
+class ConversationState(BaseModel):
+    user_email: Optional[str] = None
+    time_zone: Optional[str] = None
+    invitee_name: Optional[str] = None
+    invitee_email: Optional[str] = None
+    title: Optional[str] = None
+    event_type_id: Optional[int] = None
+    # the booking the user is talking about (last created / matched / moved)
+    booking: Optional[BookingRef] = None
+    # last lookup, so "the second one" can be resolved without re-listing
+    candidates: List[BookingRef] = Field(default_factory=list)
+    last_action: Optional[str] = None
+
+    # ------------------------------------------------------------------ #
+    # updates
+    # ------------------------------------------------------------------ #
+    def note_request(self, email: str | None, time_zone: str | None) -> None:
+        if email:
+            self.user_email = email
+        if time_zone:
+            self.time_zone = time_zone
+
+    def update_from_tool(self, name: str, args: Dict[str, Any], result: Any) -> None:
+        """Fold one tool call (arguments + raw result) into the state."""
+        self._from_args(args)
+        data = result.model_dump() if isinstance(result, BaseModel) else result
+        if not isinstance(data, dict):
+            return
+        if name in ("cancel_bookings_bulk", "reschedule_bookings_bulk"):
+            # per-item results, some may have failed
+            if self._apply_bulk(data.get("results") or []):
+                self.last_action = name
+            return
+        if data.get("ok") is False and not data.get("candidates"):
+            return
+        self.last_action = name
+
+        if name == "list_bookings":
+            self._set_candidates(data.get("bookings") or [])
+        elif data.get("candidates"):                        # ambiguous *_by_time
+            self._set_candidates(data["candidates"])
+        elif name == "cancel_booking_by_time":
+            cancelled = _ref(data.get("cancelled"))
+            if cancelled is not None:
+                self._replace(cancelled.uid, None)
+        elif name == "reschedule_booking_by_time":
+            self._set_booking(data.get("booking"))
+        elif name in ("create_booking", "reschedule_booking"):
+            body = data.get("data") or {}
+            self._set_booking(body.get("data") if isinstance(body.get("data"), dict) else body)
+        elif name == "cancel_booking" and isinstance(args.get("booking_uid"), str):
+            self._replace(args["booking_uid"], None)
+
+    def _from_args(self, args: Dict[str, Any]) -> None:
+        # arguments come from the model: ignore values of the wrong shape
+        responses = args.get("responses")
+        if not isinstance(responses, dict):
+            responses = {}
+        attendees = args.get("attendees")
+        first = attendees[0] if isinstance(attendees, list) and attendees else None
+        email = (
+            _text(args.get("attendeeEmail"))
+            or _text(responses.get("email"))
+            or (_text(first.get("email")) if isinstance(first, dict) else None)
+        )
+        if email:
+            self.invitee_email = email
+        if _text(responses.get("name")):
+            self.invitee_name = responses["name"]
+        if _text(args.get("title")):
+            self.title = args["title"]
+        event_type_id = _int(args.get("eventTypeId"))
+        if event_type_id:
+            self.event_type_id = event_type_id
+        if _text(args.get("timeZone")) and not self.time_zone:
+            self.time_zone = args["timeZone"]
+
+    def _set_booking(self, booking: Optional[Dict[str, Any]]) -> None:
+        ref = _ref(booking)
+        if ref is not None:
+            self.booking = ref
+            self.candidates = []
+
+    def _replace(self, uid: str, ref: Optional[BookingRef]) -> None:
+        """Point every mention of booking ``uid`` at ``ref`` (None: it is gone)."""
+        if self.booking is not None and self.booking.uid == uid:
+            self.booking = ref
+        self.candidates = [
+            c for c in (ref if c.uid == uid else c for c in self.candidates) if c is not None
+        ]
+
+    def _apply_bulk(self, results: List[Any]) -> bool:
+        changed = False
+        for item in results:
+            if not isinstance(item, dict):
+                continue
+            old = item.get("uid") or (item.get("from") or {}).get("uid")
+            outcome = item.get("outcome")
+            if not isinstance(old, str):
+                continue
+            if outcome in ("moved", "restored"):             # lives on under a new uid
+                self._replace(old, _ref(item.get("booking")))
+            elif outcome == "lost" or (outcome is None and item.get("ok")):   # cancelled
+                self._replace(old, None)
+            else:
+                continue
+            changed = True
+        return changed
+
+    def _set_candidates(self, bookings: List[Dict[str, Any]]) -> None:
+        refs = [r for r in map(_ref, bookings) if r is not None]
+        self.candidates = refs[:MAX_CANDIDATES]
+        if len(refs) == 1:
+            self.booking = refs[0]
+
+    # ------------------------------------------------------------------ #
+    # prompt
+    # ------------------------------------------------------------------ #
+    def is_empty(self) -> bool:
+        return self == ConversationState()
+
+    def render(self) -> str:
+        """Compact block for the system prompt (times stay ISO-8601 UTC)."""
+        facts = self.model_dump(exclude_none=True, exclude_defaults=True)
+        lines = [f"{key}: {_compact(value)}" for key, value in facts.items()]
+        return "Known details from this conversation (reuse, don't ask again):\n" + "\n".join(lines)
+
+
+def _text(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) and value else None
+
+
+def _int(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ref(booking: Optional[Dict[str, Any]]) -> Optional[BookingRef]:
+    if not booking:
+        return None
+    view = project_booking(booking)
+    if not view.get("uid"):
+        return None
+    return BookingRef(
+        uid=view["uid"], title=view.get("title"), start=view.get("start"), end=view.get("end")
+    )
+
+
+def _compact(value: Any) -> str:
+    if isinstance(value, dict):
+        return " ".join(f"{k}={v}" for k, v in value.items() if v is not None)
+    if isinstance(value, list):
+        return "; ".join(_compact(v) for v in value)
+    return str(value)
@@ -1,57 +1,216 @@
+import asyncio
+import logging
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
-import os, uuid, redis.asyncio as aioredis
-from langchain_openai import ChatOpenAI
-from fastapi import Depends, Header, Request
+import os, secrets, uuid, redis.asyncio as aioredis
+from fastapi import Depends, Header, Request, WebSocketException, status
+from fastapi.requests import HTTPConnection
 
 from app.cal_client import CalComClient
-from app.tools import CancelBookingTool, CreateBookingTool, ListBookingsTool, RescheduleBookingTool
+from app.tools import (
+    BulkCancelBookingsTool,
+    BulkRescheduleBookingsTool,
+    CancelBookingByTimeTool,
+    CancelBookingTool,
+    CreateBookingTool,
+    FindFreeSlotsTool,
+    GetBookingDetailsTool,
+    ListBookingsTool,
+    RescheduleBookingByTimeTool,
+    RescheduleBookingTool,
+)
 from .prompt_builder import PromptBuilder
 from .response_parser import ResponseParser
 from .agents import AIAgent
-from .context_store import RedisContextStore
+from .booking_replica import RedisBookingReplica
+from .context_store import CachedContextStore, ContextStore, RedisContextStore
+from .inflight import InFlightTracker
+from .model_router import ModelRouter
+from .response_cache import ResponseCache
+from .result_store import RedisResultStore
+from .retention import HistoryCompactor, compactor_from_env
+from .tenants import TenantClient, UnknownTenant, tenant_pool_from_env
+from .write_behind import WriteBehindContextStore
 from .orchestrator import ChatOrchestrator
+from .profiling import Profiler
+from .warmup import WarmupState, warm_up
 from .rate_limiter import RedisRateLimiter
 from contextlib import asynccontextmanager
 from redis.asyncio import Redis
 from fastapi import Depends, HTTPException
 
 
+logger = logging.getLogger(__name__)
+
 env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+
 # Only cache pure functions with hashable args
-def redis_pool():
-    return aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+def redis_pool() -> Redis:
+    """
+    One connection pool per worker process – call it *after* fork.
+
+    ``REDIS_CLUSTER=1`` connects to a Redis Cluster (``REDIS_URL`` is any
+    seed node); with ``REDIS_READ_FROM_REPLICAS=1`` its read commands are
+    spread over the replicas. Keys are hash-tagged per conversation
+    (``app.keys``), so per-request pipelines stay on one slot.
+
+    Replica reads may lag the previous turn's writes, which breaks the
+    read-your-writes guarantee history loads rely on (see
+    ``WriteBehindContextStore``); keep ``REDIS_READ_FROM_REPLICAS=0`` unless
+    conversations never move between workers.
+    """
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    if os.getenv("REDIS_CLUSTER", "0") == "1":
+        from redis.asyncio.cluster import RedisCluster
+        from redis.cluster import LoadBalancingStrategy
+
+        replicas = os.getenv("REDIS_READ_FROM_REPLICAS", "0") == "1"
+        return RedisCluster.from_url(  # type: ignore[return-value]
+            url,
+            max_connections=max_connections,
+            load_balancing_strategy=(
+                LoadBalancingStrategy.ROUND_ROBIN_REPLICAS if replicas else None
+            ),
+        )
+    return aioredis.from_url(url, max_connections=max_connections)
+
+@lru_cache(maxsize=1)
+def response_cache() -> ResponseCache | None:
+    """Process-wide cache for tool-free replies (``RESPONSE_CACHE_ENABLED=1``)."""
+    if os.getenv("RESPONSE_CACHE_ENABLED", "0") != "1":
+        return None
+    embeddings = None
+    if os.getenv("RESPONSE_CACHE_EMBEDDINGS", "0") == "1":
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+        ttl_seconds=int(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        embeddings=embeddings,
+        similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95")),
+    )
 
 def prompt_builder() -> PromptBuilder:
-    return PromptBuilder()
+    return PromptBuilder(
+        state_history_messages=int(os.getenv("STATE_HISTORY_MESSAGES", "6"))
+    )
 
 def response_parser() -> ResponseParser:
     return ResponseParser()
 
+def build_tools(client: CalComClient, result_store) -> list:
+    return [
+        CreateBookingTool(client=client),
+        ListBookingsTool(client=client, store=result_store),
+        GetBookingDetailsTool(store=result_store),
+        CancelBookingTool(client=client),
+        RescheduleBookingTool(client=client),
+        CancelBookingByTimeTool(client=client),
+        RescheduleBookingByTimeTool(client=client),
+        FindFreeSlotsTool(client=client),
+        BulkCancelBookingsTool(client=client),
+        BulkRescheduleBookingsTool(client=client),
+    ]
+
+async def tenant_client(request: HTTPConnection) -> TenantClient | None:
+    """
+    Multi-tenant mode: the caller's Cal.com client, by ``X-Tenant-Id``
+    (``?tenant=`` on WebSockets) or the domain of the request's e-mail.
+
+    The explicit id is honoured only with the tenant's ``X-Tenant-Secret``
+    (``?tenant_secret=``), an admin token, or from a proxy that owns the
+    header (``CALCOM_TENANT_HEADER_TRUSTED=1``); else the domain decides.
+    """
+    pool = request.app.state.tenants
+    if pool is None:
+        return None
+    email = request.query_params.get("email")
+    if isinstance(request, Request):
+        try:
+            email = (await request.json()).get("email")    # body is cached for the route
+        except (ValueError, AttributeError):
+            pass
+    try:
+        return pool.get(resolve_tenant(request, email))
+    except UnknownTenant:
+        if isinstance(request, Request):
+            raise HTTPException(403, "Unknown tenant")
+        raise WebSocketException(status.WS_1008_POLICY_VIOLATION, "Unknown tenant")
+
+def resolve_tenant(conn: HTTPConnection, email: str | None) -> str:
+    """Tenant id for ``email`` with the connection's tenant credentials."""
+    tenant_id = conn.headers.get("x-tenant-id") or conn.query_params.get("tenant")
+    secret = conn.headers.get("x-tenant-secret") or conn.query_params.get("tenant_secret")
+    trusted = (
+        os.getenv("CALCOM_TENANT_HEADER_TRUSTED", "0") == "1"
+        or is_admin(conn.headers.get("x-admin-token"))
+    )
+    return conn.app.state.tenants.registry.resolve(tenant_id, email, secret=secret, trusted=trusted)
+
 def ai_agent(
+    request: HTTPConnection,        # HTTP request or WebSocket
     builder: PromptBuilder = Depends(prompt_builder),
-    parser: ResponseParser = Depends(response_parser)
+    parser: ResponseParser = Depends(response_parser),
+    tenant: TenantClient | None = Depends(tenant_client),
 ) -> AIAgent:
-    # Initialize the CalComClient (provide any required arguments)
-    client = CalComClient()
+    # LLM client, Cal.com pools and tools are per-worker singletons (lifespan)
+    state = request.app.state
+    return AIAgent(
+        state.llm,
+        builder,
+        parser,
+        tools=tenant.tools if tenant is not None else state.tools,
+        cache=response_cache(),
+        inflight=state.inflight,
+        prefetch=os.getenv("PREFETCH_BOOKINGS", "0") == "1",
+        template_replies=os.getenv("TEMPLATE_REPLIES", "0") == "1",
+        tenant=tenant.tenant if tenant is not None else None,
+    )
 
-    # Create an instance of the tool
-    create_booking_tool = CreateBookingTool(client=client)
-    list_booking_tool = ListBookingsTool(client=client)
-    cancel_booking_tool = CancelBookingTool(client=client)
-    reschedule_tool = RescheduleBookingTool(client=client)
-    tools = [create_booking_tool, list_booking_tool, cancel_booking_tool, reschedule_tool]
+def build_context_store(
+    redis: Redis,
+    pg_store=None,
+    retention: HistoryCompactor | None = None,
+) -> ContextStore:
+    """
+    ``CONTEXT_STORE=redis`` (default) or ``postgres`` (+ optional Redis
+    cache), optionally behind write-behind persistence (``WRITE_BEHIND=1``).
+    """
+    store: ContextStore = RedisContextStore(redis, retention=retention)
+    if pg_store is not None:
+        if os.getenv("CONTEXT_STORE_REDIS_CACHE", "1") == "1":
+            store = CachedContextStore(pg_store, store)
+        else:
+            store = pg_store
+    if os.getenv("WRITE_BEHIND", "0") == "1":
+        # the pending-write counter in Redis keeps next-turn loads consistent
+        # when the turn lands on another worker
+        store = WriteBehindContextStore(
+            store,
+            max_pending=int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000")),
+            redis=redis,
+            wait_seconds=float(os.getenv("WRITE_BEHIND_WAIT_SECONDS", "5")),
+        )
+    return store
 
-    return AIAgent(ChatOpenAI(model="gpt-3.5-turbo", temperature=0), builder, parser, tools=tools)
+def conversation_state_enabled() -> bool:
+    """``CONVERSATION_STATE=1``: slot state in the prompt instead of most raw history."""
+    return os.getenv("CONVERSATION_STATE", "0") == "1"
+
+def context_store(request: HTTPConnection) -> ContextStore:
+    return request.app.state.context_store
 
 def orchestrator(
-    agent: AIAgent = Depends(ai_agent)
+    agent: AIAgent = Depends(ai_agent),
+    store: ContextStore = Depends(context_store),
 ) -> ChatOrchestrator:
-    redis = redis_pool()
-    store = RedisContextStore(redis)
-    return ChatOrchestrator(agent, store)
+    return ChatOrchestrator(agent, store, use_state=conversation_state_enabled())
 
 def conversation_id_header(
     conversation_id: str | None = Header(
@@ -63,22 +222,107 @@ def conversation_id_header(
 
 @asynccontextmanager
 async def lifespan(app):
-    redis = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    """
+    Runs once per worker process, after the fork, so every pool below is
+    private to the worker that uses it.
+    """
+    redis = redis_pool()
+    cal_client = CalComClient.pooled()
     app.state.redis = redis
+    app.state.cal_client = cal_client
+    result_store = RedisResultStore(redis)
+    app.state.tools = build_tools(cal_client, result_store)
+    # CALCOM_TENANTS_FILE: per-tenant clients + fair upstream scheduling
+    app.state.tenants = tenant_pool_from_env(
+        cal_client, app.state.tools, lambda client: build_tools(client, result_store)
+    )
+    app.state.replica = None
+    background: list[asyncio.Task] = []
+    if os.getenv("BOOKING_REPLICA_ENABLED", "0") == "1":
+        replica = RedisBookingReplica(
+            redis, max_age_seconds=int(os.getenv("BOOKING_REPLICA_MAX_AGE", "300"))
+        )
+        cal_client.replica = replica
+        app.state.replica = replica
+        background.append(asyncio.create_task(replica.run_reconciler(
+            cal_client, float(os.getenv("BOOKING_REPLICA_RECONCILE_SECONDS", "120"))
+        )))
+    app.state.llm = ModelRouter.from_env()     # per-step model tiers
+    app.state.profiler = Profiler.from_env(redis)
+    app.state.inflight = InFlightTracker()
+    pg_store = pg_engine = None
+    if os.getenv("CONTEXT_STORE", "redis") == "postgres":
+        from .pg_context_store import PostgresContextStore, make_engine
+
+        pg_engine = make_engine(
+            os.environ["DATABASE_URL"],
+            pool_size=int(os.getenv("DATABASE_POOL_SIZE", "5")),
+        )
+        pg_store = PostgresContextStore(
+            pg_engine,
+            max_messages=int(os.getenv("HISTORY_TAIL_MESSAGES", "100")),
+        )
+        await pg_store.create_schema()
+    # Redis history caps; with Postgres as the source of truth nothing needs archiving
+    retention = compactor_from_env(redis, 86_400, with_archive=pg_store is None)
+    app.state.retention = retention
+    if retention is not None:
+        background.append(asyncio.create_task(retention.run(
+            float(os.getenv("HISTORY_SWEEP_SECONDS", "300"))
+        )))
+    # shared per worker: write-behind buffers must outlive the request
+    app.state.context_store = build_context_store(redis, pg_store, retention)
+    # encoder, tool schemas, Redis, upstream connections – /ready waits for it
+    app.state.warmup = WarmupState()
+    background.append(asyncio.create_task(warm_up(app, app.state.warmup)))
     try:
-        yield
+        # installed after the server's own handlers, so SIGTERM reaches us first
+        with app.state.inflight.close_on_signals():
+            yield
     finally:
-        await redis.close()
+        for task in background:
+            task.cancel()
+        # let running Cal.com mutations finish before tearing pools down
+        drained = await app.state.inflight.drain(SHUTDOWN_DRAIN_SECONDS)
+        if not drained:
+            logger.warning(
+                "shutdown: %d tool call(s) still running after %.0fs",
+                app.state.inflight.active, SHUTDOWN_DRAIN_SECONDS,
+            )
+        if isinstance(app.state.context_store, WriteBehindContextStore):
+            await app.state.context_store.aclose(SHUTDOWN_DRAIN_SECONDS)
+        await cal_client.aclose()
+        if app.state.tenants is not None:
+            await app.state.tenants.aclose()
+        if pg_engine is not None:
+            await pg_engine.dispose()
+        if retention is not None and retention.archive is not None:
+            retention.archive.close()
+        await redis.aclose()              # also disconnects the pool
 
-async def get_redis(request: Request) -> Redis:
+def is_admin(token: str | None) -> bool:
+    expected = os.getenv("ADMIN_TOKEN")
+    return bool(expected and token and secrets.compare_digest(token, expected))
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """Admin routes need ``X-Admin-Token`` = ``ADMIN_TOKEN``; unset → disabled."""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(404)
+    if not is_admin(x_admin_token):
+        raise HTTPException(403, "Admin token required")
+
+def profile_requested(
+    x_profile: str | None = Header(default=None),
+    x_admin_token: str | None = Header(default=None),
+) -> bool:
+    """``X-Profile: 1`` counts only from admins; others are sampled at most."""
+    return x_profile == "1" and is_admin(x_admin_token)
+
+def get_profiler(request: HTTPConnection) -> Profiler:
+    return request.app.state.profiler
+
+async def get_redis(request: HTTPConnection) -> Redis:
     return request.app.state.redis            # already set in lifespan()
 
 async def get_rate_limiter(redis: Redis = Depends(get_redis)):
     return RedisRateLimiter(redis)
-
-async def enforce_rate_limit(
-    cid: str = Depends(conversation_id_header),
-    limiter: RedisRateLimiter = Depends(get_rate_limiter),
-):
-    if not await limiter.allow(cid):
-        raise HTTPException(429, "Rate limit exceeded")
\ No newline at end of file
@@ -0,0 +1,99 @@
+# app/fake_llm.py
+"""
+Offline chat model for tests and benchmarks (``LLM_BACKEND=fake``).
+
+Returns scripted ``AIMessage`` replies (or the result of a callable) and can
+simulate latency, so agent loops can be exercised without OpenAI.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field, PrivateAttr
+
+Reply = Union[AIMessage, str, Callable[[List[BaseMessage]], AIMessage]]
+Latency = Union[float, Callable[[int], float]]
+
+
+def echo_reply(messages: List[BaseMessage]) -> AIMessage:
+    last = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    return AIMessage(content=f"(fake) {last.content if last else ''}")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Parameters
+    ----------
+    responses :
+        Replies handed out in order (cycled when ``cycle=True``). Each item is
+        an ``AIMessage``, a plain string, or ``f(messages) -> AIMessage``.
+        Empty → echo the last human message.
+    latency :
+        Seconds to wait per call, or ``f(call_index) -> seconds``.
+    """
+
+    # typed Any so pydantic keeps the objects as given (see Reply / Latency)
+    responses: Sequence[Any] = Field(default_factory=list)
+    latency: Any = 0.0
+    cycle: bool = False
+    model_name: str = "fake"
+
+    _calls: int = PrivateAttr(default=0)
+    _script: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        source = self.responses or [echo_reply]
+        self._script = itertools.cycle(source) if self.cycle or not self.responses else iter(source)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def _next(self, messages: List[BaseMessage]) -> ChatResult:
+        try:
+            reply = next(self._script)
+        except StopIteration:
+            raise RuntimeError("ScriptedChatModel ran out of scripted responses")
+        if callable(reply):
+            reply = reply(messages)
+        elif isinstance(reply, str):
+            reply = AIMessage(content=reply)
+        return ChatResult(generations=[ChatGeneration(message=reply.model_copy())])
+
+    def _delay(self) -> float:
+        self._calls += 1
+        return self.latency(self._calls - 1) if callable(self.latency) else self.latency
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._delay())
+        return self._next(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._next(messages)
@@ -0,0 +1,113 @@
+# app/free_slots.py
+"""
+Common free time across attendees, computed on a one-minute grid.
+
+Busy intervals of every attendee are painted onto one grid with a
+difference array (``np.add.at`` + ``cumsum``), working hours are applied as
+a mask, and every step-aligned start whose next ``duration`` minutes are
+all free is a candidate (sliding-window sum over the free mask).
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, time, timedelta, timezone
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .utils import get_zone
+
+Interval = Tuple[datetime, datetime]
+
+MAX_RANGE_DAYS = 31
+
+
+def _minute(dt: datetime, origin: datetime, *, ceil: bool = False) -> int:
+    minutes = (dt - origin).total_seconds() / 60
+    return math.ceil(minutes) if ceil else math.floor(minutes)
+
+
+def busy_mask(busy: Iterable[Interval], origin: datetime, n: int) -> np.ndarray:
+    """True for every grid minute covered by at least one busy interval."""
+    pairs = np.array(
+        [(_minute(s, origin), _minute(e, origin, ceil=True)) for s, e in busy],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    pairs = np.clip(pairs, 0, n)
+    pairs = pairs[pairs[:, 0] < pairs[:, 1]]
+    delta = np.zeros(n + 1, dtype=np.int32)
+    np.add.at(delta, pairs[:, 0], 1)
+    np.add.at(delta, pairs[:, 1], -1)
+    return np.cumsum(delta[:-1]) > 0
+
+
+def working_mask(
+    origin: datetime,
+    n: int,
+    tz_name: str,
+    day_start: time,
+    day_end: time,
+    weekdays_only: bool,
+) -> np.ndarray:
+    """True for grid minutes inside local working hours (DST-aware, per day)."""
+    zone = get_zone(tz_name)
+    mask = np.zeros(n, dtype=bool)
+    day = origin.astimezone(zone).date()
+    last = (origin + timedelta(minutes=n)).astimezone(zone).date()
+    while day <= last:
+        if not weekdays_only or day.weekday() < 5:
+            lo = datetime.combine(day, day_start, zone)
+            hi = datetime.combine(day, day_end, zone)
+            mask[max(_minute(lo, origin), 0):max(_minute(hi, origin), 0)] = True
+        day += timedelta(days=1)
+    return mask
+
+
+def find_free_slots(
+    busy: Sequence[Interval],
+    range_start: datetime,
+    range_end: datetime,
+    duration_minutes: int = 30,
+    step_minutes: int = 30,
+    tz_name: str = "UTC",
+    day_start: time = time(9),
+    day_end: time = time(17),
+    weekdays_only: bool = True,
+    limit: int = 5,
+    per_day: int = 3,
+) -> List[Interval]:
+    """
+    Earliest ``limit`` slots of ``duration_minutes`` in ``[range_start,
+    range_end)`` that overlap no busy interval, start on a ``step_minutes``
+    boundary and lie within working hours; at most ``per_day`` per local day
+    so the suggestions are spread out.
+    """
+    origin = range_start.astimezone(timezone.utc).replace(second=0, microsecond=0)
+    # align the grid so slots start on :00 / :30 etc.
+    origin += timedelta(minutes=-origin.minute % step_minutes)
+    n = _minute(range_end.astimezone(timezone.utc), origin)
+    if n < duration_minutes:
+        return []
+
+    free = working_mask(origin, n, tz_name, day_start, day_end, weekdays_only)
+    free &= ~busy_mask(busy, origin, n)
+
+    # window [i, i + d) is free  ⇔  free-minute count over it == d
+    counts = np.concatenate(([0], np.cumsum(free, dtype=np.int32)))
+    d = duration_minutes
+    fits = (counts[d:] - counts[:-d]) == d
+    starts = np.flatnonzero(fits[::step_minutes]) * step_minutes
+
+    zone = get_zone(tz_name)
+    slots: List[Interval] = []
+    taken: dict = {}
+    for minute in starts.tolist():
+        start = origin + timedelta(minutes=minute)
+        local_day = start.astimezone(zone).date()
+        if taken.get(local_day, 0) >= per_day:
+            continue
+        taken[local_day] = taken.get(local_day, 0) + 1
+        slots.append((start, start + timedelta(minutes=d)))
+        if len(slots) >= limit:
+            break
+    return slots
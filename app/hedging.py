@@ -0,0 +1,105 @@
+# app/hedging.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict
+
+from langchain_core.language_models import BaseChatModel
+
+
+class HedgedInvoker:
+    """
+    Tail-latency hedging for ``ainvoke``.
+
+    If a call has not returned after the ``percentile`` latency seen so far,
+    an identical second call is started; whichever finishes first wins and
+    the other is cancelled. Hedges are capped at ``budget`` × requests so the
+    extra load stays bounded (e.g. 0.05 → at most ~5 % more calls).
+
+    Each attempt keeps the model client's own timeout / retry policy
+    (``LLM_TIMEOUT`` / ``LLM_MAX_RETRIES``); the hedge delay is clamped to
+    ``max_delay`` so a hedge is always sent well before that timeout fires.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        budget: float = 0.05,
+        initial_delay: float = 3.0,
+        min_delay: float = 0.25,
+        max_delay: float = 10.0,
+        window: int = 500,
+        min_samples: int = 20,
+    ) -> None:
+        self.percentile = percentile
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    # --------------------------------------------------------------------- #
+    # public API
+    # --------------------------------------------------------------------- #
+    def delay(self) -> float:
+        """Current hedge delay: the configured percentile of recent latencies."""
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(self._latencies)
+        value = ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
+        return min(max(value, self.min_delay), self.max_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0,
+            "delay_seconds": round(self.delay(), 3),
+        }
+
+    async def ainvoke(self, llm: BaseChatModel, *args: Any, **kwargs: Any) -> Any:
+        self.requests += 1
+        started = time.monotonic()
+        tasks = [asyncio.create_task(llm.ainvoke(*args, **kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay())
+            if done or not self._budget_allows():
+                winner = tasks[0]
+                await winner
+            else:
+                self.hedges += 1
+                tasks.append(asyncio.create_task(llm.ainvoke(*args, **kwargs)))
+                winner = await self._first_success(*tasks)
+                if winner is tasks[1]:
+                    self.hedge_wins += 1
+        finally:
+            for task in tasks:          # loser, or everything if we were cancelled
+                task.cancel()
+        self._latencies.append(time.monotonic() - started)
+        return winner.result()
+
+    # --------------------------------------------------------------------- #
+    # helpers
+    # --------------------------------------------------------------------- #
+    def _budget_allows(self) -> bool:
+        return self.hedges + 1 <= max(1.0, self.budget * self.requests)
+
+    @staticmethod
+    async def _first_success(primary: asyncio.Task, hedge: asyncio.Task) -> asyncio.Task:
+        """First task to succeed; if both fail, re-raise the primary's error."""
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    return task
+        primary.result()        # raises
+        return hedge            # pragma: no cover – primary cannot succeed here
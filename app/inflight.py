@@ -0,0 +1,89 @@
+# app/inflight.py
+from __future__ import annotations
+
+import asyncio
+import signal
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+
+class InFlightTracker:
+    """
+    Counts in-flight tool calls so shutdown can wait for them.
+
+    Cal.com mutations (create / cancel / reschedule) must not be cut in half
+    when a worker is stopped, so ``lifespan`` calls ``drain`` before closing
+    the connection pools the tools depend on.
+
+    ``drain`` only runs once the server has stopped accepting and waited for
+    open requests, so ``lifespan`` also wraps the app in ``close_on_signals``:
+    SIGTERM flips ``closing`` right away – ``/ready`` turns 503 and no new
+    tool call starts while requests are still being finished.
+    """
+
+    def __init__(self) -> None:
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        """Refuse new tool calls from now on."""
+        self._closing = True
+
+    @contextmanager
+    def close_on_signals(self, *signals: int) -> Iterator[None]:
+        """
+        Call ``close`` on ``signals`` (default SIGTERM, SIGINT), then the
+        handler that was installed before – the server's own shutdown.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield                 # signal handlers only work in the main thread
+            return
+        previous = {}
+
+        def handle(sig, frame):
+            self.close()
+            handler = previous.get(sig)
+            if callable(handler):
+                handler(sig, frame)
+            elif handler == signal.SIG_DFL:
+                signal.signal(sig, handler)
+                signal.raise_signal(sig)
+
+        for sig in signals or (signal.SIGTERM, signal.SIGINT):
+            previous[sig] = signal.signal(sig, handle)
+        try:
+            yield
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        self._active += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if self._active == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait until nothing is in flight. Returns False on timeout."""
+        self.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
@@ -0,0 +1,76 @@
+# app/jsonio.py
+"""
+One JSON layer for the whole request path.
+
+Uses orjson when it is installed and the stdlib otherwise (or when
+``JSON_BACKEND=json``). Output is always compact UTF-8; Pydantic models,
+datetimes and sets are serialized without a manual ``model_dump`` first.
+
+    from app import jsonio
+    jsonio.dumps(obj) -> str      jsonio.dumpb(obj) -> bytes
+    jsonio.loads(str | bytes)     jsonio.tool_content(result) -> str
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Callable, Dict, NamedTuple
+
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+class Backend(NamedTuple):
+    name: str
+    dumps: Callable[[Any], str]
+    dumpb: Callable[[Any], bytes]
+    loads: Callable[[Any], Any]
+
+
+def _stdlib() -> Backend:
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+    return Backend("json", dumps, lambda obj: dumps(obj).encode(), json.loads)
+
+
+def _orjson() -> Backend | None:
+    try:
+        import orjson
+    except ImportError:
+        return None
+
+    def dumpb(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default)
+
+    return Backend("orjson", lambda obj: dumpb(obj).decode(), dumpb, orjson.loads)
+
+
+BACKENDS: Dict[str, Backend] = {
+    b.name: b for b in (_orjson(), _stdlib()) if b is not None
+}
+backend = BACKENDS.get(os.getenv("JSON_BACKEND", "orjson"), BACKENDS["json"])
+
+dumps = backend.dumps
+dumpb = backend.dumpb
+loads = backend.loads
+
+
+def tool_content(result: Any) -> str:
+    """ToolMessage content: strings as-is, everything else compact JSON."""
+    if isinstance(result, str):
+        return result
+    try:
+        return dumps(result)
+    except TypeError:
+        return str(result)
@@ -0,0 +1,75 @@
+# app/keys.py
+"""
+Redis keyspace.
+
+Everything lives under ``REDIS_NAMESPACE`` (default ``cb``). Per-conversation
+keys share the hash tag ``{<cid>}``, so a conversation's history, state
+and rate counters sit on one Redis Cluster slot and can be read and written
+in one pipeline:
+
+    cb:{<cid>}:hist          list, one JSON message per item (``RedisContextStore``)
+    cb:{<cid>}:hbytes        running byte size of ``hist`` (``app.retention``)
+    cb:{<cid>}:compact       compaction lock
+    cb:{<cid>}:state         ``ConversationState`` JSON
+    cb:{<cid>}:pending       messages queued by write-behind, not yet saved
+    cb:{<cid>}:rate:<n>      request counter for window ``n``
+    cb:toolres:<ref>         stored full tool results (``RedisResultStore``)
+    cb:retention:lock        one retention sweep at a time
+    cb:{prof}:…              request profiles (``app.profiling``)
+    cb:{bk}:…                booking replica – one slot, because its updates
+                             are multi-key transactions
+"""
+from __future__ import annotations
+
+import os
+
+NAMESPACE = os.getenv("REDIS_NAMESPACE", "cb")
+
+
+def _tag(value: str) -> str:
+    # braces inside the id would change which part Redis hashes
+    return value.replace("{", "(").replace("}", ")")
+
+
+def conversation(cid: str) -> str:
+    return f"{NAMESPACE}:{{{_tag(cid)}}}"
+
+
+def history(cid: str) -> str:
+    return f"{conversation(cid)}:hist"
+
+
+def history_bytes(cid: str) -> str:
+    return f"{conversation(cid)}:hbytes"
+
+
+def compact_lock(cid: str) -> str:
+    return f"{conversation(cid)}:compact"
+
+
+def state(cid: str) -> str:
+    return f"{conversation(cid)}:state"
+
+
+def pending_writes(cid: str) -> str:
+    return f"{conversation(cid)}:pending"
+
+
+def rate(cid: str, window: int) -> str:
+    return f"{conversation(cid)}:rate:{window}"
+
+
+def tool_result(ref: str) -> str:
+    return f"{NAMESPACE}:toolres:{ref}"
+
+
+def retention_lock() -> str:
+    return f"{NAMESPACE}:retention:lock"
+
+
+def profile(*parts: str) -> str:
+    return ":".join((f"{NAMESPACE}:{{prof}}",) + parts)
+
+
+def replica(*parts: str) -> str:
+    return ":".join((f"{NAMESPACE}:{{bk}}",) + parts)
@@ -1,27 +1,225 @@
 
-from fastapi import FastAPI, Depends, Header
+import logging
+import os
+import uuid
+
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+from pydantic import ValidationError
+from . import jsonio
+from .agents import AIAgent
+from .booking_replica import verify_signature
+from .context_store import ContextStore
 from .models import ChatRequest, ChatResponse
-from .di import orchestrator, conversation_id_header, enforce_rate_limit, lifespan
-from .orchestrator import ChatOrchestrator
+from .di import (
+    ai_agent,
+    context_store,
+    conversation_id_header,
+    conversation_state_enabled,
+    get_profiler,
+    get_rate_limiter,
+    lifespan,
+    orchestrator,
+    profile_requested,
+    require_admin,
+    resolve_tenant,
+    tenant_client,
+)
+from .orchestrator import ChatOrchestrator, ChatSession
+from .profiling import Profiler
+from .rate_limiter import RateLimitExceeded, RedisRateLimiter
+from .tenants import TenantClient, UnknownTenant
 from dotenv import load_dotenv
 from pathlib import Path
 
 # Load .env from the project root directory
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
+logger = logging.getLogger(__name__)
+
+
+class FastJSONResponse(JSONResponse):
+    """For routes without a response_model (those are already serialized by Pydantic)."""
+
+    def render(self, content) -> bytes:
+        return jsonio.dumpb(content)
+
+
 app = FastAPI(lifespan=lifespan)
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(
     req: ChatRequest,
+    response: Response,
     cid: str = Depends(conversation_id_header),
     orch: ChatOrchestrator = Depends(orchestrator),
-    enforce_rate_limit_result=Depends(enforce_rate_limit)
+    limiter: RedisRateLimiter = Depends(get_rate_limiter),
+    profiler: Profiler = Depends(get_profiler),
+    profile: bool = Depends(profile_requested),
 ):
-    reply, cid = await orch.handle(req.message, cid, req.email)
+    # X-Profile: 1 (admin) or PROFILE_SAMPLE_RATE → timeline + cProfile
+    async with profiler.maybe_profile("/chat", cid, profile) as prof:
+        if prof is not None:
+            response.headers["X-Profile-Id"] = prof.id
+        # rate check + history load share one Redis round trip
+        try:
+            reply, cid = await orch.handle(
+                req.message, cid, req.email, req.time_zone, limiter=limiter
+            )
+        except RateLimitExceeded:
+            raise HTTPException(429, "Rate limit exceeded")
     return ChatResponse(conversation_id=cid, reply=reply)
 
 
+@app.get("/ready", response_class=FastJSONResponse)
+async def ready(request: Request):
+    """Readiness probe: 200 once warm-up is done, 503 before that and while shutting down."""
+    state = request.app.state
+    closing = state.inflight.closing
+    body = {**state.warmup.report(), "closing": closing}
+    return FastJSONResponse(body, status_code=200 if state.warmup.ready and not closing else 503)
+
+
+@app.get("/admin/memory", response_class=FastJSONResponse, dependencies=[Depends(require_admin)])
+async def memory_stats(request: Request, cid: str | None = None):
+    """Retention counters, last sweep's Redis memory per conversation, archive size."""
+    retention = request.app.state.retention
+    if retention is None:
+        raise HTTPException(404, "History retention is disabled (HISTORY_RETENTION=0)")
+    if cid is not None:
+        return await retention.conversation_memory(cid)
+    return await retention.stats()
+
+
+@app.get("/admin/tenants", response_class=FastJSONResponse, dependencies=[Depends(require_admin)])
+async def tenant_stats(request: Request):
+    """Pooled tenant clients and the upstream scheduler's queues."""
+    tenants = request.app.state.tenants
+    if tenants is None:
+        raise HTTPException(404, "Multi-tenant mode is off (CALCOM_TENANTS_FILE unset)")
+    return tenants.stats()
+
+
+@app.get("/admin/profiles", response_class=FastJSONResponse, dependencies=[Depends(require_admin)])
+async def list_profiles(profiler: Profiler = Depends(get_profiler)):
+    """Newest profiled requests: total time and the llm/tool/redis/cpu breakdown."""
+    return await profiler.list()
+
+
+@app.get("/admin/profiles/{profile_id}", response_class=FastJSONResponse,
+         dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, profiler: Profiler = Depends(get_profiler)):
+    """Span timeline and top functions of one request."""
+    data = await profiler.get(profile_id)
+    if data is None:
+        raise HTTPException(404, "Unknown or expired profile")
+    return data
+
+
+@app.get("/admin/profiles/{profile_id}/pstats", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str, profiler: Profiler = Depends(get_profiler)):
+    """cProfile stats file (``python -m pstats`` / snakeviz)."""
+    data = await profiler.pstats_file(profile_id)
+    if data is None:
+        raise HTTPException(404, "No cProfile data for this profile")
+    return Response(
+        data, media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+    )
+
+
+@app.get("/admin/llm", response_class=FastJSONResponse, dependencies=[Depends(require_admin)])
+async def llm_stats(request: Request):
+    """Model-tier picks and hedging counters of this worker."""
+    return request.app.state.llm.stats()
+
+
+@app.websocket("/ws/chat")
+async def chat_ws(
+    websocket: WebSocket,
+    agent: AIAgent = Depends(ai_agent),
+    store: ContextStore = Depends(context_store),
+    limiter: RedisRateLimiter = Depends(get_rate_limiter),
+    tenant: TenantClient | None = Depends(tenant_client),
+):
+    """
+    Long-lived chat connection; history stays in memory between turns.
+
+    Client → ``{"message", "email", "time_zone"?}`` (same as ``/chat``).
+    In multi-tenant mode the tenant is fixed at the handshake (connect with
+    ``?email=``); a message whose e-mail belongs to another tenant gets a
+    403 ``error`` – reconnect with that e-mail instead.
+    Server → ``ready`` once, then per turn any number of ``token`` /
+    ``tool_call`` / ``tool_result`` events and a final ``reply`` (or
+    ``error``).
+    """
+    cid = (
+        websocket.query_params.get("conversation_id")
+        or websocket.headers.get("conversation-id")
+        or str(uuid.uuid4())
+    )
+    await websocket.accept()
+    tier = websocket.app.state.llm.fast
+    session = ChatSession(
+        agent, store, cid, tier.max_prompt_tokens, tier.model,
+        use_state=conversation_state_enabled(),
+    )
+    await session.open()
+    await websocket.send_text(jsonio.dumps({"type": "ready", "conversation_id": cid}))
+
+    async def emit(event: dict) -> None:
+        await websocket.send_text(jsonio.dumps(event))
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                req = ChatRequest.model_validate_json(raw)
+            except ValidationError as exc:
+                await emit({"type": "error", "status": 422, "detail": str(exc)})
+                continue
+            if tenant is not None and _message_tenant(websocket, req.email) != tenant.tenant:
+                await emit({"type": "error", "status": 403,
+                            "detail": "E-mail belongs to another tenant than this connection"})
+                continue
+            if not await limiter.allow(cid):
+                await emit({"type": "error", "status": 429, "detail": "Rate limit exceeded"})
+                continue
+            try:
+                reply = await session.turn(req.message, req.email, req.time_zone, emit)
+            except Exception:  # noqa: BLE001 – keep the connection usable
+                logger.exception("ws turn failed for %s", cid)
+                await emit({"type": "error", "status": 500, "detail": "Internal error"})
+                continue
+            await emit({"type": "reply", "conversation_id": cid, "reply": reply})
+    except WebSocketDisconnect:
+        pass
+
+
+def _message_tenant(websocket: WebSocket, email: str) -> str | None:
+    try:
+        return resolve_tenant(websocket, email)
+    except UnknownTenant:
+        return None
+
+
+@app.post("/webhooks/calcom", response_class=FastJSONResponse)
+async def calcom_webhook(
+    request: Request,
+    signature: str | None = Header(default=None, alias="X-Cal-Signature-256"),
+):
+    """BOOKING_CREATED / CANCELLED / RESCHEDULED → local booking replica."""
+    replica = request.app.state.replica
+    secret = os.getenv("CALCOM_WEBHOOK_SECRET")
+    if replica is None or not secret:
+        raise HTTPException(503, "Booking replica is not enabled")
+    body = await request.body()
+    if not verify_signature(secret, body, signature):
+        raise HTTPException(401, "Invalid signature")
+    handled = await replica.apply_webhook(jsonio.loads(body))
+    return {"ok": True, "event": handled}
+
+
 """
 curl -X POST http://localhost:8000/chat \
   -H "Content-Type: application/json" \
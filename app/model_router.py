@@ -0,0 +1,129 @@
+# app/model_router.py
+from __future__ import annotations
+
+import os
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+
+from .hedging import HedgedInvoker
+
+
+@dataclass
+class ModelTier:
+    """One configured chat model plus what ``prune_history`` needs to know."""
+
+    name: str                       # "fast" | "strong"
+    llm: BaseChatModel
+    model: str                      # model id, selects the token encoder
+    max_prompt_tokens: int = 12_000
+    hedger: HedgedInvoker | None = None
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> AIMessage:
+        if self.hedger is None:
+            return await self.llm.ainvoke(*args, **kwargs)
+        return await self.hedger.ainvoke(self.llm, *args, **kwargs)
+
+
+def _needs_recovery(tool_messages: Sequence[ToolMessage]) -> bool:
+    """Did the last tool round fail or come back ambiguous?"""
+    for msg in tool_messages:
+        if str(msg.content).lstrip().startswith("[error]"):
+            return True
+        artifact = msg.artifact
+        if isinstance(artifact, dict) and (
+            artifact.get("ok") is False or artifact.get("ambiguous")
+        ):
+            return True
+        if getattr(artifact, "ok", True) is False:          # BookingResult
+            return True
+    return False
+
+
+class ModelRouter:
+    """
+    Picks the chat model for each ``AIAgent`` loop.
+
+    The fast tier handles slot extraction and tool-call generation; the
+    strong tier (if configured) only takes the loop right after a tool
+    round that failed or came back ambiguous.
+    """
+
+    def __init__(self, fast: ModelTier, strong: ModelTier | None = None) -> None:
+        self.fast = fast
+        self.strong = strong
+        self.picks: Counter[str] = Counter()
+
+    @classmethod
+    def single(cls, llm: BaseChatModel) -> "ModelRouter":
+        model = getattr(llm, "model_name", None) or "gpt-3.5-turbo"
+        return cls(ModelTier("fast", llm, model))
+
+    def pick(self, last_tool_messages: Sequence[ToolMessage] = ()) -> ModelTier:
+        tier = self.fast
+        if self.strong is not None and _needs_recovery(last_tool_messages):
+            tier = self.strong
+        self.picks[tier.name] += 1
+        return tier
+
+    def stats(self) -> Dict[str, Any]:
+        tiers = [t for t in (self.fast, self.strong) if t is not None]
+        return {
+            "picks": dict(self.picks),
+            "hedging": {t.name: t.hedger.stats() for t in tiers if t.hedger is not None},
+        }
+
+    # ------------------------------------------------------------------ #
+    # configuration
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """
+        ``LLM_BACKEND``         openai (default) | fake
+        ``LLM_MODEL_FAST``      default gpt-3.5-turbo
+        ``LLM_MODEL_STRONG``    optional; unset → single tier
+        ``LLM_MAX_PROMPT_TOKENS_FAST`` / ``_STRONG``
+        ``LLM_TIMEOUT`` / ``LLM_MAX_RETRIES``
+        ``LLM_HEDGE``           1 → hedge slow calls (see ``HedgedInvoker``)
+        ``LLM_HEDGE_PERCENTILE`` / ``LLM_HEDGE_BUDGET`` / ``LLM_HEDGE_INITIAL_DELAY``
+        """
+        fast = _tier_from_env("fast", os.getenv("LLM_MODEL_FAST", "gpt-3.5-turbo"))
+        strong_model = os.getenv("LLM_MODEL_STRONG")
+        strong = _tier_from_env("strong", strong_model) if strong_model else None
+        return cls(fast, strong)
+
+
+def _hedger_from_env(timeout: float) -> HedgedInvoker | None:
+    if os.getenv("LLM_HEDGE", "0") != "1":
+        return None
+    return HedgedInvoker(
+        percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+        budget=float(os.getenv("LLM_HEDGE_BUDGET", "0.05")),
+        initial_delay=float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "3")),
+        # hedge well before the per-attempt timeout would fire
+        max_delay=max(timeout / 2, 0.5),
+    )
+
+
+def _tier_from_env(name: str, model: str) -> ModelTier:
+    max_prompt = int(os.getenv(f"LLM_MAX_PROMPT_TOKENS_{name.upper()}", "12000"))
+    timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+    hedger = _hedger_from_env(timeout)
+    if os.getenv("LLM_BACKEND", "openai") == "fake":
+        from .fake_llm import ScriptedChatModel
+
+        llm = ScriptedChatModel(model_name=model)
+        return ModelTier(name, llm, model, max_prompt, hedger)
+
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(
+        model=model,
+        temperature=0,
+        timeout=timeout,
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+    )
+    return ModelTier(name, llm, model, max_prompt, hedger)
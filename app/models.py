@@ -1,11 +1,27 @@
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
+from zoneinfo import ZoneInfoNotFoundError
+
+from .utils import get_zone
 
 class ChatRequest(BaseModel):
     conversation_id: Optional[str] = Field(None, description="Client session id")
     email: str
     message: str
+    time_zone: Optional[str] = Field(
+        None, description="IANA zone for times shown to the user, e.g. 'Europe/Paris'"
+    )
+
+    @field_validator("time_zone")
+    @classmethod
+    def _known_zone(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None:
+            try:
+                get_zone(v)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"unknown time zone: {v!r}")
+        return v
 
 class ChatResponse(BaseModel):
     conversation_id: str
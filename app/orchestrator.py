@@ -1,18 +1,159 @@
+import asyncio
+from typing import List, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from .context_store import ContextStore, RedisContextStore
+from .conversation_state import ConversationState
+from .profiling import span
+from .rate_limiter import RateLimitExceeded, RedisRateLimiter
+from .agents import AIAgent, EventSink
+from .utils import num_tokens
+
+
+async def load_state(store: ContextStore, cid: str) -> ConversationState:
+    data = await store.load_state(cid)
+    return ConversationState.model_validate(data) if data else ConversationState()
 
-from typing import Tuple
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
-from .context_store import RedisContextStore
-from .agents import AIAgent
 
 class ChatOrchestrator:
-    def __init__(self, agent: AIAgent, context_store: RedisContextStore):
+    """
+    ``use_state=True`` keeps a ``ConversationState`` next to the history.
+
+    Given a ``limiter``, the rate check runs in the same Redis pipeline as
+    the history (and state) load when the store is a plain
+    ``RedisContextStore`` – one round trip per request; otherwise the two
+    run concurrently.
+    """
+
+    def __init__(self, agent: AIAgent, context_store: ContextStore, use_state: bool = False):
         self.agent = agent
         self.context_store = context_store
+        self.use_state = use_state
 
-    async def handle(self, user_msg: str, cid: str, email: str) -> Tuple[str, str]:
-        history = await self.context_store.load(cid)
-        reply = await self.agent.reply(user_msg, history)
-        history.append(HumanMessage(content=user_msg))
-        history.append(AIMessage(content=reply))
-        await self.context_store.save(cid, history)
+    async def handle(
+        self,
+        user_msg: str,
+        cid: str,
+        email: str,
+        time_zone: str | None = None,
+        limiter: RedisRateLimiter | None = None,
+    ) -> Tuple[str, str]:
+        """Raises ``RateLimitExceeded`` before doing any work if over the limit."""
+        async with span("redis", "admit_and_load"):
+            history, state = await self._admit_and_load(cid, limiter)
+        if state is not None:
+            before = state.model_dump()
+            state.note_request(email, time_zone)
+        reply = await self.agent.reply(
+            user_msg, history, time_zone=time_zone, email=email, state=state
+        )
+        # stores append, so hand over only this turn
+        async with span("redis", "save"):
+            await self.context_store.save(
+                cid, [HumanMessage(content=user_msg), AIMessage(content=reply)]
+            )
+            if state is not None and state.model_dump() != before:
+                await self.context_store.save_state(cid, state.model_dump(exclude_none=True))
         return reply, cid
+
+    async def _admit_and_load(
+        self, cid: str, limiter: RedisRateLimiter | None
+    ) -> Tuple[List[BaseMessage], Optional[ConversationState]]:
+        store = self.context_store
+        if limiter is not None and isinstance(store, RedisContextStore):
+            pipe = store.redis.pipeline(transaction=False)
+            limiter.stage(pipe, cid)
+            store.stage_load(pipe, cid, with_state=self.use_state)
+            replies = await pipe.execute()
+            if not limiter.verdict(replies[:limiter.STAGED]):
+                raise RateLimitExceeded(cid)
+            loaded = replies[limiter.STAGED:]
+            history = await store.backfill(cid, store.parse_history(loaded[0]))
+            state = None
+            if self.use_state:
+                state = ConversationState.model_validate_json(loaded[1]) if loaded[1] else ConversationState()
+            return history, state
+
+        loads = [store.load(cid)]
+        if self.use_state:
+            loads.append(load_state(store, cid))
+        if limiter is not None:
+            loads.append(limiter.allow(cid))
+        results = await asyncio.gather(*loads)
+        if limiter is not None and not results.pop():
+            raise RateLimitExceeded(cid)
+        return results[0], (results[1] if self.use_state else None)
+
+
+class ChatSession:
+    """
+    One WebSocket connection's view of a conversation.
+
+    History is loaded once in ``open`` and then kept in memory, trimmed to
+    ``max_tokens`` (oldest turns dropped first); each turn only appends its
+    two new messages to the store. Writes to the same conversation from
+    elsewhere (``/chat``, another socket) are not seen until reconnect.
+    """
+
+    def __init__(
+        self,
+        agent: AIAgent,
+        context_store: ContextStore,
+        cid: str,
+        max_tokens: int = 12_000,
+        model: str = "gpt-3.5-turbo",
+        use_state: bool = False,
+    ):
+        self.agent = agent
+        self.context_store = context_store
+        self.cid = cid
+        self.max_tokens = max_tokens
+        self.model = model
+        self.use_state = use_state
+        self.state: ConversationState | None = None
+        self.history: List[BaseMessage] = []
+        self._tokens: List[int] = []
+
+    @property
+    def tokens(self) -> int:
+        return sum(self._tokens)
+
+    async def open(self) -> None:
+        self.history = []
+        self._tokens = []
+        self._append(await self.context_store.load(self.cid))
+        if self.use_state:
+            self.state = await load_state(self.context_store, self.cid)
+
+    async def turn(
+        self,
+        user_msg: str,
+        email: str,
+        time_zone: str | None = None,
+        on_event: EventSink | None = None,
+    ) -> str:
+        before = None
+        if self.state is not None:
+            before = self.state.model_dump()
+            self.state.note_request(email, time_zone)
+        reply = await self.agent.reply(
+            user_msg, self.history, time_zone=time_zone, email=email,
+            on_event=on_event, state=self.state,
+        )
+        delta = [HumanMessage(content=user_msg), AIMessage(content=reply)]
+        await self.context_store.save(self.cid, delta)
+        if self.state is not None and self.state.model_dump() != before:
+            await self.context_store.save_state(self.cid, self.state.model_dump(exclude_none=True))
+        self._append(delta)
+        return reply
+
+    def _append(self, messages: List[BaseMessage]) -> None:
+        self.history.extend(messages)
+        self._tokens.extend(num_tokens(m, self.model) for m in messages)
+        total = sum(self._tokens)
+        drop = 0
+        while total > self.max_tokens and drop < len(self.history) - 2:
+            total -= self._tokens[drop]
+            drop += 1
+        if drop:
+            del self.history[:drop]
+            del self._tokens[:drop]
@@ -0,0 +1,122 @@
+# app/pg_context_store.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from .utils import num_tokens
+
+metadata = MetaData()
+
+# one row per message; (cid, seq) is both the identity and the tail index
+chat_messages = Table(
+    "chat_messages",
+    metadata,
+    Column("cid", String(255), primary_key=True),
+    Column("seq", Integer, primary_key=True),
+    Column("message", JSONB, nullable=False),   # langchain messages_to_dict item
+    Column("tokens", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+# one row per conversation: the ConversationState slots
+chat_state = Table(
+    "chat_state",
+    metadata,
+    Column("cid", String(255), primary_key=True),
+    Column("state", JSONB, nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), onupdate=func.now()),
+)
+
+
+def make_engine(url: str, pool_size: int = 5) -> AsyncEngine:
+    """Async engine for ``postgresql+asyncpg://…`` – one per worker."""
+    return create_async_engine(url, pool_size=pool_size, pool_pre_ping=True)
+
+
+class PostgresContextStore:
+    """
+    Conversation history in Postgres, one row per message.
+
+    * ``save`` appends all new messages of a turn in one batched INSERT.
+    * ``load`` only reads the newest ``max_messages`` rows and stops at
+      ``max_tokens`` (running sum of the stored per-message token counts),
+      so long conversations never have to be read in full.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        max_messages: int = 100,
+        max_tokens: int = 12_000,
+    ):
+        self.engine = engine
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+
+    async def create_schema(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+
+    async def save(self, cid: str, messages: List[BaseMessage]) -> None:
+        if not messages:
+            return
+        async with self.engine.begin() as conn:
+            # serialise appends per conversation so seq numbers never collide
+            await conn.execute(select(func.pg_advisory_xact_lock(func.hashtext(cid))))
+            last = await conn.scalar(
+                select(func.coalesce(func.max(chat_messages.c.seq), -1))
+                .where(chat_messages.c.cid == cid)
+            )
+            rows = [
+                {"cid": cid, "seq": last + 1 + i, "message": data, "tokens": num_tokens(msg)}
+                for i, (msg, data) in enumerate(zip(messages, messages_to_dict(messages)))
+            ]
+            await conn.execute(chat_messages.insert(), rows)
+
+    async def load(self, cid: str) -> List[BaseMessage]:
+        # newest N rows via the (cid, seq) index, then a running token sum
+        # over just those rows
+        tail = (
+            select(chat_messages.c.seq, chat_messages.c.message, chat_messages.c.tokens)
+            .where(chat_messages.c.cid == cid)
+            .order_by(chat_messages.c.seq.desc())
+            .limit(self.max_messages)
+            .subquery()
+        )
+        running = func.sum(tail.c.tokens).over(order_by=tail.c.seq.desc()).label("running")
+        budgeted = select(tail.c.seq, tail.c.message, running).subquery()
+        stmt = (
+            select(budgeted.c.message)
+            .where(budgeted.c.running <= self.max_tokens)
+            .order_by(budgeted.c.seq)
+        )
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(stmt)).scalars().all()
+        return messages_from_dict(list(rows))
+
+    async def load_state(self, cid: str) -> Optional[Dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            return await conn.scalar(select(chat_state.c.state).where(chat_state.c.cid == cid))
+
+    async def save_state(self, cid: str, state: Dict[str, Any]) -> None:
+        stmt = insert(chat_state).values(cid=cid, state=state)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[chat_state.c.cid],
+            set_={"state": stmt.excluded.state, "updated_at": func.now()},
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(stmt)
@@ -0,0 +1,234 @@
+# app/profiling.py
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries ``X-Profile: 1`` together with a valid
+``X-Admin-Token``, or when it falls into the ``PROFILE_SAMPLE_RATE``
+sample. A profiled request gets:
+
+* a **timeline** of spans – ``llm``, ``tool``, ``calcom``, ``redis`` and
+  ``cpu`` (prompt building, ``prune_history`` tokenization, argument
+  validation) – with a per-kind breakdown; ``other`` is wall time not
+  covered by any span (FastAPI, Pydantic response work, the event loop);
+* a **cProfile** of the worker thread while it runs. The event loop is
+  shared, so overlapping requests show up in it too, and only one request
+  per worker is cProfiled at a time (the timeline is always recorded).
+
+Results are kept in Redis for ``PROFILE_TTL`` seconds (newest
+``PROFILE_KEEP``) and served by ``/admin/profiles``; the response carries
+``X-Profile-Id``.
+
+When a request is not profiled, ``span()`` is one ContextVar lookup
+returning a shared no-op.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import secrets
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from . import jsonio, keys
+
+KINDS = ("llm", "tool", "calcom", "redis", "cpu")
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    async def __aenter__(self) -> None:
+        return None
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class _Span:
+    __slots__ = ("profile", "kind", "name", "start")
+
+    def __init__(self, profile: "RequestProfile", kind: str, name: str) -> None:
+        self.profile = profile
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.profile.spans.append(
+            (self.kind, self.name, self.start - self.profile.t0, time.perf_counter() - self.profile.t0)
+        )
+
+    async def __aenter__(self) -> None:
+        self.__enter__()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.__exit__()
+
+
+def span(kind: str, name: str = "") -> Any:
+    """``with span("cpu", "prune_history"):`` / ``async with span("llm", tier):``"""
+    profile = _current.get()
+    return _NOOP if profile is None else _Span(profile, kind, name)
+
+
+class RequestProfile:
+    def __init__(self, path: str, cid: str | None, reason: str, use_cprofile: bool) -> None:
+        self.id = secrets.token_urlsafe(9)
+        self.path = path
+        self.cid = cid
+        self.reason = reason
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.total = 0.0
+        self.spans: List[Tuple[str, str, float, float]] = []
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        self.token: Any = None
+
+    def summary(self) -> Dict[str, Any]:
+        breakdown = {k: 0.0 for k in KINDS}
+        for kind, _, start, end in self.spans:
+            breakdown[kind] = breakdown.get(kind, 0.0) + (end - start)
+        covered = _union([(s, e) for _, _, s, e in self.spans])
+        return {
+            "id": self.id,
+            "path": self.path,
+            "cid": self.cid,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "total_ms": round(self.total * 1000, 2),
+            # sums per kind; parallel tool calls can add up to more than wall time
+            "breakdown_ms": {k: round(v * 1000, 2) for k, v in breakdown.items()},
+            "other_ms": round(max(self.total - covered, 0.0) * 1000, 2),
+            "cprofile": self.cprofile is not None,
+        }
+
+    def detail(self, top: int = 40) -> Dict[str, Any]:
+        out = self.summary()
+        out["timeline"] = [
+            {"kind": k, "name": n, "start_ms": round(s * 1000, 2), "ms": round((e - s) * 1000, 2)}
+            for k, n, s, e in sorted(self.spans, key=lambda sp: sp[2])
+        ]
+        if self.cprofile is not None:
+            buf = io.StringIO()
+            pstats.Stats(self.cprofile, stream=buf).sort_stats("cumulative").print_stats(top)
+            out["top_functions"] = buf.getvalue()
+        return out
+
+
+def _union(intervals: List[Tuple[float, float]]) -> float:
+    total, end = 0.0, float("-inf")
+    for s, e in sorted(intervals):
+        if e <= end:
+            continue
+        total += e - max(s, end)
+        end = e
+    return total
+
+
+class Profiler:
+    """Decides which requests to profile and stores the results in Redis."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        sample_rate: float = 0.0,
+        keep: int = 50,
+        ttl_seconds: int = 3600,
+    ) -> None:
+        self.redis = redis
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.ttl = ttl_seconds
+        self._cprofile_busy = False
+
+    @classmethod
+    def from_env(cls, redis: Redis) -> "Profiler":
+        return cls(
+            redis,
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            keep=int(os.getenv("PROFILE_KEEP", "50")),
+            ttl_seconds=int(os.getenv("PROFILE_TTL", "3600")),
+        )
+
+    def reason(self, requested: bool) -> str | None:
+        if requested:
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    @asynccontextmanager
+    async def maybe_profile(
+        self, path: str, cid: str | None, requested: bool = False
+    ) -> AsyncIterator[Optional[RequestProfile]]:
+        """Profile the block if requested or sampled; yields the profile or None."""
+        reason = self.reason(requested)
+        if reason is None:
+            yield None
+            return
+        profile = self.start(path, cid, reason)
+        try:
+            yield profile
+        finally:
+            await self.finish(profile)
+
+    def start(self, path: str, cid: str | None, reason: str) -> RequestProfile:
+        profile = RequestProfile(path, cid, reason, use_cprofile=not self._cprofile_busy)
+        if profile.cprofile is not None:
+            try:
+                profile.cprofile.enable()
+                self._cprofile_busy = True
+            except ValueError:          # another profiler owns the thread
+                profile.cprofile = None
+        profile.token = _current.set(profile)
+        return profile
+
+    async def finish(self, profile: RequestProfile) -> None:
+        profile.total = time.perf_counter() - profile.t0
+        _current.reset(profile.token)
+        if profile.cprofile is not None:
+            profile.cprofile.disable()
+            self._cprofile_busy = False
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(keys.profile(profile.id), jsonio.dumpb(profile.detail()), ex=self.ttl)
+        if profile.cprofile is not None:
+            profile.cprofile.create_stats()
+            pipe.set(keys.profile(profile.id, "pstats"), marshal.dumps(profile.cprofile.stats), ex=self.ttl)
+        pipe.lpush(keys.profile("index"), jsonio.dumpb(profile.summary()))
+        pipe.ltrim(keys.profile("index"), 0, self.keep - 1)
+        pipe.expire(keys.profile("index"), self.ttl)
+        await pipe.execute()
+
+    # ------------------------------------------------------------------ #
+    # admin reads
+    # ------------------------------------------------------------------ #
+    async def list(self) -> List[Dict[str, Any]]:
+        return [jsonio.loads(x) for x in await self.redis.lrange(keys.profile("index"), 0, -1)]
+
+    async def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        data = await self.redis.get(keys.profile(profile_id))
+        return jsonio.loads(data) if data else None
+
+    async def pstats_file(self, profile_id: str) -> Optional[bytes]:
+        """``.prof`` file contents (``pstats`` / snakeviz format)."""
+        return await self.redis.get(keys.profile(profile_id, "pstats"))
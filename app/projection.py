@@ -0,0 +1,88 @@
+# app/projection.py
+"""
+Compact views of Cal.com payloads for the LLM context.
+
+The raw v2 booking objects carry hosts, location objects, attendee metadata,
+responses, etc. The model only needs enough to identify a booking and talk
+about it, so tool results are reduced to the fields below.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BOOKING_FIELDS = ("uid", "title", "start", "end", "status")
+
+
+def _attendee_label(attendee: Dict[str, Any]) -> str:
+    name, email = attendee.get("name"), attendee.get("email")
+    if name and email:
+        return f"{name} <{email}>"
+    return email or name or ""
+
+
+def project_booking(booking: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce one Cal.com booking to uid/title/start/end/status/attendees."""
+    out = {k: booking.get(k) for k in BOOKING_FIELDS if booking.get(k) is not None}
+    # v1 payloads and webhooks use startTime/endTime
+    for key, legacy in (("start", "startTime"), ("end", "endTime")):
+        if key not in out and booking.get(legacy):
+            out[key] = booking[legacy]
+    out["attendees"] = [
+        _attendee_label(a) for a in booking.get("attendees") or [] if isinstance(a, dict)
+    ]
+    return out
+
+
+def bookings_from_body(body: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Extract the booking list from a Cal.com v1/v2 response body."""
+    if not body:
+        return []
+    data = body.get("data", body.get("bookings"))
+    if isinstance(data, dict):          # some v2 endpoints nest one more level
+        data = data.get("bookings", [data])
+    return [b for b in data or [] if isinstance(b, dict)]
+
+
+def _ts(iso: Optional[str]) -> Optional[float]:
+    if not iso:
+        return None
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+
+
+def filter_by_window(
+    bookings: List[Dict[str, Any]],
+    after_start: Optional[str] = None,
+    before_end: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Cal.com ``afterStart`` / ``beforeEnd`` semantics, applied locally."""
+    lo, hi = _ts(after_start), _ts(before_end)
+    if lo is None and hi is None:
+        return bookings
+    out = []
+    for b in bookings:
+        start = _ts(b.get("start") or b.get("startTime"))
+        end = _ts(b.get("end") or b.get("endTime"))
+        if lo is not None and (start is None or start < lo):
+            continue
+        if hi is not None and (end is None or end > hi):
+            continue
+        out.append(b)
+    return out
+
+
+def project_bookings(
+    bookings: List[Dict[str, Any]],
+    *,
+    limit: int = 10,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """Project and paginate a booking list (sorted by start time)."""
+    ordered = sorted(bookings, key=lambda b: b.get("start") or b.get("startTime") or "")
+    page = ordered[offset: offset + limit]
+    return {
+        "total": len(ordered),
+        "offset": offset,
+        "has_more": offset + len(page) < len(ordered),
+        "bookings": [project_booking(b) for b in page],
+    }
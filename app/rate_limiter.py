@@ -1,17 +1,34 @@
+import time
+from typing import Any, List
 
 from redis.asyncio import Redis
-from datetime import datetime, timedelta
+
+from . import keys
+
+
+class RateLimitExceeded(Exception):
+    """Raised where the rate check is folded into another Redis round trip."""
+
 
 class RedisRateLimiter:
+    # replies that ``stage`` adds to a pipeline
+    STAGED = 2
+
     def __init__(self, redis: Redis, limit: int = 20, window_sec: int = 60):
         self.redis = redis
         self.limit = limit
         self.window = window_sec
 
+    def stage(self, pipe: Any, key: str) -> None:
+        """Queue the counter update on ``pipe`` (fixed window, no race on EXPIRE)."""
+        window_key = keys.rate(key, int(time.time()) // self.window)
+        pipe.set(window_key, 0, ex=self.window, nx=True)
+        pipe.incr(window_key)
+
+    def verdict(self, replies: List[Any]) -> bool:
+        return int(replies[-1]) <= self.limit
+
     async def allow(self, key: str) -> bool:
-        now = int(datetime.utcnow().timestamp())
-        window_key = f"rate:{key}:{now // self.window}"
-        current = await self.redis.incr(window_key)
-        if current == 1:
-            await self.redis.expire(window_key, self.window)
-        return current <= self.limit
+        pipe = self.redis.pipeline(transaction=False)
+        self.stage(pipe, key)
+        return self.verdict(await pipe.execute())
@@ -0,0 +1,84 @@
+# app/reply_templates.py
+"""
+Final replies for successful booking mutations, rendered without the LLM.
+
+After a successful create / cancel / reschedule the last LLM loop only
+rephrases the tool result, so ``AIAgent`` can render it from these
+templates instead. Anything that is not a clear success (errors, ambiguous
+matches, unknown payload shapes) returns ``None`` and goes back to the LLM.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from .projection import project_booking
+from .utils import format_utc
+
+TEMPLATES: Dict[str, str] = {
+    "create_booking": "You're all set — “{title}” is booked for {when}{with_}.",
+    "cancel_booking": "Done — “{title}” on {when}{with_} has been cancelled.",
+    "cancel_booking_by_time": "Done — “{title}” on {when}{with_} has been cancelled.",
+    "reschedule_booking": "Done — “{title}” has been moved to {when}{with_}.",
+    "reschedule_booking_by_time": "Done — “{title}” has been moved from {old_when} to {when}{with_}.",
+}
+
+
+def _as_dict(result: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(result, BaseModel):
+        return result.model_dump()
+    return result if isinstance(result, dict) else None
+
+
+def _succeeded(result: Dict[str, Any]) -> bool:
+    return result.get("ok") is True or result.get("status") == "success"
+
+
+def _body(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Booking object inside a BookingResult / Cal.com v1 or v2 body."""
+    body = result.get("data") or {}
+    if isinstance(body.get("data"), dict):      # v2 {"status", "data": {...}}
+        body = body["data"]
+    return body
+
+
+def _fields(booking: Dict[str, Any], tz_name: str) -> Optional[Dict[str, str]]:
+    view = project_booking(booking)
+    if not view.get("start"):
+        return None
+    attendees = [a.split(" <")[0] for a in view.get("attendees") or []]
+    return {
+        "title": view.get("title") or "Your meeting",
+        "when": format_utc(view["start"], tz_name),
+        "with_": f" with {', '.join(attendees)}" if attendees else "",
+    }
+
+
+def _render_mutation(name: str, result: Dict[str, Any], tz_name: str) -> Optional[str]:
+    if name == "cancel_booking_by_time":
+        fields = _fields(result.get("cancelled") or {}, tz_name)
+    elif name == "reschedule_booking_by_time":
+        fields = _fields(result.get("booking") or {}, tz_name)
+        old = _fields(result.get("from") or {}, tz_name)
+        if fields is None or old is None:
+            return None
+        fields["old_when"] = old["when"]
+        if fields["title"] == "Your meeting":
+            fields["title"] = old["title"]
+    else:
+        fields = _fields(_body(result), tz_name)
+    return None if fields is None else TEMPLATES[name].format(**fields)
+
+
+def render_reply(name: str, result: Any, tz_name: str) -> Optional[str]:
+    """Reply text for a successful mutation, or ``None`` to defer to the LLM."""
+    if name not in TEMPLATES:
+        return None
+    data = _as_dict(result)
+    if data is None or not _succeeded(data):
+        return None
+    try:
+        return _render_mutation(name, data, tz_name)
+    except (KeyError, ValueError, TypeError):   # unexpected payload shape
+        return None
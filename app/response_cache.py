@@ -0,0 +1,198 @@
+# app/response_cache.py
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, BaseMessage
+
+if TYPE_CHECKING:
+    from .conversation_state import ConversationState
+
+
+_PUNCT_RE = re.compile(r"[^\w\s@.']")
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _WS_RE.sub(" ", text).strip(" .")
+
+
+def carries_state(
+    history: Sequence[BaseMessage], state: "ConversationState | None" = None
+) -> bool:
+    """True once a turn has history or slots beyond the caller's e-mail / time zone."""
+    if history:
+        return True
+    if state is None:
+        return False
+    return not state.model_copy(update={"user_email": None, "time_zone": None}).is_empty()
+
+
+def state_fingerprint(
+    history: Sequence[BaseMessage],
+    *,
+    email: str | None = None,
+    time_zone: str | None = None,
+    tenant: str | None = None,
+    state: "ConversationState | None" = None,
+) -> str:
+    """
+    Fingerprint of the conversation state a cached answer may depend on.
+
+    A stateless turn (fresh chat, general question) depends only on the
+    system prompt – the current UTC date, the time zone – and the tenant, so
+    its answer is shared by every caller of that tenant.
+
+    Once the turn carries state, the reply also depends on the slot state,
+    on what the assistant said last – e.g. "yes" means something different
+    after "Shall I book it?" than in a fresh chat – and on whose
+    conversation it is: the caller's e-mail is then part of the key and a
+    reply never leaks to another user.
+    """
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if not carries_state(history, state):
+        return hashlib.sha1(f"{today}\x00{tenant or ''}\x00{time_zone or ''}".encode()).hexdigest()
+    last_ai = next(
+        (m.content for m in reversed(history) if isinstance(m, AIMessage)), ""
+    )
+    slots = state.model_dump_json(exclude_none=True) if state is not None else ""
+    parts = (today, tenant or "", (email or "").lower(), time_zone or "", slots, last_ai)
+    return hashlib.sha1("\x00".join(parts).encode()).hexdigest()
+
+
+@dataclass
+class CacheProbe:
+    """Result of a lookup; handed back to ``put`` so work is not redone."""
+
+    key: str
+    state: str
+    vector: Optional[List[float]] = None
+    # shared entry: not stored if the reply names this caller
+    private: Optional[str] = None
+
+
+class ResponseCache:
+    """
+    In-process cache for turns that resolve *without* tool calls.
+
+    Lookup order
+    ------------
+    1. exact hash of (normalized message, conversation state)
+    2. optional embedding similarity against previously cached messages that
+       share the same conversation state (local brute-force vector index)
+
+    Stateless turns share entries across callers of a tenant; turns with
+    history or slots are keyed per caller (see ``state_fingerprint``).
+
+    Entries expire after ``ttl_seconds`` and the cache is LRU-bounded.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: int = 3600,
+        embeddings: Embeddings | None = None,
+        similarity_threshold: float = 0.95,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._embeddings = embeddings
+        self._threshold = similarity_threshold
+        # key -> (expires_at, reply)
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        # state -> [(key, unit vector)]
+        self._index: dict[str, List[Tuple[str, List[float]]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # --------------------------------------------------------------------- #
+    # public API
+    # --------------------------------------------------------------------- #
+    async def get(
+        self,
+        user_msg: str,
+        history: Sequence[BaseMessage],
+        *,
+        email: str | None = None,
+        time_zone: str | None = None,
+        tenant: str | None = None,
+        state: "ConversationState | None" = None,
+    ) -> Tuple[Optional[str], CacheProbe]:
+        """Return ``(cached_reply | None, probe)``; see ``state_fingerprint``."""
+        fingerprint = state_fingerprint(
+            history, email=email, time_zone=time_zone, tenant=tenant, state=state
+        )
+        key = hashlib.sha1(
+            f"{fingerprint}\x00{normalize_message(user_msg)}".encode()
+        ).hexdigest()
+        probe = CacheProbe(key=key, state=fingerprint)
+        if email and not carries_state(history, state):
+            probe.private = email.lower()
+
+        reply = self._lookup(key)
+        if reply is None and self._embeddings is not None:
+            probe.vector = _unit(
+                await self._embeddings.aembed_query(normalize_message(user_msg))
+            )
+            reply = self._nearest(fingerprint, probe.vector)
+
+        if reply is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return reply, probe
+
+    async def put(self, probe: CacheProbe, reply: str) -> None:
+        if probe.private is not None and probe.private in reply.lower():
+            return
+        self._entries[probe.key] = (time.monotonic() + self._ttl, reply)
+        self._entries.move_to_end(probe.key)
+        if probe.vector is not None:
+            self._index.setdefault(probe.state, []).append((probe.key, probe.vector))
+        while len(self._entries) > self._max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._drop_vector(old_key)
+
+    # --------------------------------------------------------------------- #
+    # helpers
+    # --------------------------------------------------------------------- #
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, reply = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._drop_vector(key)
+            return None
+        self._entries.move_to_end(key)
+        return reply
+
+    def _nearest(self, state: str, vector: List[float]) -> Optional[str]:
+        best_key, best_score = None, self._threshold
+        for key, candidate in self._index.get(state, []):
+            score = sum(a * b for a, b in zip(vector, candidate))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return self._lookup(best_key) if best_key else None
+
+    def _drop_vector(self, key: str) -> None:
+        for state, rows in list(self._index.items()):
+            rows[:] = [row for row in rows if row[0] != key]
+            if not rows:
+                del self._index[state]
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
@@ -1,7 +1,7 @@
 
 from typing import List, Union, Dict, Any
-from langchain.schema.output_parser import StrOutputParser
-from langchain.schema import BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.messages import BaseMessage
 
 class ResponseParser(StrOutputParser):
     """Very thin wrapper; LangChain's built‑ins already parse tool calls."""
@@ -0,0 +1,38 @@
+# app/result_store.py
+from __future__ import annotations
+
+import secrets
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+
+from . import jsonio, keys
+
+
+def new_ref(prefix: str = "res") -> str:
+    return f"{prefix}_{secrets.token_urlsafe(8)}"
+
+
+class RedisResultStore:
+    """
+    Keeps full tool payloads server-side so only a compact projection (plus a
+    ``ref``) has to go back into the LLM context. Shared by every worker
+    behind the load balancer; entries expire after ``ttl_seconds``.
+    """
+
+    def __init__(self, redis: Redis, ttl_seconds: int = 3600) -> None:
+        self.redis = redis
+        self.ttl = ttl_seconds
+
+    @staticmethod
+    def _key(ref: str) -> str:
+        return keys.tool_result(ref)
+
+    async def put(self, payload: Any, prefix: str = "res") -> str:
+        ref = new_ref(prefix)
+        await self.redis.set(self._key(ref), jsonio.dumpb(payload), ex=self.ttl)
+        return ref
+
+    async def get(self, ref: str) -> Optional[Any]:
+        data = await self.redis.get(self._key(ref))
+        return jsonio.loads(data) if data else None
@@ -0,0 +1,321 @@
+# app/retention.py
+"""
+Memory-bounded history retention for ``RedisContextStore``.
+
+Redis only holds the recent tail of each conversation:
+
+* **size caps** – when a save pushes a conversation past ``max_messages``
+  or ``max_bytes``, its oldest messages are moved out right away, leaving at
+  most ``keep_messages`` / ``max_bytes // 2``;
+* **cold conversations** – a periodic sweep moves the whole history of any
+  conversation idle for ``cold_seconds`` out of Redis;
+* **archive** – moved messages go to a compressed local SQLite file
+  (``HistoryArchive``); ``RedisContextStore.load`` tops a short Redis tail
+  up from it, so callers never notice. Without an archive (Postgres is the
+  source of truth, or none configured) moved messages are simply dropped.
+
+The sweep also records Redis memory per conversation (``stats()``).
+The archive is local to the host: run the sweeper and the app on one host,
+or point ``HISTORY_ARCHIVE_PATH`` at storage all workers share.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+from redis.asyncio import Redis
+
+from . import jsonio, keys
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    max_messages: int = 200
+    max_bytes: int = 256 * 1024
+    keep_messages: int = 50
+    cold_seconds: int = 3600
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        return cls(
+            max_messages=int(os.getenv("HISTORY_MAX_MESSAGES", "200")),
+            max_bytes=int(os.getenv("HISTORY_MAX_BYTES", str(256 * 1024))),
+            keep_messages=int(os.getenv("HISTORY_KEEP_MESSAGES", "50")),
+            cold_seconds=int(os.getenv("HISTORY_COLD_SECONDS", "3600")),
+        )
+
+    def over(self, messages: int, size: int) -> bool:
+        return messages > self.max_messages or size > self.max_bytes
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# archive
+# ────────────────────────────────────────────────────────────────────────────
+class HistoryArchive:
+    """
+    Archived history in SQLite: one zlib-compressed row per compaction
+    (a JSON array of the moved messages), ordered by ``seq`` per conversation.
+
+    sqlite3 is blocking, so every call runs in a worker thread.
+    """
+
+    def __init__(self, path: str, level: int = 6) -> None:
+        self.path = path
+        self.level = level
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS archived_history ("
+            " cid TEXT NOT NULL, seq INTEGER NOT NULL, messages INTEGER NOT NULL,"
+            " raw_bytes INTEGER NOT NULL, payload BLOB NOT NULL, archived_at REAL NOT NULL,"
+            " PRIMARY KEY (cid, seq))"
+        )
+
+    async def append(self, cid: str, items: List[bytes]) -> int:
+        """Store ``items`` (JSON messages, oldest first); returns compressed size."""
+        return await asyncio.to_thread(self._append, cid, items)
+
+    async def tail(self, cid: str, n: int) -> List[bytes]:
+        """Newest ``n`` archived messages of ``cid``, oldest first."""
+        return await asyncio.to_thread(self._tail, cid, n)
+
+    async def stats(self) -> Dict[str, int]:
+        return await asyncio.to_thread(self._stats)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ------------------------------------------------------------------ #
+    def _append(self, cid: str, items: List[bytes]) -> int:
+        raw = b"[" + b",".join(items) + b"]"
+        payload = zlib.compress(raw, self.level)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO archived_history (cid, seq, messages, raw_bytes, payload, archived_at)"
+                " VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM archived_history WHERE cid = ?),"
+                " ?, ?, ?, ?)",
+                (cid, cid, len(items), len(raw), payload, time.time()),
+            )
+        return len(payload)
+
+    def _tail(self, cid: str, n: int) -> List[bytes]:
+        chunks: List[List[Any]] = []
+        have = 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT payload FROM archived_history WHERE cid = ? ORDER BY seq DESC", (cid,)
+            )
+            for (payload,) in rows:
+                chunk = jsonio.loads(zlib.decompress(payload))
+                chunks.append(chunk)
+                have += len(chunk)
+                if have >= n:
+                    break
+        messages = [m for chunk in reversed(chunks) for m in chunk]
+        return [jsonio.dumpb(m) for m in messages[-n:]] if n > 0 else []
+
+    def _stats(self) -> Dict[str, int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(DISTINCT cid), COALESCE(SUM(messages), 0),"
+                " COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(LENGTH(payload)), 0)"
+                " FROM archived_history"
+            ).fetchone()
+        return dict(zip(("conversations", "messages", "raw_bytes", "compressed_bytes"), row))
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# compaction
+# ────────────────────────────────────────────────────────────────────────────
+class HistoryCompactor:
+    """
+    Moves old history out of Redis according to ``policy``.
+
+    ``request(cid)`` is called by the store when a save crossed a cap and
+    compacts in the background; ``run`` sweeps the whole keyspace every
+    ``interval`` seconds for cold conversations (one worker at a time, via
+    a Redis lock) and refreshes the memory metrics.
+
+    Idle time is read from the key TTL – every save resets it to
+    ``ttl_seconds`` – so reads don't keep a conversation warm.
+    Messages are archived before they are trimmed: a crash in between can
+    duplicate a chunk in the archive but never loses one.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        policy: RetentionPolicy,
+        ttl_seconds: int = 86_400,
+        archive: HistoryArchive | None = None,
+    ) -> None:
+        self.redis = redis
+        self.policy = policy
+        self.ttl = ttl_seconds
+        self.archive = archive
+        self._queued: Set[str] = set()
+        self._worker: asyncio.Task | None = None
+        self.counters = {
+            "compactions": 0, "cold_archived": 0,
+            "moved_messages": 0, "moved_bytes": 0, "dropped_messages": 0,
+        }
+        self.snapshot: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------ #
+    # on-demand (size caps)
+    # ------------------------------------------------------------------ #
+    def request(self, cid: str) -> None:
+        self._queued.add(cid)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self._queued:
+            cid = self._queued.pop()
+            try:
+                await self.compact(cid)
+            except Exception:  # noqa: BLE001 – next save / sweep retries
+                logger.exception("history compaction failed for %s", cid)
+
+    async def compact(self, cid: str, *, cold: bool = False) -> int:
+        """Move the oldest messages (all of them if ``cold``); returns how many."""
+        lock = keys.compact_lock(cid)
+        if not await self.redis.set(lock, 1, nx=True, ex=30):
+            return 0                       # another worker is on it
+        try:
+            hist = keys.history(cid)
+            items = await self.redis.lrange(hist, 0, -1)
+            n = len(items) if cold else self._excess(items)
+            if n == 0:
+                return 0
+            moved = items[:n]
+            size = sum(len(i) for i in moved)
+            if self.archive is not None:
+                await self.archive.append(cid, moved)
+                self.counters["moved_messages"] += n
+                self.counters["moved_bytes"] += size
+            else:
+                self.counters["dropped_messages"] += n
+            # LTRIM from the left: messages pushed meanwhile stay put
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.ltrim(hist, n, -1)
+            pipe.decrby(keys.history_bytes(cid), size)
+            await pipe.execute()
+            self.counters["cold_archived" if cold else "compactions"] += 1
+            return n
+        finally:
+            await self.redis.delete(lock)
+
+    def _excess(self, items: List[bytes]) -> int:
+        """Oldest messages to move so the rest fits keep_messages / max_bytes // 2."""
+        p = self.policy
+        if not p.over(len(items), sum(len(i) for i in items)):
+            return 0
+        n = max(len(items) - p.keep_messages, 0)
+        size = sum(len(i) for i in items[n:])
+        budget = p.max_bytes // 2
+        while size > budget and n < len(items) - 2:     # always keep the last turn
+            size -= len(items[n])
+            n += 1
+        return n
+
+    # ------------------------------------------------------------------ #
+    # periodic sweep (cold conversations + metrics)
+    # ------------------------------------------------------------------ #
+    async def sweep(self, top: int = 10) -> Dict[str, Any]:
+        prefix = f"{keys.NAMESPACE}:{{"
+        rows = []
+        async for key in self.redis.scan_iter(match=f"{prefix}*}}:hist", count=500):
+            key = key.decode() if isinstance(key, bytes) else key
+            cid = key[len(prefix):-len("}:hist")]
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.llen(key)
+            pipe.get(keys.history_bytes(cid))
+            pipe.ttl(key)
+            length, size, ttl = await pipe.execute()
+            idle = self.ttl - ttl if ttl and ttl > 0 else 0
+            rows.append((cid, int(length), int(size or 0), idle))
+
+        cold = 0
+        for i, (cid, length, size, idle) in enumerate(rows):
+            if self.archive is not None and idle >= self.policy.cold_seconds:
+                if await self.compact(cid, cold=True):
+                    cold += 1
+                    rows[i] = (cid, 0, 0, idle)
+            elif self.policy.over(length, size):
+                await self.compact(cid)
+
+        sizes = sorted(r[2] for r in rows)
+        self.snapshot = {
+            "swept_at": time.time(),
+            "conversations": len(rows),
+            "messages": sum(r[1] for r in rows),
+            "bytes": sum(sizes),
+            "bytes_p50": sizes[len(sizes) // 2] if sizes else 0,
+            "bytes_p99": sizes[min(int(len(sizes) * 0.99), len(sizes) - 1)] if sizes else 0,
+            "bytes_max": sizes[-1] if sizes else 0,
+            "cold_archived": cold,
+            "largest": [
+                {"cid": cid, "messages": length, "bytes": size, "idle_seconds": idle}
+                for cid, length, size, idle in sorted(rows, key=lambda r: -r[2])[:top]
+            ],
+        }
+        return self.snapshot
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.redis.set(keys.retention_lock(), 1, nx=True, ex=int(interval)):
+                    snap = await self.sweep()
+                    logger.info(
+                        "retention: %d conversation(s), %d bytes in Redis, %d archived cold",
+                        snap["conversations"], snap["bytes"], snap["cold_archived"],
+                    )
+            except Exception:  # noqa: BLE001 – keep the loop alive
+                logger.exception("retention sweep failed")
+
+    async def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "policy": vars(self.policy),
+            "counters": dict(self.counters),
+            "redis": self.snapshot,
+        }
+        if self.archive is not None:
+            out["archive"] = await self.archive.stats()
+        return out
+
+    async def conversation_memory(self, cid: str) -> Dict[str, Any]:
+        """Messages / bytes of one conversation, in Redis and in the archive."""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(keys.history(cid))
+        pipe.get(keys.history_bytes(cid))
+        length, size = await pipe.execute()
+        out = {"cid": cid, "redis_messages": int(length), "redis_bytes": int(size or 0)}
+        try:
+            out["redis_memory_usage"] = await self.redis.memory_usage(keys.history(cid))
+        except Exception:  # noqa: BLE001 – MEMORY USAGE may be disabled
+            pass
+        return out
+
+
+def compactor_from_env(
+    redis: Redis, ttl_seconds: int, with_archive: bool = True
+) -> Optional[HistoryCompactor]:
+    """``HISTORY_RETENTION=1`` enables caps; ``HISTORY_ARCHIVE_PATH`` the archive."""
+    if os.getenv("HISTORY_RETENTION", "0") != "1":
+        return None
+    path = os.getenv("HISTORY_ARCHIVE_PATH", "")
+    archive = HistoryArchive(path) if with_archive and path else None
+    return HistoryCompactor(redis, RetentionPolicy.from_env(), ttl_seconds, archive)
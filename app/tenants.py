@@ -0,0 +1,308 @@
+# app/tenants.py
+"""
+Multi-tenant Cal.com access.
+
+Each tenant (organization) has its own Cal.com API key. A request is
+mapped to a tenant by the ``X-Tenant-Id`` header or the domain of the
+user's e-mail (``TenantRegistry.resolve``); everything else uses the
+default ``CALCOM_API_KEY`` client. An explicit tenant id only counts when
+it is authenticated – the tenant's ``secret`` in ``X-Tenant-Secret``, an
+admin token, or a trusted proxy (``CALCOM_TENANT_HEADER_TRUSTED=1``) –
+otherwise the e-mail domain decides.
+
+``TenantPool`` keeps at most ``max_clients`` tenant clients per worker
+(least recently used evicted), each with its own keep-alive pool, token
+bucket and tool instances. All clients, the default one included, share the
+worker's upstream concurrency through one ``FairScheduler``: free slots go to
+waiting tenants round-robin, so a noisy tenant queues behind its own requests
+instead of starving the others.
+
+Registry file (``CALCOM_TENANTS_FILE``), JSON::
+
+    {"acme": {"api_key_env": "ACME_CALCOM_KEY", "domains": ["acme.com"],
+              "secret_env": "ACME_TENANT_SECRET",
+              "rate_per_sec": 5, "burst": 10, "max_connections": 5}}
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from . import jsonio
+from .cal_client import CalComClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+
+
+class UnknownTenant(LookupError):
+    """``X-Tenant-Id`` names a tenant that is not in the registry."""
+
+
+class TenantConfig(BaseModel):
+    api_key: Optional[str] = None
+    api_key_env: Optional[str] = None        # keep the secret out of the file
+    # lets callers pick this tenant explicitly (``X-Tenant-Secret``)
+    secret: Optional[str] = None
+    secret_env: Optional[str] = None
+    domains: List[str] = Field(default_factory=list)
+    base_url: Optional[str] = None
+    base_url_v2: Optional[str] = None
+    rate_per_sec: float = 5.0
+    burst: int = 10
+    max_connections: int = 5
+
+    @model_validator(mode="after")
+    def _key(self) -> "TenantConfig":
+        if not self.api_key and self.api_key_env:
+            self.api_key = os.getenv(self.api_key_env)
+        if not self.api_key:
+            raise ValueError("api_key (or api_key_env naming a set variable) is required")
+        if not self.secret and self.secret_env:
+            self.secret = os.getenv(self.secret_env)
+        self.domains = [d.lower() for d in self.domains]
+        return self
+
+
+class TenantRegistry:
+    def __init__(self, tenants: Dict[str, TenantConfig]) -> None:
+        self.tenants = tenants
+        self._by_domain = {d: tid for tid, cfg in tenants.items() for d in cfg.domains}
+
+    @classmethod
+    def from_file(cls, path: str) -> "TenantRegistry":
+        raw = jsonio.loads(Path(path).read_bytes())
+        return cls({tid: TenantConfig.model_validate(cfg) for tid, cfg in raw.items()})
+
+    def resolve(
+        self,
+        tenant_id: str | None = None,
+        email: str | None = None,
+        *,
+        secret: str | None = None,
+        trusted: bool = False,
+    ) -> str:
+        """
+        Explicit id first – if ``trusted`` or ``secret`` is the tenant's –
+        then the e-mail domain, then the default tenant.
+        """
+        if tenant_id and (trusted or self.authenticates(tenant_id, secret)):
+            if tenant_id != DEFAULT_TENANT and tenant_id not in self.tenants:
+                raise UnknownTenant(tenant_id)
+            return tenant_id
+        if email and "@" in email:
+            return self._by_domain.get(email.rsplit("@", 1)[1].lower(), DEFAULT_TENANT)
+        return DEFAULT_TENANT
+
+    def authenticates(self, tenant_id: str, secret: str | None) -> bool:
+        cfg = self.tenants.get(tenant_id)
+        expected = cfg.secret if cfg is not None else None
+        return bool(expected and secret and secrets.compare_digest(secret, expected))
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# quotas
+# ────────────────────────────────────────────────────────────────────────────
+class TokenBucket:
+    """``rate`` requests per second on average, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:                 # waiters are served in order
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FairScheduler:
+    """
+    At most ``capacity`` upstream calls at once, shared fairly by tenant.
+
+    Callers that cannot start immediately wait in a per-tenant FIFO; each
+    freed slot goes to the next tenant (round-robin) that has a waiter.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.active = 0
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.granted: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, tenant: str) -> AsyncIterator[None]:
+        await self._acquire(tenant)
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._grant()
+
+    async def _acquire(self, tenant: str) -> None:
+        if self.active < self.capacity and not self._waiting:
+            self.active += 1
+            self.granted[tenant] = self.granted.get(tenant, 0) + 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(tenant, deque()).append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # granted just as we were cancelled – hand the slot on
+                self.active -= 1
+                self._grant()
+            else:
+                queue = self._waiting.get(tenant)
+                if queue is not None and fut in queue:
+                    queue.remove(fut)
+                    if not queue:
+                        del self._waiting[tenant]
+            raise
+
+    def _grant(self) -> None:
+        while self.active < self.capacity and self._waiting:
+            tenant, queue = next(iter(self._waiting.items()))
+            fut = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(tenant)      # next tenant's turn
+            else:
+                del self._waiting[tenant]
+            self.active += 1
+            self.granted[tenant] = self.granted.get(tenant, 0) + 1
+            fut.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "active": self.active,
+            "waiting": {t: len(q) for t, q in self._waiting.items()},
+            "granted": dict(self.granted),
+        }
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# client pool
+# ────────────────────────────────────────────────────────────────────────────
+class TenantClient:
+    def __init__(self, tenant: str, client: CalComClient, tools: list) -> None:
+        self.tenant = tenant
+        self.client = client
+        self.tools = tools
+
+
+class TenantPool:
+    """
+    LRU of per-tenant clients + tools, built on first use.
+
+    Evicted clients are closed after ``close_grace`` seconds so calls still
+    running on them can finish. ``default`` is pinned and never evicted.
+    """
+
+    def __init__(
+        self,
+        registry: TenantRegistry,
+        default: TenantClient,
+        build_tools: Callable[[CalComClient], list],
+        scheduler: FairScheduler,
+        max_clients: int = 64,
+        close_grace: float = 60.0,
+        client_factory: Callable[..., CalComClient] = CalComClient.pooled,
+    ) -> None:
+        self.registry = registry
+        self.default = default
+        self.build_tools = build_tools
+        self.scheduler = scheduler
+        self.max_clients = max_clients
+        self.close_grace = close_grace
+        self.client_factory = client_factory
+        self._clients: "OrderedDict[str, TenantClient]" = OrderedDict()
+        self._closing: set[asyncio.Task] = set()
+        self.evictions = 0
+        default.client.scheduler = scheduler
+
+    def get(self, tenant: str) -> TenantClient:
+        if tenant == DEFAULT_TENANT:
+            return self.default
+        entry = self._clients.get(tenant)
+        if entry is not None:
+            self._clients.move_to_end(tenant)
+            return entry
+        cfg = self.registry.tenants[tenant]
+        client = self.client_factory(
+            cfg.api_key,
+            max_connections=cfg.max_connections,
+            base_url=cfg.base_url,
+            base_url_v2=cfg.base_url_v2,
+            tenant=tenant,
+        )
+        client.budget = TokenBucket(cfg.rate_per_sec, cfg.burst)
+        client.scheduler = self.scheduler
+        entry = TenantClient(tenant, client, self.build_tools(client))
+        self._clients[tenant] = entry
+        while len(self._clients) > self.max_clients:
+            _, old = self._clients.popitem(last=False)
+            self.evictions += 1
+            task = asyncio.create_task(self._close_later(old.client))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        return entry
+
+    async def _close_later(self, client: CalComClient) -> None:
+        await asyncio.sleep(self.close_grace)
+        await client.aclose()
+
+    async def aclose(self) -> None:
+        for task in self._closing:
+            task.cancel()
+        for entry in self._clients.values():
+            await entry.client.aclose()
+        self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": list(self._clients),
+            "max_clients": self.max_clients,
+            "evictions": self.evictions,
+            "upstream": self.scheduler.stats(),
+        }
+
+
+def tenant_pool_from_env(
+    default_client: CalComClient,
+    default_tools: list,
+    build_tools: Callable[[CalComClient], list],
+) -> Optional[TenantPool]:
+    """``CALCOM_TENANTS_FILE`` enables multi-tenant mode."""
+    path = os.getenv("CALCOM_TENANTS_FILE")
+    if not path:
+        return None
+    registry = TenantRegistry.from_file(path)
+    logger.info("multi-tenant: %d tenant(s) from %s", len(registry.tenants), path)
+    return TenantPool(
+        registry,
+        TenantClient(DEFAULT_TENANT, default_client, default_tools),
+        build_tools,
+        FairScheduler(int(os.getenv("CALCOM_UPSTREAM_CONCURRENCY", "20"))),
+        max_clients=int(os.getenv("CALCOM_TENANT_POOL_SIZE", "64")),
+    )
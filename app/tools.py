@@ -1,12 +1,16 @@
-from langchain.tools import BaseTool
-from langchain.callbacks.manager import CallbackManagerForToolRun
-from typing import Any, ClassVar, Dict, List, Optional, Type
+from langchain_core.tools import BaseTool
+from langchain_core.callbacks import CallbackManagerForToolRun
+from typing import Any, Awaitable, Callable, ClassVar, Dict, List, Literal, Optional, Type
 
-from pydantic import BaseModel, Field, PrivateAttr
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
 
-from .cal_client import Attendee, CalComClient, BookingPayload, Responses
+from .cal_client import Attendee, BookingResult, CalComClient, BookingPayload, Responses
 from .cal_client import CalComClient
+from .free_slots import MAX_RANGE_DAYS, find_free_slots
+from .projection import bookings_from_body, filter_by_window, project_booking, project_bookings
 import asyncio
+import os
+from datetime import datetime, time, timedelta, timezone
 
 
 class CreateBookingTool(BaseTool):
@@ -42,6 +46,9 @@ class CreateBookingTool(BaseTool):
         return await self._client.create_booking(data) # type: ignore
 
 
+BookingStatus = Literal["upcoming", "recurring", "past", "cancelled", "unconfirmed"]
+
+
 class ListBookingsArgs(BaseModel):
     """Arguments for ``list_bookings``.
 
@@ -53,7 +60,15 @@ class ListBookingsArgs(BaseModel):
     attendeeEmail: str
     afterStart: Optional[str] = None  # e.g. "2025-07-18T15:00:00-07:00"
     beforeEnd: Optional[str] = None   # e.g. "2025-07-18T16:00:00-07:00"
-    status: Optional[str] = "upcoming" 
+    # forwarded to Cal.com v2 as is
+    status: Optional[BookingStatus] = "upcoming"
+    limit: int = Field(10, ge=1, le=50, description="Max bookings to return")
+    offset: int = Field(0, ge=0, description="Skip this many (pagination)")
+
+    @field_validator("status", mode="before")
+    @classmethod
+    def _lower(cls, value: Any) -> Any:
+        return value.lower() if isinstance(value, str) else value
 
 
 class CancelBookingArgs(BaseModel):
@@ -68,15 +83,20 @@ class ListBookingsTool(BaseTool):
     name: str = "list_bookings"
     description: str = (
         "Returns every scheduled Cal.com event where the invitee’s e‑mail "
-        "matches the given address. Optional filters: after_start, before_end, "
-        "status (ACCEPTED, CANCELLED, ...)."
+        "matches the given address. Optional filters: afterStart, beforeEnd, "
+        "status (upcoming – the default –, recurring, past, cancelled or "
+        "unconfirmed). Each booking is summarised as "
+        "uid/title/start/end/status/attendees; use `limit`/`offset` to page "
+        "and `get_booking_details` with the returned `ref` for full details."
     )
     _client: CalComClient = PrivateAttr()
+    _store: Any = PrivateAttr()
     args_schema: ClassVar[Type[BaseModel]] = ListBookingsArgs
 
-    def __init__(self, client: CalComClient, **data: Any) -> None:
+    def __init__(self, client: CalComClient, store: Any = None, **data: Any) -> None:
         super().__init__(**data)
         self._client = client
+        self._store = store          # None → no ``ref``, no get_booking_details
 
     # sync wrapper required by BaseTool
     def _run(self, payload: Dict[str, Any],
@@ -89,14 +109,88 @@ class ListBookingsTool(BaseTool):
         afterStart: str | None = None,
         beforeEnd: str | None = None,
         status: str | None = None,
+        limit: int = 10,
+        offset: int = 0,
         run_manager: CallbackManagerForToolRun | None = None,
     ) -> Dict[str, Any]:
-        return await self._client.list_bookings(
+        result = await self._client.list_bookings(
             email=attendeeEmail,
             after_start=afterStart,
             before_end=beforeEnd,
             status=status, # type: ignore
         ) 
+        return await self.summarize(result, limit=limit, offset=offset)
+
+    async def prefetch(self, attendeeEmail: str) -> BookingResult:
+        """Unfiltered upcoming lookup, started speculatively by ``AIAgent``."""
+        return await self._client.list_bookings(email=attendeeEmail)
+
+    async def summarize(
+        self,
+        result: BookingResult,
+        *,
+        after_start: str | None = None,
+        before_end: str | None = None,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Turn a raw ``BookingResult`` into the tool output. The time window is
+        applied locally, which lets a prefetched unfiltered result answer a
+        filtered call.
+        """
+        if not result.ok:
+            return {"ok": False, "status": result.status, "error": result.error}
+
+        # full payload stays server-side; the LLM only sees the projection
+        bookings = filter_by_window(bookings_from_body(result.data), after_start, before_end)
+        view = project_bookings(bookings, limit=limit, offset=offset)
+        if self._store is None:
+            return {"ok": True, **view}
+        ref = await self._store.put(bookings, prefix="bk")
+        return {"ok": True, "ref": ref, **view}
+
+
+class GetBookingDetailsArgs(BaseModel):
+    """Arguments for ``get_booking_details``."""
+
+    ref: str = Field(..., description="`ref` returned by list_bookings")
+    booking_uid: str = Field(..., description="uid of the booking to describe")
+
+
+class GetBookingDetailsTool(BaseTool):
+    """Return the full Cal.com payload behind a ``list_bookings`` ref."""
+
+    name: str = "get_booking_details"
+    description: str = (
+        "Returns the complete Cal.com data (location, hosts, responses, ...) "
+        "for one booking previously returned by `list_bookings`. Only call "
+        "this when the summary fields are not enough."
+    )
+    args_schema: ClassVar[Type[BaseModel]] = GetBookingDetailsArgs
+    _store: Any = PrivateAttr()
+
+    def __init__(self, store: Any, **data: Any) -> None:
+        super().__init__(**data)
+        self._store = store
+
+    def _run(self, payload: Dict[str, Any],
+             run_manager: CallbackManagerForToolRun | None = None) -> Dict[str, Any]:
+        return asyncio.run(self._arun(**payload))
+
+    async def _arun(
+        self,
+        ref: str,
+        booking_uid: str,
+        run_manager: CallbackManagerForToolRun | None = None,
+    ) -> Dict[str, Any]:
+        bookings = await self._store.get(ref)
+        if bookings is None:
+            return {"ok": False, "error": f"unknown or expired ref {ref!r}; call list_bookings again"}
+        booking = next((b for b in bookings if b.get("uid") == booking_uid), None)
+        if booking is None:
+            return {"ok": False, "error": f"booking {booking_uid!r} is not in {ref!r}"}
+        return {"ok": True, "booking": booking}
 
 
 class CancelBookingTool(BaseTool):
@@ -201,6 +295,628 @@ class RescheduleBookingTool(BaseTool):
         return result.model_dump()
 
 
+# ──────────────────────────────────────────────────────────────────────────
+# compound tools: lookup + match + mutation in one tool call
+# ──────────────────────────────────────────────────────────────────────────
+MAX_MEETING_HOURS = 4   # widen beforeEnd so long meetings are not filtered out
+
+
+async def match_bookings(
+    client: CalComClient,
+    email: str,
+    approx_start: str,
+    tolerance_minutes: int,
+) -> tuple[List[Dict[str, Any]], str | None]:
+    """
+    Upcoming bookings of ``email`` starting within ``tolerance_minutes`` of
+    ``approx_start``, closest first. Returns ``(matches, error)``.
+    """
+    approx = datetime.fromisoformat(approx_start.replace("Z", "+00:00"))
+    tol = timedelta(minutes=tolerance_minutes)
+    result = await client.list_bookings(
+        email=email,
+        after_start=_iso_z(approx - tol),
+        before_end=_iso_z(approx + tol + timedelta(hours=MAX_MEETING_HOURS)),
+    )
+    if not result.ok:
+        return [], result.error or f"list_bookings failed ({result.status})"
+
+    def distance(b: Dict[str, Any]) -> float:
+        start = b.get("start") or b.get("startTime")
+        if not start:
+            return float("inf")
+        return abs((datetime.fromisoformat(start.replace("Z", "+00:00")) - approx).total_seconds())
+
+    matches = [
+        b for b in bookings_from_body(result.data)
+        if distance(b) <= tol.total_seconds()
+    ]
+    return sorted(matches, key=distance), None
+
+
+def _iso_z(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _moved_payload(
+    booking: Dict[str, Any],
+    attendee_email: str,
+    new_start: str,
+    new_end: str,
+    *,
+    time_zone: str,
+    language: str = "en",
+    responses: Responses | None = None,
+    title: str | None = None,
+    event_type_id: int | None = None,
+) -> BookingPayload:
+    """Re-booking payload for ``booking``; unset fields come from the booking."""
+    invitee = next(
+        (a for a in booking.get("attendees") or []
+         if str(a.get("email", "")).lower() == attendee_email.lower()),
+        {"email": attendee_email},
+    )
+    responses = responses or Responses(
+        name=invitee.get("name") or invitee["email"], email=invitee["email"]
+    )
+    return BookingPayload(
+        eventTypeId=event_type_id or booking.get("eventTypeId") or 17,
+        start=new_start,
+        end=new_end,
+        title=title or booking.get("title") or "Rescheduled Meeting",
+        responses=responses,
+        timeZone=time_zone,
+        language=language,
+        attendees=[Attendee(email=responses.email)],
+    )
+
+
+def _unresolved(matches: List[Dict[str, Any]], error: str | None, action: str) -> Dict[str, Any]:
+    """Tool output when there is not exactly one match – the model decides."""
+    if error:
+        return {"ok": False, "error": error}
+    if not matches:
+        return {
+            "ok": False,
+            "error": "No upcoming booking found near that time. "
+                     "Ask the user to confirm the date/time, or call list_bookings.",
+        }
+    return {
+        "ok": False,
+        "ambiguous": True,
+        "error": f"{len(matches)} bookings match; ask the user which one, then "
+                 f"call {action} with its booking_uid.",
+        "candidates": [project_booking(b) for b in matches],
+    }
+
+
+class CancelBookingByTimeArgs(BaseModel):
+    """Arguments for ``cancel_booking_by_time``."""
+
+    attendeeEmail: str
+    approx_start: str = Field(..., description="ISO-8601 UTC start the user mentioned")
+    tolerance_minutes: int = Field(90, ge=0, le=24 * 60)
+    cancellation_reason: Optional[str] = None
+
+
+class CancelBookingByTimeTool(BaseTool):
+    """Find the booking by attendee + approximate start and cancel it."""
+
+    name: str = "cancel_booking_by_time"
+    description: str = (
+        "Cancels the invitee's booking that starts near `approx_start` "
+        "(lookup + cancel in one step). If none or several bookings match, "
+        "nothing is cancelled and the candidates are returned."
+    )
+    args_schema: ClassVar[Type[BaseModel]] = CancelBookingByTimeArgs
+    _client: CalComClient = PrivateAttr()
+
+    def __init__(self, client: CalComClient, **data: Any) -> None:
+        super().__init__(**data)
+        self._client = client
+
+    def _run(self, payload: Dict[str, Any],
+             run_manager: CallbackManagerForToolRun | None = None) -> Dict[str, Any]:
+        return asyncio.run(self._arun(**payload))
+
+    async def _arun(
+        self,
+        attendeeEmail: str,
+        approx_start: str,
+        tolerance_minutes: int = 90,
+        cancellation_reason: str | None = None,
+        run_manager: CallbackManagerForToolRun | None = None,
+    ) -> Dict[str, Any]:
+        matches, error = await match_bookings(
+            self._client, attendeeEmail, approx_start, tolerance_minutes
+        )
+        if error or len(matches) != 1:
+            return _unresolved(matches, error, "cancel_booking")
+
+        booking = matches[0]
+        raw = await self._client.cancel_booking(
+            booking_uid=booking["uid"],
+            cancellation_reason=cancellation_reason or "Cancelled via chatbot",
+        )
+        return {
+            "ok": raw.get("status") == "success",
+            "cancelled": project_booking(booking),
+        }
+
+
+class RescheduleBookingByTimeArgs(BaseModel):
+    """
+    Arguments for ``reschedule_booking_by_time``. Name, e-mail, title and
+    event type default to those of the matched booking.
+    """
+
+    attendeeEmail: str
+    approx_start: str = Field(..., description="ISO-8601 UTC start of the existing meeting")
+    new_start: str
+    new_end: str
+    tolerance_minutes: int = Field(90, ge=0, le=24 * 60)
+    timeZone: str = "Europe/London"
+    eventTypeId: Optional[int] = None
+    title: Optional[str] = None
+    responses: Optional[Responses] = None
+    language: str = "en"
+
+
+class RescheduleBookingByTimeTool(BaseTool):
+    """Find the booking by attendee + approximate start and move it."""
+
+    name: str = "reschedule_booking_by_time"
+    description: str = (
+        "Moves the invitee's booking that starts near `approx_start` to "
+        "`new_start`/`new_end` (lookup + reschedule in one step). If none or "
+        "several bookings match, nothing changes and the candidates are returned."
+    )
+    args_schema: ClassVar[Type[BaseModel]] = RescheduleBookingByTimeArgs
+    _client: CalComClient = PrivateAttr()
+
+    def __init__(self, client: CalComClient, **data: Any) -> None:
+        super().__init__(**data)
+        self._client = client
+
+    def _run(self, payload: Dict[str, Any],
+             run_manager: CallbackManagerForToolRun | None = None) -> Dict[str, Any]:
+        return asyncio.run(self._arun(**payload))
+
+    async def _arun(self, **kwargs: Any) -> Dict[str, Any]:
+        args = RescheduleBookingByTimeArgs(**kwargs)
+        matches, error = await match_bookings(
+            self._client, args.attendeeEmail, args.approx_start, args.tolerance_minutes
+        )
+        if error or len(matches) != 1:
+            return _unresolved(matches, error, "reschedule_booking")
+
+        booking = matches[0]
+        payload = _moved_payload(
+            booking,
+            args.attendeeEmail,
+            args.new_start,
+            args.new_end,
+            time_zone=args.timeZone,
+            language=args.language,
+            responses=args.responses,
+            title=args.title,
+            event_type_id=args.eventTypeId,
+        )
+        result = await self._client.reschedule_booking(booking["uid"], payload)
+        if not result.ok:
+            return {"ok": False, "status": result.status, "error": result.error}
+        new = (result.data or {}).get("data", result.data) or {}
+        return {
+            "ok": True,
+            "from": project_booking(booking),
+            "booking": project_booking(new),
+        }
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# free-slot finder
+# ──────────────────────────────────────────────────────────────────────────
+class FindFreeSlotsArgs(BaseModel):
+    """Arguments for `find_free_slots`."""
+
+    attendeeEmails: List[str] = Field(
+        ..., min_length=1, max_length=10,
+        description="Everyone who must be free – include the user's own e-mail",
+    )
+    rangeStart: str = Field(..., description="ISO-8601 UTC start of the search range")
+    rangeEnd: str = Field(..., description="ISO-8601 UTC end of the search range")
+    duration_minutes: int = Field(30, ge=5, le=8 * 60)
+    timeZone: str = Field("America/Los_Angeles", description="Zone of the working hours")
+    work_start_hour: int = Field(9, ge=0, le=23)
+    work_end_hour: int = Field(17, ge=1, le=24)
+    weekdays_only: bool = True
+    limit: int = Field(5, ge=1, le=20)
+
+
+class FindFreeSlotsTool(BaseTool):
+    name: str = "find_free_slots"
+    description: str = (
+        "Finds times when all given attendees are free (no upcoming bookings) "
+        "within working hours. Call this before create_booking / reschedule "
+        "when the user has not fixed an exact time, then offer the slots."
+    )
+    args_schema: ClassVar[Type[BaseModel]] = FindFreeSlotsArgs
+    _client: CalComClient = PrivateAttr()
+
+    def __init__(self, client: CalComClient, **data: Any) -> None:
+        super().__init__(**data)
+        self._client = client
+
+    def _run(self, payload: Dict[str, Any],
+             run_manager: CallbackManagerForToolRun | None = None) -> Dict[str, Any]:
+        return asyncio.run(self._arun(**payload))
+
+    async def _arun(
+        self,
+        attendeeEmails: List[str],
+        rangeStart: str,
+        rangeEnd: str,
+        duration_minutes: int = 30,
+        timeZone: str = "America/Los_Angeles",
+        work_start_hour: int = 9,
+        work_end_hour: int = 17,
+        weekdays_only: bool = True,
+        limit: int = 5,
+        run_manager: CallbackManagerForToolRun | None = None,
+    ) -> Dict[str, Any]:
+        start = datetime.fromisoformat(rangeStart.replace("Z", "+00:00"))
+        end = datetime.fromisoformat(rangeEnd.replace("Z", "+00:00"))
+        start = max(start, datetime.now(timezone.utc))      # never suggest the past
+        if end - start > timedelta(days=MAX_RANGE_DAYS):
+            return {"ok": False, "error": f"Range too long (max {MAX_RANGE_DAYS} days)."}
+
+        emails = sorted({e.lower() for e in attendeeEmails})
+        busy, error = await self._client.busy_intervals(emails, _iso_z(start), _iso_z(end))
+        if error:
+            return {"ok": False, "error": error}
+
+        slots = find_free_slots(
+            busy,
+            start,
+            end,
+            duration_minutes=duration_minutes,
+            tz_name=timeZone,
+            day_start=time(work_start_hour),
+            day_end=time(work_end_hour) if work_end_hour < 24 else time.max,
+            weekdays_only=weekdays_only,
+            limit=limit,
+        )
+        return {
+            "ok": True,
+            "attendees": emails,
+            "slots": [{"start": _iso_z(s), "end": _iso_z(e)} for s, e in slots],
+        }
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# bulk mutations: one tool call, Cal.com calls fanned out under a semaphore
+# ──────────────────────────────────────────────────────────────────────────
+MAX_BULK = 25
+BULK_CONCURRENCY = int(os.getenv("CALCOM_BULK_CONCURRENCY", "5"))
+
+
+async def _bounded_gather(
+    items: List[Any],
+    fn: Callable[[Any], Awaitable[Dict[str, Any]]],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """``fn`` over ``items`` with at most ``limit`` in flight; failures become results."""
+    sem = asyncio.Semaphore(limit)
+
+    async def one(item: Any) -> Dict[str, Any]:
+        async with sem:
+            try:
+                return await fn(item)
+            except Exception as exc:  # noqa: BLE001 – report per item
+                first_line = str(exc).splitlines()[0] if str(exc) else ""
+                return {"ok": False, "error": f"{type(exc).__name__}: {first_line}"}
+
+    return list(await asyncio.gather(*(one(i) for i in items)))
+
+
+def _bulk_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    failed = sum(1 for r in results if not r.get("ok"))
+    return {
+        "ok": failed == 0,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }
+
+
+async def _bookings_in_window(
+    client: CalComClient,
+    email: str,
+    after_start: str | None,
+    before_end: str | None,
+) -> tuple[List[Dict[str, Any]], str | None]:
+    result = await client.list_bookings(email, after_start=after_start, before_end=before_end)
+    if not result.ok:
+        return [], result.error or f"list_bookings failed ({result.status})"
+    return filter_by_window(bookings_from_body(result.data), after_start, before_end), None
+
+
+class BulkCancelBookingsArgs(BaseModel):
+    """Either explicit ``booking_uids`` or an attendee + time-window filter."""
+
+    booking_uids: List[str] = Field(default_factory=list, max_length=MAX_BULK)
+    attendeeEmail: Optional[str] = None
+    afterStart: Optional[str] = None
+    beforeEnd: Optional[str] = None
+    cancellation_reason: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _has_target(self) -> "BulkCancelBookingsArgs":
+        if not self.booking_uids and not self.attendeeEmail:
+            raise ValueError("give booking_uids or attendeeEmail (+ optional window)")
+        return self
+
+
+class BulkCancelBookingsTool(BaseTool):
+    name: str = "cancel_bookings_bulk"
+    description: str = (
+        "Cancels several bookings in one step – either the given `booking_uids` "
+        "or every upcoming booking with `attendeeEmail` inside "
+        "`afterStart`/`beforeEnd`. Returns one result per booking."
+    )
+    args_schema: ClassVar[Type[BaseModel]] = BulkCancelBookingsArgs
+    _client: CalComClient = PrivateAttr()
+
+    def __init__(self, client: CalComClient, **data: Any) -> None:
+        super().__init__(**data)
+        self._client = client
+
+    def _run(self, payload: Dict[str, Any],
+             run_manager: CallbackManagerForToolRun | None = None) -> Dict[str, Any]:
+        return asyncio.run(self._arun(**payload))
+
+    async def _arun(self, **kwargs: Any) -> Dict[str, Any]:
+        args = BulkCancelBookingsArgs(**kwargs)
+        if args.booking_uids:
+            targets = [{"uid": uid} for uid in dict.fromkeys(args.booking_uids)]
+        else:
+            targets, error = await _bookings_in_window(
+                self._client, args.attendeeEmail, args.afterStart, args.beforeEnd  # type: ignore[arg-type]
+            )
+            if error:
+                return {"ok": False, "error": error}
+        if not targets:
+            return {"ok": False, "error": "No matching upcoming bookings."}
+        if len(targets) > MAX_BULK:
+            return {"ok": False, "error": f"{len(targets)} bookings match; narrow the range (max {MAX_BULK})."}
+
+        reason = args.cancellation_reason or "Cancelled via chatbot"
+
+        async def cancel(booking: Dict[str, Any]) -> Dict[str, Any]:
+            raw = await self._client.cancel_booking(booking["uid"], cancellation_reason=reason)
+            out = project_booking(booking) if len(booking) > 1 else {"uid": booking["uid"]}
+            out["ok"] = raw.get("status") == "success"
+            return out
+
+        results = await _bounded_gather(targets, cancel, BULK_CONCURRENCY)
+        for booking, result in zip(targets, results):
+            result.setdefault("uid", booking["uid"])
+        return _bulk_summary(results)
+
+
+class BookingMove(BaseModel):
+    booking_uid: str
+    new_start: str
+    new_end: str
+
+
+class BulkRescheduleBookingsArgs(BaseModel):
+    """
+    Bookings of ``attendeeEmail`` (optionally narrowed by window and/or
+    ``booking_uids``), moved by ``shift_minutes`` or to explicit ``moves``.
+    """
+
+    attendeeEmail: str
+    afterStart: Optional[str] = None
+    beforeEnd: Optional[str] = None
+    booking_uids: List[str] = Field(default_factory=list, max_length=MAX_BULK)
+    shift_minutes: Optional[int] = Field(None, description="Move every match by this much")
+    moves: List[BookingMove] = Field(default_factory=list, max_length=MAX_BULK)
+    timeZone: str = "Europe/London"
+
+    @model_validator(mode="after")
+    def _one_mode(self) -> "BulkRescheduleBookingsArgs":
+        if (self.shift_minutes is None) == (not self.moves):
+            raise ValueError("give exactly one of shift_minutes or moves")
+        return self
+
+
+class BulkRescheduleBookingsTool(BaseTool):
+    name: str = "reschedule_bookings_bulk"
+    description: str = (
+        "Moves several of the invitee's bookings in one step: every match "
+        "shifted by `shift_minutes`, or each `moves[i]` to its new start/end. "
+        "Returns one result per booking; its `outcome` says whether the "
+        "booking was moved, kept where it was, duplicated or lost."
+    )
+    args_schema: ClassVar[Type[BaseModel]] = BulkRescheduleBookingsArgs
+    _client: CalComClient = PrivateAttr()
+
+    def __init__(self, client: CalComClient, **data: Any) -> None:
+        super().__init__(**data)
+        self._client = client
+
+    def _run(self, payload: Dict[str, Any],
+             run_manager: CallbackManagerForToolRun | None = None) -> Dict[str, Any]:
+        return asyncio.run(self._arun(**payload))
+
+    async def _arun(self, **kwargs: Any) -> Dict[str, Any]:
+        args = BulkRescheduleBookingsArgs(**kwargs)
+        bookings, error = await _bookings_in_window(
+            self._client, args.attendeeEmail, args.afterStart, args.beforeEnd
+        )
+        if error:
+            return {"ok": False, "error": error}
+        by_uid = {b["uid"]: b for b in bookings if b.get("uid")}
+
+        if args.moves:
+            plan = [(m.booking_uid, m.new_start, m.new_end) for m in args.moves]
+        else:
+            wanted = args.booking_uids or list(by_uid)
+            shift = timedelta(minutes=args.shift_minutes or 0)
+            plan = []
+            for uid in wanted:
+                booking = by_uid.get(uid, {})
+                start = booking.get("start") or booking.get("startTime")
+                end = booking.get("end") or booking.get("endTime")
+                if start and end:
+                    plan.append((uid, _shift(start, shift), _shift(end, shift)))
+                else:
+                    plan.append((uid, "", ""))
+        if not plan:
+            return {"ok": False, "error": "No matching upcoming bookings."}
+        if len(plan) > MAX_BULK:
+            return {"ok": False, "error": f"{len(plan)} bookings match; narrow the range (max {MAX_BULK})."}
+
+        async def move(step: tuple[str, str, str]) -> Dict[str, Any]:
+            uid, new_start, new_end = step
+            booking = by_uid.get(uid)
+            if booking is None or not new_start:
+                return {"ok": False, "uid": uid, "outcome": "kept",
+                        "error": "not an upcoming booking of this attendee"}
+            return await _move_booking(self._client, booking, args, new_start, new_end)
+
+        results = await _ordered_moves(plan, by_uid, move)
+        for (uid, *_), result in zip(plan, results):
+            if not result.get("ok"):
+                result.setdefault("uid", uid)
+                result.setdefault("outcome", "kept")     # raised before any Cal.com call
+        return _bulk_summary(results)
+
+
+# Outcome of one bulk move, from the booking's point of view:
+#   moved       new booking created, old one cancelled
+#   kept        nothing changed, the booking is still at its old time
+#   duplicated  new booking created, but the old one could not be cancelled
+#   restored    moved in place (cancel first), create failed, old time re-booked
+#   lost        old booking cancelled and neither time could be booked again
+Span = Optional[tuple[datetime, datetime]]
+
+
+def _span(start: str | None, end: str | None) -> Span:
+    try:
+        return (datetime.fromisoformat(start.replace("Z", "+00:00")),     # type: ignore[union-attr]
+                datetime.fromisoformat(end.replace("Z", "+00:00")))       # type: ignore[union-attr]
+    except (AttributeError, ValueError):
+        return None
+
+
+def _booking_span(booking: Dict[str, Any]) -> Span:
+    return _span(booking.get("start") or booking.get("startTime"),
+                 booking.get("end") or booking.get("endTime"))
+
+
+def _overlaps(a: Span, b: Span) -> bool:
+    return a is not None and b is not None and a[0] < b[1] and b[0] < a[1]
+
+
+async def _ordered_moves(
+    plan: List[tuple[str, str, str]],
+    by_uid: Dict[str, Dict[str, Any]],
+    move: Callable[[tuple[str, str, str]], Awaitable[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """
+    Run ``move`` over ``plan`` so a booking never moves onto a slot another
+    booking of the plan is still leaving: a move waits for every move out of
+    the time it targets; independent moves run together (bounded). Moves
+    left in a cycle (e.g. a swap) run last – create-first keeps them safe.
+    """
+    old = [_booking_span(by_uid.get(uid) or {}) for uid, *_ in plan]
+    blocked_by = {
+        i: {j for j, slot in enumerate(old) if j != i and _overlaps(_span(new_start, new_end), slot)}
+        for i, (_, new_start, new_end) in enumerate(plan)
+    }
+
+    results: List[Dict[str, Any]] = [{} for _ in plan]
+    pending = set(range(len(plan)))
+    while pending:
+        ready = sorted(i for i in pending if not blocked_by[i] & pending) or sorted(pending)
+        for i, result in zip(ready, await _bounded_gather(
+            [plan[i] for i in ready], move, BULK_CONCURRENCY
+        )):
+            results[i] = result
+        pending -= set(ready)
+    return results
+
+
+async def _move_booking(
+    client: CalComClient,
+    booking: Dict[str, Any],
+    args: BulkRescheduleBookingsArgs,
+    new_start: str,
+    new_end: str,
+) -> Dict[str, Any]:
+    """
+    Create the new booking first, then cancel the old one, so a failed
+    create leaves the booking where it was. A move that overlaps its own
+    old time has to free it first; if the create then fails, the old time
+    is booked again.
+    """
+    uid = booking["uid"]
+    before = project_booking(booking)
+    payload = _moved_payload(booking, args.attendeeEmail, new_start, new_end, time_zone=args.timeZone)
+    created = await client.create_booking(payload)
+    if not created.ok:
+        if not _overlaps(_booking_span(booking), _span(new_start, new_end)):
+            return {"ok": False, "uid": uid, "outcome": "kept",
+                    "status": created.status, "error": created.error}
+        return await _move_in_place(client, booking, args, payload, created)
+
+    new = project_booking((created.data or {}).get("data", created.data) or {})
+    try:
+        await client.cancel_booking(uid, cancellation_reason="Rescheduled via API")
+    except Exception as exc:  # noqa: BLE001 – the new booking stands, report the old one
+        return {"ok": False, "uid": uid, "outcome": "duplicated", "from": before, "booking": new,
+                "error": f"new booking created, but the old one is still active: {type(exc).__name__}: {exc}"}
+    return {"ok": True, "outcome": "moved", "from": before, "booking": new}
+
+
+async def _move_in_place(
+    client: CalComClient,
+    booking: Dict[str, Any],
+    args: BulkRescheduleBookingsArgs,
+    payload: BookingPayload,
+    first_try: BookingResult,
+) -> Dict[str, Any]:
+    """Cancel, then create; on failure re-book the old time (``restored``)."""
+    uid = booking["uid"]
+    before = project_booking(booking)
+    try:
+        await client.cancel_booking(uid, cancellation_reason="Rescheduled via API")
+    except Exception as exc:  # noqa: BLE001
+        return {"ok": False, "uid": uid, "outcome": "kept",
+                "status": first_try.status, "error": f"{first_try.error}; cancel failed: {exc}"}
+    created = await client.create_booking(payload)
+    if created.ok:
+        new = project_booking((created.data or {}).get("data", created.data) or {})
+        return {"ok": True, "outcome": "moved", "from": before, "booking": new}
+    start, end = booking.get("start") or booking.get("startTime"), booking.get("end") or booking.get("endTime")
+    restore = await client.create_booking(
+        _moved_payload(booking, args.attendeeEmail, start, end, time_zone=args.timeZone)
+    )
+    if restore.ok:
+        new = project_booking((restore.data or {}).get("data", restore.data) or {})
+        return {"ok": False, "uid": uid, "outcome": "restored", "booking": new,
+                "status": created.status,
+                "error": f"could not book the new time ({created.error}); re-booked the old time"}
+    return {"ok": False, "uid": uid, "outcome": "lost", "from": before, "status": created.status,
+            "error": f"old booking cancelled, but neither the new time ({created.error}) "
+                     f"nor the old time ({restore.error}) could be booked"}
+
+
+def _shift(iso: str, delta: timedelta) -> str:
+    return _iso_z(datetime.fromisoformat(iso.replace("Z", "+00:00")) + delta)
+
 if __name__ == "__main__":
     # Import necessary classes
 
@@ -290,4 +1006,4 @@ if __name__ == "__main__":
 
     # # Synchronous call to reschedule a booking
     # reschedule_result = reschedule_tool._run(reschedule_payload)
-    # print(reschedule_result)
\ No newline at end of file
+    # print(reschedule_result)
@@ -1,19 +1,29 @@
 from typing import Dict, Any
-from langchain.tools.base import BaseTool
-import json
+from langchain_core.tools import BaseTool
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
 from langchain_core.messages import ToolMessage
-from langchain_core.messages import (
-    ToolMessage,
-)
 from zoneinfo import ZoneInfo
 from datetime import datetime
-import re, json
-import tiktoken
+import re
 from langchain_core.messages import BaseMessage
 from typing import List
 
-import tiktoken
+from . import jsonio
+
+logger = logging.getLogger(__name__)
+
 
+@lru_cache(maxsize=256)
+def args_json_schema(args_schema: type) -> Dict[str, Any]:
+    """JSON schema of a tool's args model, generated once per class (read-only)."""
+    return (
+        args_schema.model_json_schema()             # Pydantic ≥ 2.0
+        if hasattr(args_schema, "model_json_schema")
+        else args_schema.schema()                   # Pydantic 1.x
+    )
 
 
 def to_openai_function_dict(tool: BaseTool) -> Dict[str, Any]:
@@ -25,11 +35,7 @@ def to_openai_function_dict(tool: BaseTool) -> Dict[str, Any]:
     if not getattr(tool, "args_schema", None):
         schema: Dict[str, Any] = {"type": "object", "properties": {}}
     else:
-        schema = (
-            tool.args_schema.model_json_schema()             # Pydantic ≥ 2.0
-            if hasattr(tool.args_schema, "model_json_schema")
-            else tool.args_schema.schema()                   # Pydantic 1.x
-        )
+        schema = args_json_schema(tool.args_schema)
 
     return {
         "type": "function",
@@ -49,7 +55,7 @@ def extract_tool_name(call: dict) -> tuple[str, dict, str]:
         fn = call["function"]
         name = fn["name"]
         # OpenAI returns *stringified* JSON
-        args = json.loads(fn["arguments"] or "{}")
+        args = jsonio.loads(fn["arguments"] or "{}")
     else:  # Old schema: {"name":..., "arguments": {...}}
         name = call["name"]
         args = call.get("arguments", {})
@@ -59,36 +65,77 @@ def all_errors(msgs: list[ToolMessage]) -> bool:
     """True if every ToolMessage content starts with '[error]'."""
     return bool(msgs) and all(m.content.lstrip().startswith("[error]") for m in msgs)
 
-LOCAL_TZ = ZoneInfo("America/Los_Angeles")
+DEFAULT_TZ_NAME = os.getenv("DEFAULT_TIME_ZONE", "America/Los_Angeles")
+
+# Cal.com v2 returns millisecond precision ("…T23:00:00.000Z")
+ISO_UTC_RE = re.compile(r'"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?Z)"')
+
 
-ISO_UTC_RE = re.compile(r'"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z)"')
+@lru_cache(maxsize=64)
+def get_zone(tz_name: str) -> ZoneInfo:
+    """ZoneInfo lookup; raises ``ZoneInfoNotFoundError`` for unknown names."""
+    return ZoneInfo(tz_name)
 
-def utc_to_pt(iso_utc: str) -> str:
+
+@lru_cache(maxsize=4096)
+def format_utc(iso_utc: str, tz_name: str = DEFAULT_TZ_NAME) -> str:
+    """``2025-07-21T23:00:00Z`` → ``2025-07-21 04:00 PM PDT`` (memoized)."""
     dt = datetime.fromisoformat(iso_utc.replace("Z", "+00:00"))
-    return dt.astimezone(LOCAL_TZ).strftime("%Y-%m-%d %I:%M %p PT")
+    return dt.astimezone(get_zone(tz_name)).strftime("%Y-%m-%d %I:%M %p %Z")
+
 
-def rewrite_times_for_human(text: str) -> str:
+def rewrite_times_for_human(text: str, tz_name: str | None = None) -> str:
     # Replace every ISO-UTC timestamp inside a JSON blob that you plan to
     # show to the user. Tools still receive the original JSON.
-    return ISO_UTC_RE.sub(lambda m: f'"{utc_to_pt(m.group(1))}"', text)
+    # Listings repeat the same timestamps many times: convert each distinct
+    # value once, then substitute in a single regex pass.
+    tz_name = tz_name or DEFAULT_TZ_NAME
+    formatted = {iso: format_utc(iso, tz_name) for iso in set(ISO_UTC_RE.findall(text))}
+    if not formatted:
+        return text
+    return ISO_UTC_RE.sub(lambda m: f'"{formatted[m.group(1)]}"', text)
+
+
+# tiktoken downloads its BPE file on first use; point it at a cache directory
+# that ships with the image so a cold worker never hits the network.
+# Populate it at build time with:  python -c "from app.utils import get_encoder; get_encoder()"
+TIKTOKEN_CACHE_DIR = os.environ.setdefault(
+    "TIKTOKEN_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "tiktoken"),
+)
+
+
+class _ApproxEncoder:
+    """~4 chars per token; only used when the BPE file cannot be loaded."""
 
+    def encode(self, text: str) -> list[int]:
+        return [0] * (len(text) // 4 + 1 if text else 0)
 
-ENC = tiktoken.encoding_for_model("gpt-3.5-turbo")   # or your model
 
-def num_tokens(msg: BaseMessage) -> int:
-    return len(ENC.encode(msg.content))
+@lru_cache(maxsize=None)
+def get_encoder(model: str = "gpt-3.5-turbo"):
+    """Load the tokenizer for ``model`` on first use, not at import time."""
+    import tiktoken
 
-ENC = tiktoken.encoding_for_model("gpt-3.5-turbo")   # or your target model
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:          # unknown / non-OpenAI model name
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # noqa: BLE001 – offline and no cached BPE file
+        logger.warning("tiktoken unavailable (%s); using approximate counts", exc)
+        return _ApproxEncoder()
 
 
-def num_tokens(msg: BaseMessage) -> int:
+def num_tokens(msg: BaseMessage, model: str = "gpt-3.5-turbo") -> int:
     """Rough token estimate for one message’s content."""
-    return len(ENC.encode(msg.content or ""))
+    return len(get_encoder(model).encode(msg.content or ""))
 
 
 def prune_history(
     messages: List[BaseMessage],
     max_tokens: int = 12_000,       # leave ~4k-5k for the model’s reply/tools
+    model: str = "gpt-3.5-turbo",   # picks the token encoder
 ) -> List[BaseMessage]:
     """
     Keep the system prompt + *most recent* messages that fit into `max_tokens`.
@@ -102,7 +149,7 @@ def prune_history(
 
     # 1️⃣  Always keep the system prompt
     pruned: List[BaseMessage] = [messages[0]]
-    running_total = num_tokens(messages[0])
+    running_total = num_tokens(messages[0], model)
 
     # 2️⃣  Walk the conversation backwards (newest → oldest)
     for idx_from_end, msg in enumerate(reversed(messages[1:]), start=1):
@@ -122,7 +169,7 @@ def prune_history(
                 content="[tool-result truncated]",
             )
 
-        t = num_tokens(msg)
+        t = num_tokens(msg, model)
         if running_total + t > max_tokens:
             break
 
@@ -0,0 +1,124 @@
+# app/warmup.py
+"""
+Per-worker warm-up, run from ``lifespan`` before the worker reports ready.
+
+Steps (each timed, run side by side; failures are retried until
+``WARMUP_TIMEOUT``, required ones until they succeed):
+
+    redis     open the pool and PING (required)
+    encoder   load the tokenizer of every model tier, build + prune one prompt
+    schemas   generate the JSON schema of every tool (``args_json_schema``)
+    calcom    open ``CALCOM_WARM_CONNECTIONS`` keep-alive TLS connections
+    llm       one cheap authenticated call per tier (``WARMUP_LLM=1``)
+
+``/ready`` answers 503 until every step has finished (successfully or
+past its deadline) and ``redis`` has succeeded, and again once shutdown
+has begun. Only ``redis`` is required: the other steps make the first
+requests fast, but the worker can serve without them.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi import FastAPI
+
+from .prompt_builder import PromptBuilder
+from .utils import args_json_schema, get_encoder, prune_history
+
+logger = logging.getLogger(__name__)
+
+REQUIRED = {"redis"}
+
+
+class WarmupState:
+    def __init__(self) -> None:
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.done = False
+        self.started = time.monotonic()
+
+    @property
+    def ready(self) -> bool:
+        return self.done and all(self.steps.get(s, {}).get("ok") for s in REQUIRED)
+
+    def report(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "warmup_done": self.done, "steps": self.steps}
+
+
+async def _step(
+    state: WarmupState, name: str, fn: Callable[[], Awaitable[Any]], deadline: float
+) -> None:
+    required = name in REQUIRED
+    attempt = 0
+    while True:
+        attempt += 1
+        started = time.perf_counter()
+        timeout = 5.0 if required else max(deadline - time.monotonic(), 0.1)
+        try:
+            detail = await asyncio.wait_for(fn(), timeout=timeout)
+            state.steps[name] = {
+                "ok": True, "ms": round((time.perf_counter() - started) * 1000, 1),
+                "attempts": attempt, **({"detail": detail} if detail is not None else {}),
+            }
+            return
+        except Exception as exc:  # noqa: BLE001 – reported on /ready, retried
+            state.steps[name] = {"ok": False, "error": f"{type(exc).__name__}: {exc}", "attempts": attempt}
+            if time.monotonic() >= deadline:
+                if not required:
+                    logger.warning("warm-up %s failed: %s", name, exc)
+                    return
+                if attempt % 10 == 0:
+                    logger.error("warm-up %s still failing: %s", name, exc)
+            pause = min(0.5 * attempt, 5)
+            if not required:
+                pause = min(pause, max(deadline - time.monotonic(), 0))
+            await asyncio.sleep(pause)
+
+
+async def warm_up(app: FastAPI, state: WarmupState) -> None:
+    deadline = time.monotonic() + float(os.getenv("WARMUP_TIMEOUT", "20"))
+    s = app.state
+    tiers = [t for t in (s.llm.fast, s.llm.strong) if t is not None]
+
+    async def redis() -> None:
+        await s.redis.ping()
+
+    async def encoder() -> Dict[str, str]:
+        def load() -> Dict[str, str]:
+            out = {t.model: type(get_encoder(t.model)).__name__ for t in tiers}
+            messages = PromptBuilder().build("warm-up", [], None)
+            for t in tiers:
+                prune_history(messages, t.max_prompt_tokens, t.model)
+            return out
+
+        return await asyncio.to_thread(load)
+
+    async def schemas() -> int:
+        classes = {t.args_schema for t in s.tools if isinstance(getattr(t, "args_schema", None), type)}
+        for cls in classes:
+            args_json_schema(cls)
+        return len(classes)
+
+    async def calcom() -> int:
+        return await s.cal_client.warm_connections(int(os.getenv("CALCOM_WARM_CONNECTIONS", "2")))
+
+    async def llm() -> None:
+        for t in tiers:
+            client = getattr(t.llm, "root_async_client", None)
+            if client is not None:                  # ChatOpenAI: opens TLS, checks the key
+                await client.models.retrieve(t.model)
+
+    steps = [("redis", redis), ("encoder", encoder), ("schemas", schemas), ("calcom", calcom)]
+    if os.getenv("WARMUP_LLM", "1") == "1":
+        steps.append(("llm", llm))
+    # independent steps run side by side; each retries on its own
+    await asyncio.gather(*(_step(state, name, fn, deadline) for name, fn in steps))
+    state.done = True
+    logger.info(
+        "warm-up done in %.0f ms (ready=%s): %s",
+        (time.monotonic() - state.started) * 1000, state.ready,
+        {k: v.get("ms", v.get("error")) for k, v in state.steps.items()},
+    )
@@ -0,0 +1,149 @@
+# app/write_behind.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+from redis.asyncio import Redis
+
+from . import keys
+from .context_store import ContextStore
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindContextStore:
+    """
+    Persists history off the response critical path.
+
+    * ``save`` queues the messages and returns immediately; one background
+      task per conversation drains its queue, so appends stay in order and
+      everything queued while a write is running goes out as one batch.
+    * ``load`` first waits for that conversation's pending writes, which
+      gives read-your-writes for the next turn. Across workers this goes
+      through a per-conversation counter in Redis (``keys.pending_writes``,
+      incremented on enqueue, decremented once written): ``load`` polls it
+      until it is back to zero, for at most ``wait_seconds``.
+    * At most ``max_pending`` messages are buffered; beyond that ``save``
+      falls back to writing synchronously.
+    * ``aclose`` flushes everything; call it from ``lifespan`` on shutdown.
+    """
+
+    def __init__(
+        self,
+        inner: ContextStore,
+        max_pending: int = 1000,
+        max_attempts: int = 3,
+        redis: Redis | None = None,
+        wait_seconds: float = 5.0,
+    ) -> None:
+        self.inner = inner
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.redis = redis
+        self.wait_seconds = wait_seconds
+        self._pending: Dict[str, List[BaseMessage]] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+        self._buffered = 0
+        self._closed = False
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    # --------------------------------------------------------------------- #
+    # ContextStore API
+    # --------------------------------------------------------------------- #
+    async def load(self, cid: str) -> List[BaseMessage]:
+        await self._wait_for(cid)
+        await self._wait_for_others(cid)
+        return await self.inner.load(cid)
+
+    async def save(self, cid: str, messages: List[BaseMessage]) -> None:
+        if self._closed or self._buffered + len(messages) > self.max_pending:
+            # back-pressure: keep ordering behind anything already queued
+            await self._wait_for(cid)
+            await self.inner.save(cid, messages)
+            return
+
+        if self.redis is not None:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.incrby(keys.pending_writes(cid), len(messages))
+            # a worker that dies mid-write must not block loads for long
+            pipe.expire(keys.pending_writes(cid), max(int(self.wait_seconds * 6), 30))
+            await pipe.execute()
+        self._pending.setdefault(cid, []).extend(messages)
+        self._buffered += len(messages)
+        if cid not in self._writers:
+            self._writers[cid] = asyncio.create_task(self._drain(cid))
+
+    # slot state is one small overwrite per turn – written straight through
+    async def load_state(self, cid: str) -> Optional[Dict[str, Any]]:
+        return await self.inner.load_state(cid)
+
+    async def save_state(self, cid: str, state: Dict[str, Any]) -> None:
+        await self.inner.save_state(cid, state)
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        self._closed = True
+        writers = list(self._writers.values())
+        if not writers:
+            return
+        _, still_running = await asyncio.wait(writers, timeout=timeout)
+        if still_running:
+            logger.error(
+                "write-behind: %d conversation(s) / %d message(s) not flushed",
+                len(still_running), self._buffered,
+            )
+
+    # --------------------------------------------------------------------- #
+    # helpers
+    # --------------------------------------------------------------------- #
+    async def _wait_for(self, cid: str) -> None:
+        writer = self._writers.get(cid)
+        if writer is not None:
+            await asyncio.shield(writer)
+
+    async def _wait_for_others(self, cid: str) -> None:
+        """Writes queued for ``cid`` by other workers."""
+        if self.redis is None:
+            return
+        deadline = time.monotonic() + self.wait_seconds
+        while int(await self.redis.get(keys.pending_writes(cid)) or 0) > 0:
+            if time.monotonic() >= deadline:
+                logger.warning("write-behind: %s still has pending writes, loading anyway", cid)
+                return
+            await asyncio.sleep(0.02)
+
+    async def _drain(self, cid: str) -> None:
+        try:
+            while self._pending.get(cid):
+                batch = self._pending.pop(cid)
+                await self._write(cid, batch)
+                self._buffered -= len(batch)
+                if self.redis is not None:
+                    await self._written(cid, len(batch))
+        finally:
+            self._writers.pop(cid, None)
+
+    async def _written(self, cid: str, n: int) -> None:
+        try:
+            await self.redis.decrby(keys.pending_writes(cid), n)  # type: ignore[union-attr]
+        except Exception:  # noqa: BLE001 – the marker expires on its own
+            logger.exception("write-behind: could not clear pending marker for %s", cid)
+
+    async def _write(self, cid: str, batch: List[BaseMessage]) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.inner.save(cid, batch)
+                return
+            except Exception:  # noqa: BLE001
+                if attempt == self.max_attempts:
+                    logger.exception(
+                        "write-behind: dropping %d message(s) for %s", len(batch), cid
+                    )
+                    return
+                await asyncio.sleep(0.1 * 2 ** attempt)
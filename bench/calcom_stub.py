@@ -0,0 +1,97 @@
+"""
+Local Cal.com stand-in: the endpoints ``CalComClient`` calls, in memory.
+
+Bookings are kept per API key, so several tenants can share one stub; a
+booking that overlaps an accepted one of the same key is refused (409),
+like a host's double booking on Cal.com.
+Every request waits ``CALCOM_STUB_LATENCY`` seconds (default 0.05) to look
+like a remote API.
+
+    uvicorn bench.calcom_stub:app --port 8099
+    CALCOM_BASE_URL=http://localhost:8099/v1 CALCOM_BASE_URL_V2=http://localhost:8099/v2 \\
+        uvicorn app.main:app
+
+Per-tenant ``base_url`` / ``base_url_v2`` in ``CALCOM_TENANTS_FILE`` can
+point at it too. In-process, use ``httpx.ASGITransport(app=app)``.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import secrets
+from collections import defaultdict
+from typing import Any, Dict
+
+from fastapi import FastAPI, Header, HTTPException, Request
+
+app = FastAPI(title="Cal.com stub")
+app.state.latency = float(os.getenv("CALCOM_STUB_LATENCY", "0.05"))
+app.state.calls = defaultdict(int)                                     # api key → requests
+BOOKINGS: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)    # api key → uid → booking
+
+
+async def _request(key: str | None) -> str:
+    if not key:
+        raise HTTPException(401, "missing API key")
+    app.state.calls[key] += 1
+    await asyncio.sleep(app.state.latency)
+    return key
+
+
+def _bearer(authorization: str | None) -> str | None:
+    return authorization.removeprefix("Bearer ") if authorization else None
+
+
+@app.post("/v1/bookings")
+async def create_booking(request: Request, apiKey: str | None = None):
+    key = await _request(apiKey)
+    body = await request.json()
+    uid = secrets.token_urlsafe(12)
+    responses = body.get("responses") or {}
+    for other in BOOKINGS[key].values():
+        if other["status"] == "accepted" and other["start"] < body["end"] and body["start"] < other["end"]:
+            raise HTTPException(409, f"slot taken by {other['uid']}")
+    booking = {
+        "id": len(BOOKINGS[key]) + 1,
+        "uid": uid,
+        "title": body.get("title"),
+        "start": body["start"],
+        "end": body["end"],
+        "status": "accepted",
+        "eventTypeId": body.get("eventTypeId"),
+        "attendees": [{"name": responses.get("name"), "email": responses.get("email"),
+                       "timeZone": body.get("timeZone")}],
+    }
+    BOOKINGS[key][uid] = booking
+    return booking
+
+
+@app.get("/v2/bookings")
+async def list_bookings(
+    attendeeEmail: str,
+    status: str = "upcoming",
+    afterStart: str | None = None,
+    beforeEnd: str | None = None,
+    authorization: str | None = Header(default=None),
+):
+    key = await _request(_bearer(authorization))
+    wanted = "cancelled" if status == "cancelled" else "accepted"
+    data = [
+        b for b in BOOKINGS[key].values()
+        if b["status"] == wanted
+        and any(a.get("email") == attendeeEmail for a in b["attendees"])
+        # like Cal.com: only bookings entirely inside the range
+        and (afterStart is None or b["start"] >= afterStart)
+        and (beforeEnd is None or b["end"] <= beforeEnd)
+    ]
+    return {"status": "success", "data": sorted(data, key=lambda b: b["start"])}
+
+
+@app.post("/v2/bookings/{uid}/cancel")
+async def cancel_booking(uid: str, authorization: str | None = Header(default=None)):
+    key = await _request(_bearer(authorization))
+    booking = BOOKINGS[key].get(uid)
+    if booking is None:
+        raise HTTPException(404, f"booking {uid} not found")
+    booking["status"] = "cancelled"
+    return {"status": "success", "data": booking}
@@ -0,0 +1,101 @@
+"""
+Hedged vs. plain LLM calls under a heavy-tailed latency distribution.
+
+Uses the offline ``ScriptedChatModel`` with injected latency (mostly fast,
+a few percent of calls stall), so no API key is needed.
+
+    python bench/hedging.py                       # 400 calls, 20 concurrent
+    python bench/hedging.py --calls 1000 --tail-rate 0.05 --tail-s 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from app.fake_llm import ScriptedChatModel  # noqa: E402
+from app.hedging import HedgedInvoker  # noqa: E402
+
+
+def heavy_tail(base: float, tail_rate: float, tail_s: float, seed: int):
+    rng = random.Random(seed)
+
+    def latency(_: int) -> float:
+        if rng.random() < tail_rate:
+            return tail_s * (0.5 + rng.random())
+        return rng.lognormvariate(0, 0.3) * base
+
+    return latency
+
+
+def pct(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+async def run(args: argparse.Namespace, hedger: HedgedInvoker | None) -> dict:
+    llm = ScriptedChatModel(latency=heavy_tail(args.base_s, args.tail_rate, args.tail_s, args.seed))
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    messages = [HumanMessage(content="ping")]
+
+    async def one() -> None:
+        async with sem:
+            started = time.perf_counter()
+            if hedger is None:
+                await llm.ainvoke(messages)
+            else:
+                await hedger.ainvoke(llm, messages)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(args.calls)))
+    out = {
+        "p50_ms": pct(latencies, 0.50) * 1000,
+        "p99_ms": pct(latencies, 0.99) * 1000,
+        "llm_calls": llm.calls,
+    }
+    if hedger is not None:
+        out.update(hedger.stats())
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--base-s", type=float, default=0.05, help="typical latency")
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="share of stalled calls")
+    parser.add_argument("--tail-s", type=float, default=2.0, help="stalled-call latency")
+    parser.add_argument("--percentile", type=float, default=0.95)
+    parser.add_argument("--budget", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    plain = asyncio.run(run(args, None))
+    hedger = HedgedInvoker(
+        percentile=args.percentile,
+        budget=args.budget,
+        initial_delay=args.base_s * 4,
+        min_delay=0.0,
+    )
+    hedged = asyncio.run(run(args, hedger))
+
+    print(f"{'':10} {'p50 ms':>8} {'p99 ms':>8} {'LLM calls':>10}")
+    for label, r in (("plain", plain), ("hedged", hedged)):
+        print(f"{label:10} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} {r['llm_calls']:10d}")
+    print(
+        f"\nhedge rate {hedged['hedge_rate']:.1%}  "
+        f"wins {hedged['hedge_wins']}/{hedged['hedges']}  "
+        f"final delay {hedged['delay_seconds']}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Import-time profile of the server entry point.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+reports the slowest modules by cumulative time.
+
+    python bench/import_time.py                    # top 25 modules
+    python bench/import_time.py --budget-ms 2500   # exit 1 if over budget
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# packages the server must not pull in at import time
+HEAVY_UNUSED = {"langchain.schema", "langchain.memory", "langchain_community", "streamlit"}
+
+
+def profile(module: str) -> list[tuple[str, int, int]]:
+    """Return ``[(module, self_us, cumulative_us), ...]`` in import order."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr.splitlines()[-1] if proc.stderr else "import failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cum_us)))
+    return rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--module", default="app.main")
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--budget-ms", type=float, default=None)
+    args = ap.parse_args()
+
+    rows = profile(args.module)
+    total_ms = next(cum for name, _, cum in rows if name.strip() == args.module) / 1000
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"{cum_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    loaded = {name.strip() for name, _, _ in rows}
+    dead = sorted(loaded & HEAVY_UNUSED)
+    print(f"\nimport {args.module}: {total_ms:.0f} ms, {len(rows)} modules")
+    if dead:
+        print(f"warning: heavy packages on the request path: {', '.join(dead)}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        sys.exit(f"over budget: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
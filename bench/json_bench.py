@@ -0,0 +1,100 @@
+"""
+JSON microbenchmarks for one chat turn, per ``app.jsonio`` backend.
+
+A "turn" here is what the request path serializes for a typical booking
+lookup: decode the tool-call arguments, load + save a 20-message history
+in Redis, decode a raw Cal.com bookings body, encode the tool result for
+the ToolMessage and encode the HTTP response.
+
+    python bench/json_bench.py              # all installed backends
+    python bench/json_bench.py -n 5000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage, messages_to_dict  # noqa: E402
+
+from app.jsonio import BACKENDS, Backend  # noqa: E402
+from app.projection import project_bookings  # noqa: E402
+
+
+def _booking(i: int) -> dict:
+    return {
+        "id": 1000 + i,
+        "uid": f"cSfhAjkc9GJ2Gqw3K2T5p{i}",
+        "title": f"Intro chat #{i}",
+        "description": "",
+        "status": "accepted",
+        "start": f"2025-07-{10 + i:02d}T17:00:00.000Z",
+        "end": f"2025-07-{10 + i:02d}T17:30:00.000Z",
+        "duration": 30,
+        "eventTypeId": 2874092,
+        "location": "userPhone",
+        "metadata": {},
+        "hosts": [{"id": 1, "name": "Host", "email": "host@example.com", "timeZone": "America/Los_Angeles"}],
+        "attendees": [
+            {"name": "Alice Example", "email": "alice@example.com", "timeZone": "Europe/Paris",
+             "language": "en", "absent": False},
+        ],
+        "bookingFieldsResponses": {"name": "Alice Example", "email": "alice@example.com",
+                                   "location": {"value": "userPhone", "optionValue": ""}},
+        "createdAt": "2025-07-01T08:00:00.000Z",
+        "updatedAt": "2025-07-01T08:00:00.000Z",
+    }
+
+
+CAL_BODY = {"status": "success", "data": [_booking(i) for i in range(10)]}
+TOOL_ARGS = [
+    '{"attendeeEmail":"alice@example.com","afterStart":"2025-07-10T00:00:00Z",'
+    '"beforeEnd":"2025-07-31T00:00:00Z","limit":10}'
+] * 3
+HISTORY = messages_to_dict(
+    [HumanMessage(content="show my meetings with alice@example.com " * 3),
+     AIMessage(content="Here are your upcoming meetings: " + "lorem ipsum " * 40)] * 10
+)
+TOOL_RESULT = {"ok": True, "ref": "abc123", "total": 10, "offset": 0, "has_more": False,
+               "bookings": project_bookings(CAL_BODY["data"], limit=10, offset=0)}
+RESPONSE = {"conversation_id": "web-ui-42", "reply": "Here are your meetings: " + "x" * 600}
+
+
+def turn(b: Backend) -> None:
+    for raw in TOOL_ARGS:
+        b.loads(raw)
+    stored = b.dumpb(HISTORY)           # RedisContextStore.save
+    b.loads(stored)                     # RedisContextStore.load
+    b.loads(b.dumpb(CAL_BODY))          # httpx body (encode only to get bytes)
+    b.dumps(TOOL_RESULT)                # ToolMessage content
+    b.dumpb(RESPONSE)                   # HTTP / WebSocket reply
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=2000, help="turns per measurement")
+    args = parser.parse_args()
+
+    results = {}
+    for name, b in BACKENDS.items():
+        best = min(timeit.repeat(lambda: turn(b), number=args.n, repeat=5))
+        results[name] = best / args.n * 1e6
+    print(f"{'backend':10} {'µs / turn':>10}")
+    for name, us in results.items():
+        print(f"{name:10} {us:10.1f}")
+
+    base = results["json"]
+    for name, us in results.items():
+        if name != "json":
+            print(f"\n{name}: {base - us:.1f} µs CPU saved per turn ({base / us:.1f}× faster)")
+
+    repr_len = len(str(TOOL_RESULT))
+    json_len = len(BACKENDS["json"].dumps(TOOL_RESULT))
+    print(f"tool result: str() {repr_len} chars → compact JSON {json_len} chars")
+
+
+if __name__ == "__main__":
+    main()
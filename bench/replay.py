@@ -0,0 +1,274 @@
+"""
+Deterministic agent benchmarks from recorded cassettes (``app.cassette``).
+
+``record`` runs a conversation script against the configured LLM and
+Cal.com (``LLM_*`` / ``CALCOM_*`` env; ``bench/calcom_stub.py`` works too)
+and saves every exchange. ``replay`` runs the same script offline against
+the cassette and reports per turn: wall time, LLM calls, prompt tokens and
+Cal.com calls, next to what was recorded and, optionally, a baseline
+report from an earlier replay.
+
+    python bench/replay.py record bench/scripts/booking.json -o /tmp/booking.jsonl
+    python bench/replay.py replay /tmp/booking.jsonl --latency 1 --report base.json
+    # … change AIAgent / prune_history / the context store …
+    python bench/replay.py replay /tmp/booking.jsonl --latency 1 --baseline base.json \\
+        --max-regression 5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from langchain_core.messages import BaseMessage  # noqa: E402
+
+from app import jsonio  # noqa: E402
+from app.agents import AIAgent  # noqa: E402
+from app.cal_client import CalComClient  # noqa: E402
+from app.cassette import (  # noqa: E402
+    Cassette,
+    RecordingChatModel,
+    RecordingTransport,
+    ReplayChatModel,
+    ReplayTransport,
+)
+from app.di import build_tools, conversation_state_enabled, prompt_builder  # noqa: E402
+from app.model_router import ModelRouter  # noqa: E402
+from app.orchestrator import ChatOrchestrator  # noqa: E402
+from app.response_parser import ResponseParser  # noqa: E402
+from app.result_store import new_ref  # noqa: E402
+
+COMPARED = ("wall_ms", "llm_calls", "prompt_tokens", "http_calls")
+
+
+class MemoryContextStore:
+    """Process-local ``ContextStore`` so runs need no Redis (``--store memory``)."""
+
+    def __init__(self) -> None:
+        self.history: Dict[str, List[BaseMessage]] = {}
+        self.state: Dict[str, Dict[str, Any]] = {}
+
+    async def load(self, cid: str) -> List[BaseMessage]:
+        return list(self.history.get(cid, []))
+
+    async def save(self, cid: str, messages: List[BaseMessage]) -> None:
+        self.history.setdefault(cid, []).extend(messages)
+
+    async def load_state(self, cid: str):
+        return self.state.get(cid)
+
+    async def save_state(self, cid: str, state: Dict[str, Any]) -> None:
+        self.state[cid] = state
+
+
+class MemoryResultStore:
+    """Process-local result store for ``get_booking_details`` refs."""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+
+    async def put(self, payload: Any, prefix: str = "res") -> str:
+        ref = new_ref(prefix)
+        self.data[ref] = payload
+        return ref
+
+    async def get(self, ref: str) -> Any:
+        return self.data.get(ref)
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport) -> None:
+        self.inner = inner
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def _store(kind: str):
+    if kind == "memory":
+        return MemoryContextStore()
+    from app.di import build_context_store, redis_pool
+
+    return build_context_store(redis_pool())
+
+
+async def run_script(
+    script: Dict[str, Any],
+    router: ModelRouter,
+    transport: httpx.AsyncBaseTransport,
+    cassette: Cassette,
+    store_kind: str,
+    tokens_sent: List[int],
+) -> List[Dict[str, Any]]:
+    counter = CountingTransport(transport)
+    client = CalComClient.pooled(os.getenv("CALCOM_API_KEY", "replay"), transport=counter)
+    agent = AIAgent(
+        router, prompt_builder(), ResponseParser(),
+        tools=build_tools(client, MemoryResultStore()),
+    )
+    orch = ChatOrchestrator(agent, _store(store_kind), use_state=conversation_state_enabled())
+    turns = []
+    for i, message in enumerate(script["turns"]):
+        cassette.begin_turn(i)
+        calls, llm_before = counter.calls, len(tokens_sent)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):     # the agent's debug prints
+            reply, _ = await orch.handle(
+                message, script.get("conversation_id", "bench"),
+                script.get("email", "bench@example.com"), script.get("time_zone"),
+            )
+        turns.append({
+            "turn": i,
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+            "llm_calls": len(tokens_sent) - llm_before,
+            "prompt_tokens": sum(tokens_sent[llm_before:]),
+            "http_calls": counter.calls - calls,
+            "reply": reply,
+        })
+    await client.aclose()
+    return turns
+
+
+def _totals(turns: List[Dict[str, Any]]) -> Dict[str, float]:
+    return {k: round(sum(t[k] for t in turns), 1) for k in COMPARED}
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# record / replay
+# ────────────────────────────────────────────────────────────────────────────
+async def record(args: argparse.Namespace) -> None:
+    script = jsonio.loads(Path(args.script).read_bytes())
+    cassette = Cassette(meta={"script": script, "recorded_at": time.time()})
+    router = ModelRouter.from_env()
+    tokens_sent: List[int] = []
+    for tier in (router.fast, router.strong):
+        if tier is not None:
+            tier.llm = RecordingChatModel(tier.llm, cassette)
+            tier.hedger = None          # one request per call, or replay drifts
+    turns = await run_script(
+        script, router, RecordingTransport(cassette), cassette, args.store, tokens_sent
+    )
+    # the recorder does not count tokens itself: read them back from the cassette
+    for t in turns:
+        llm = [r for r in cassette.records if r["kind"] == "llm" and r["turn"] == t["turn"]]
+        t["llm_calls"], t["prompt_tokens"] = len(llm), sum(r["prompt_tokens"] for r in llm)
+    cassette.save(args.output)
+    print(f"recorded {len(cassette.records)} exchanges over {len(turns)} turns → {args.output}")
+    _print(turns, None)
+
+
+async def replay(args: argparse.Namespace) -> int:
+    cassette = Cassette.load(args.cassette)
+    script = cassette.meta["script"]
+    os.environ["LLM_BACKEND"] = "fake"          # tier settings only; replies come from the cassette
+    router = ModelRouter.from_env()
+    model = ReplayChatModel(cassette, latency_scale=args.latency, model_name=router.fast.model)
+    for tier in (router.fast, router.strong):
+        if tier is not None:
+            tier.llm, tier.hedger = model, None
+    turns = await run_script(
+        script, router, ReplayTransport(cassette, args.latency), cassette,
+        args.store, model.prompt_tokens,
+    )
+    recorded = _recorded(cassette, len(turns))
+    _print(turns, recorded)
+
+    report = {"cassette": args.cassette, "latency_scale": args.latency,
+              "turns": turns, "totals": _totals(turns),
+              "recorded_totals": _totals(recorded),
+              "misses": cassette.misses, "unused": cassette.unused()}
+    if cassette.misses or any(cassette.unused().values()):
+        print(f"\ncassette drift: misses={cassette.misses} unused={cassette.unused()}")
+    if args.report:
+        Path(args.report).write_text(jsonio.dumps(report), encoding="utf-8")
+    if args.baseline:
+        return _compare(report["totals"], jsonio.loads(Path(args.baseline).read_bytes())["totals"],
+                        args.max_regression)
+    return 0
+
+
+def _recorded(cassette: Cassette, n: int) -> List[Dict[str, Any]]:
+    out = []
+    for i in range(n):
+        llm = [r for r in cassette.records if r["kind"] == "llm" and r["turn"] == i]
+        http = [r for r in cassette.records if r["kind"] == "http" and r["turn"] == i]
+        out.append({
+            "turn": i,
+            "wall_ms": round(sum(r["latency"] for r in llm + http) * 1000, 1),
+            "llm_calls": len(llm),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in llm),
+            "http_calls": len(http),
+        })
+    return out
+
+
+def _print(turns: List[Dict[str, Any]], recorded: List[Dict[str, Any]] | None) -> None:
+    print(f"\n{'turn':>4} {'wall ms':>9} {'llm':>4} {'tokens':>7} {'http':>5}"
+          + ("   | recorded: llm tokens http" if recorded else ""))
+    for i, t in enumerate(turns):
+        line = f"{t['turn']:>4} {t['wall_ms']:>9.1f} {t['llm_calls']:>4} {t['prompt_tokens']:>7} {t['http_calls']:>5}"
+        if recorded:
+            r = recorded[i]
+            line += f"   | {r['llm_calls']:>13} {r['prompt_tokens']:>6} {r['http_calls']:>4}"
+        print(line)
+    tot = _totals(turns)
+    print(f"{'all':>4} {tot['wall_ms']:>9.1f} {tot['llm_calls']:>4.0f} "
+          f"{tot['prompt_tokens']:>7.0f} {tot['http_calls']:>5.0f}")
+
+
+def _compare(now: Dict[str, float], base: Dict[str, float], max_regression: float | None) -> int:
+    print(f"\n{'vs baseline':12} {'base':>9} {'now':>9} {'Δ%':>7}")
+    failed = []
+    for k in COMPARED:
+        delta = (now[k] - base[k]) / base[k] * 100 if base[k] else 0.0
+        print(f"{k:12} {base[k]:>9.1f} {now[k]:>9.1f} {delta:>+7.1f}")
+        if max_regression is not None and delta > max_regression:
+            failed.append(k)
+    if failed:
+        print(f"regression over {max_regression}%: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    rec = sub.add_parser("record", help="run a script live and save a cassette")
+    rec.add_argument("script", help="JSON: conversation_id, email, time_zone, turns[]")
+    rec.add_argument("-o", "--output", required=True, help="cassette file (.jsonl)")
+    rec.add_argument("--store", choices=("memory", "redis"), default="memory")
+
+    rep = sub.add_parser("replay", help="replay a cassette offline and report")
+    rep.add_argument("cassette")
+    rep.add_argument("--latency", type=float, default=1.0,
+                     help="scale recorded latencies (1 = original, 0 = none)")
+    rep.add_argument("--store", choices=("memory", "redis"), default="memory")
+    rep.add_argument("--report", help="write the JSON report here")
+    rep.add_argument("--baseline", help="earlier --report to compare against")
+    rep.add_argument("--max-regression", type=float,
+                     help="exit 1 if any metric is this many percent worse than the baseline")
+
+    args = parser.parse_args()
+    if args.cmd == "record":
+        asyncio.run(record(args))
+    else:
+        sys.exit(asyncio.run(replay(args)))
+
+
+if __name__ == "__main__":
+    main()
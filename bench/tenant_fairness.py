@@ -0,0 +1,93 @@
+"""
+Upstream fairness across tenants, against the in-process Cal.com stub.
+
+One noisy tenant fires a burst of ``list_bookings`` calls while a quiet
+tenant makes a few; both share ``--capacity`` upstream slots. Compared:
+a plain FIFO over all calls vs. ``FairScheduler`` (round-robin by tenant).
+
+    python bench/tenant_fairness.py
+    python bench/tenant_fairness.py --noisy 400 --quiet 10 --capacity 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from bench import calcom_stub  # noqa: E402
+from app.tenants import FairScheduler, TenantConfig, TenantPool, TenantRegistry, TenantClient  # noqa: E402
+from app.cal_client import CalComClient  # noqa: E402
+
+
+def pct(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+async def run(args: argparse.Namespace, fair: bool) -> dict:
+    transport = httpx.ASGITransport(app=calcom_stub.app)
+    stub = {"base_url": "http://stub/v1", "base_url_v2": "http://stub/v2"}
+    registry = TenantRegistry({
+        "noisy": TenantConfig(api_key="k-noisy", rate_per_sec=1e6, burst=10**6,
+                              max_connections=args.capacity, **stub),
+        "quiet": TenantConfig(api_key="k-quiet", rate_per_sec=1e6, burst=10**6,
+                              max_connections=args.capacity, **stub),
+    })
+
+    def factory(api_key, **kw):
+        return CalComClient.pooled(api_key, transport=transport, **kw)
+
+    default = TenantClient("default", CalComClient("k-default", **stub), [])
+    pool = TenantPool(registry, default, lambda c: [], FairScheduler(args.capacity),
+                      client_factory=factory)
+    noisy, quiet = pool.get("noisy").client, pool.get("quiet").client
+    if not fair:
+        noisy.tenant = quiet.tenant = "all"      # one queue for everyone = plain FIFO
+    lat: dict[str, list[float]] = {"noisy": [], "quiet": []}
+
+    async def call(name: str, client: CalComClient) -> None:
+        started = time.perf_counter()
+        result = await client.list_bookings("someone@example.com")
+        assert result.ok, result.error
+        lat[name].append(time.perf_counter() - started)
+
+    async def quiet_user() -> None:
+        await asyncio.sleep(args.latency)           # arrive after the burst
+        for _ in range(args.quiet):
+            await call("quiet", quiet)
+
+    started = time.perf_counter()
+    await asyncio.gather(quiet_user(), *(call("noisy", noisy) for _ in range(args.noisy)))
+    total = time.perf_counter() - started
+    await pool.aclose()
+    return {
+        "quiet_p50_ms": pct(lat["quiet"], 0.5) * 1000,
+        "quiet_max_ms": max(lat["quiet"]) * 1000,
+        "noisy_p50_ms": pct(lat["noisy"], 0.5) * 1000,
+        "total_s": total,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--noisy", type=int, default=200, help="burst size of the noisy tenant")
+    parser.add_argument("--quiet", type=int, default=5, help="sequential calls of the quiet tenant")
+    parser.add_argument("--capacity", type=int, default=8, help="shared upstream slots")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub latency per call (s)")
+    args = parser.parse_args()
+    calcom_stub.app.state.latency = args.latency
+
+    for label, fair in (("fifo", False), ("fair", True)):
+        r = asyncio.run(run(args, fair))
+        print(f"{label:5} quiet p50 {r['quiet_p50_ms']:7.1f} ms  max {r['quiet_max_ms']:7.1f} ms   "
+              f"noisy p50 {r['noisy_p50_ms']:7.1f} ms   total {r['total_s']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
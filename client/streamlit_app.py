@@ -26,11 +26,13 @@ from __future__ import annotations
 import datetime as _dt
 import json
 from typing import Any, Dict, List
+from urllib.parse import urlencode
 
 import pytz  # type: ignore
 import requests
 import streamlit as st
 import random
+from websockets.sync.client import connect as ws_connect
 
 ###############################################################################
 # Session‑state helpers
@@ -49,6 +51,10 @@ url = "https://chatbot-demo-l7rr.onrender.com"
 # url = "http://127.0.0.1:8000"
 
 
+# keep-alive HTTP pool, reused across reruns
+if "http" not in st.session_state:
+    st.session_state.http = requests.Session()
+
 if "messages" not in st.session_state:
     # Each message is a {"role": "user"|"assistant", "content": str}
     st.session_state.messages: List[Dict[str, str]] = []
@@ -64,6 +70,9 @@ API_BASE_URL: str = st.sidebar.text_input(
 CONVERSATION_NAME: str = st.sidebar.text_input(
     "Conversation name", value=cid, help="A name for this chat session"
 )
+TRANSPORT: str = st.sidebar.radio(
+    "Transport", ["WebSocket (streaming)", "HTTP"], help="WebSocket keeps one connection per chat"
+)
 # API_KEY: str = st.sidebar.text_input("Bearer token (optional)", type="password")
 
 st.sidebar.markdown("---")
@@ -77,6 +86,48 @@ DEFAULT_TZ: str = st.sidebar.text_input("Time zone", value="America/Los_Angeles
 st.sidebar.markdown("---")
 st.sidebar.caption("🧪 Built with Streamlit 1.32 + Python 3.11")
 
+###############################################################################
+# WebSocket transport
+###############################################################################
+
+def _ws():
+    """One socket per (server, conversation, e-mail), kept in session state."""
+    key = (API_BASE_URL, CONVERSATION_NAME, USER_EMAIL)
+    if st.session_state.get("ws_key") != key:
+        old = st.session_state.pop("ws", None)
+        if old is not None:
+            old.close()
+        ws_url = API_BASE_URL.replace("http", "ws", 1).rstrip("/")
+        # the server picks the Cal.com tenant from the e-mail at connect time
+        query = urlencode({"conversation_id": CONVERSATION_NAME, "email": USER_EMAIL})
+        conn = ws_connect(f"{ws_url}/ws/chat?{query}")
+        json.loads(conn.recv())                     # {"type": "ready", ...}
+        st.session_state.ws, st.session_state.ws_key = conn, key
+    return st.session_state.ws
+
+
+def _ws_turn(payload: Dict[str, Any], final: Dict[str, str]):
+    """Send one turn and yield streamed text; the finished reply goes into *final*."""
+    try:
+        conn = _ws()
+        conn.send(json.dumps(payload))
+    except Exception:  # noqa: BLE001 – stale socket (server restart): reconnect once
+        st.session_state.pop("ws_key", None)
+        conn = _ws()
+        conn.send(json.dumps(payload))
+    while True:
+        event = json.loads(conn.recv())
+        if event["type"] == "token":
+            yield event["text"]
+        elif event["type"] == "tool_call":
+            yield f"\n\n_⚙️ {event['name']}…_\n\n"
+        elif event["type"] == "reply":
+            final["reply"] = event["reply"]
+            return
+        elif event["type"] == "error":
+            final["reply"] = f"⚠️ {event.get('detail')}"
+            return
+
 ###############################################################################
 # Page setup
 ###############################################################################
@@ -106,6 +157,7 @@ if user_prompt:
     payload = {
         "message": user_prompt,
         "email": USER_EMAIL,
+        "time_zone": DEFAULT_TZ,
     }
 
     headers = {
@@ -115,15 +167,21 @@ if user_prompt:
 
     # 3) Call backend
     try:
-        r = requests.post(
-            f"{API_BASE_URL}/chat",
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-        r.raise_for_status()
-        data = r.json()
-        assistant_reply = data.get("reply", "(no 'reply' field in response)")
+        if TRANSPORT.startswith("WebSocket"):
+            final: Dict[str, str] = {}
+            with st.chat_message("assistant"):
+                st.write_stream(_ws_turn(payload, final))
+            assistant_reply = final.get("reply", "(connection closed)")
+        else:
+            r = st.session_state.http.post(
+                f"{API_BASE_URL}/chat",
+                json=payload,
+                headers=headers,
+                timeout=30
+            )
+            r.raise_for_status()
+            data = r.json()
+            assistant_reply = data.get("reply", "(no 'reply' field in response)")
     except Exception as exc:  # noqa: BLE001
         assistant_reply = f"⚠️ Error talking to backend: {exc}"
 
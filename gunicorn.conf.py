@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+# Multi-process serving profile:  gunicorn -c gunicorn.conf.py app.main:app
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app (FastAPI, LangChain, tiktoken, tool schemas) once in the
+# master and share the pages copy-on-write. Connection pools are NOT created
+# at import time – each worker opens its own in `lifespan`, after the fork.
+preload_app = True
+
+# On SIGTERM a worker marks itself closing at once (/ready → 503, no new tool
+# calls), stops accepting requests and finishes open ones, then `lifespan`
+# drains in-flight tool calls (SHUTDOWN_DRAIN_SECONDS) and closes its pools;
+# keep gunicorn's hard-kill deadline above that.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "90"))
+keepalive = 5
+
+# recycle workers now and then to bound slow leaks
+max_requests = int(os.getenv("MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
@@ -0,0 +1,128 @@
+from typing import Callable, List
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.cal_client import BookingPayload, CalComClient
+from app.tools import BulkRescheduleBookingsTool
+from bench import calcom_stub
+
+STUB = {"base_url": "http://stub/v1", "base_url_v2": "http://stub/v2"}
+EMAIL = "bob@example.com"
+
+
+class FaultyTransport(httpx.AsyncBaseTransport):
+    """The stub, except requests matching ``fail`` get a 500."""
+
+    def __init__(self, fail: Callable[[httpx.Request], bool] = lambda r: False) -> None:
+        self.inner = httpx.ASGITransport(app=calcom_stub.app)
+        self.fail = fail
+        self.log: List[str] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.log.append(f"{request.method} {request.url.path}")
+        if self.fail(request):
+            return httpx.Response(500, json={"message": "injected failure"}, request=request)
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture(autouse=True)
+def stub():
+    calcom_stub.app.state.latency = 0
+    calcom_stub.BOOKINGS.clear()
+    yield calcom_stub.app
+
+
+@pytest.fixture
+def transport():
+    return FaultyTransport()
+
+
+@pytest_asyncio.fixture
+async def client(transport):
+    c = CalComClient.pooled("k-test", transport=transport, **STUB)
+    yield c
+    await c.aclose()
+
+
+def at(hhmm: str) -> str:
+    return f"2030-01-07T{hhmm}:00Z"
+
+
+async def book(client: CalComClient, start: str, end: str) -> str:
+    result = await client.create_booking(BookingPayload(
+        start=at(start), end=at(end), responses={"name": "Bob", "email": EMAIL},
+    ))
+    assert result.ok, result.error
+    return result.data["uid"]
+
+
+def live() -> List[tuple]:
+    """(start, end) of the accepted bookings, HH:MM."""
+    return sorted(
+        (b["start"][11:16], b["end"][11:16])
+        for b in calcom_stub.BOOKINGS["k-test"].values() if b["status"] == "accepted"
+    )
+
+
+def tool(client: CalComClient) -> BulkRescheduleBookingsTool:
+    return BulkRescheduleBookingsTool(client=client)
+
+
+@pytest.mark.asyncio
+async def test_shift_back_to_back_runs_in_dependency_order(client, transport):
+    uids = [await book(client, s, e) for s, e in (("10:00", "10:30"), ("10:30", "11:00"), ("11:00", "11:30"))]
+    result = await tool(client)._arun(attendeeEmail=EMAIL, shift_minutes=30)
+
+    assert result["ok"] and result["succeeded"] == 3
+    assert [r["outcome"] for r in result["results"]] == ["moved"] * 3
+    assert live() == [("10:30", "11:00"), ("11:00", "11:30"), ("11:30", "12:00")]
+    assert [r["from"]["uid"] for r in result["results"]] == uids
+    # each booking moved in only after the next one had left: every
+    # create-first succeeded, none needed the in-place fallback
+    creates = [line for line in transport.log if line == "POST /v1/bookings"]
+    assert len(creates) == 3 + 3      # setup + one per move
+
+
+@pytest.mark.asyncio
+async def test_swap_keeps_both_bookings(client):
+    a = await book(client, "10:00", "10:30")
+    b = await book(client, "11:00", "11:30")
+    result = await tool(client)._arun(attendeeEmail=EMAIL, moves=[
+        {"booking_uid": a, "new_start": at("11:00"), "new_end": at("11:30")},
+        {"booking_uid": b, "new_start": at("10:00"), "new_end": at("10:30")},
+    ])
+
+    assert not result["ok"]
+    assert [r["outcome"] for r in result["results"]] == ["kept", "kept"]
+    assert live() == [("10:00", "10:30"), ("11:00", "11:30")]
+
+
+@pytest.mark.asyncio
+async def test_in_place_move_restores_old_time_when_create_fails(client, transport):
+    await book(client, "10:00", "10:30")
+    # the new time cannot be booked even once the old one is free
+    transport.fail = (
+        lambda r: r.method == "POST" and r.url.path == "/v1/bookings" and at("10:15").encode() in r.content
+    )
+    result = await tool(client)._arun(attendeeEmail=EMAIL, shift_minutes=15)
+
+    [item] = result["results"]
+    assert item["outcome"] == "restored"
+    assert not item["ok"]
+    assert live() == [("10:00", "10:30")]
+
+
+@pytest.mark.asyncio
+async def test_failed_cancel_reports_duplicate(client, transport):
+    uid = await book(client, "10:00", "10:30")
+    transport.fail = lambda r: r.url.path.endswith("/cancel")
+    result = await tool(client)._arun(attendeeEmail=EMAIL, moves=[
+        {"booking_uid": uid, "new_start": at("14:00"), "new_end": at("14:30")},
+    ])
+
+    [item] = result["results"]
+    assert item["outcome"] == "duplicated"
+    assert item["uid"] == uid
+    assert live() == [("10:00", "10:30"), ("14:00", "14:30")]
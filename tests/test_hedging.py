@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import ToolMessage
+
+from app.fake_llm import ScriptedChatModel
+from app.hedging import HedgedInvoker
+from app.model_router import ModelRouter, ModelTier
+
+
+def latencies(*seconds: float):
+    """Per-call latency: call 0 is the primary, call 1 the hedge, …"""
+    return lambda i: seconds[i] if i < len(seconds) else seconds[-1]
+
+
+def fail(message: str):
+    def reply(messages):
+        raise RuntimeError(message)
+    return reply
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# HedgedInvoker
+# ────────────────────────────────────────────────────────────────────────────
+@pytest.mark.asyncio
+async def test_hedge_fires_after_delay_and_loser_is_cancelled():
+    llm = ScriptedChatModel(responses=["first", "second"], latency=latencies(0.5, 0.01))
+    hedger = HedgedInvoker(initial_delay=0.05, budget=1.0)
+
+    started = time.monotonic()
+    reply = await hedger.ainvoke(llm, "hi")
+    elapsed = time.monotonic() - started
+
+    assert reply.content == "first"          # the hedge's answer
+    assert 0.05 <= elapsed < 0.5
+    assert llm.calls == 2
+    assert hedger.stats()["hedges"] == 1 and hedger.stats()["hedge_wins"] == 1
+    # the slow primary was cancelled: it never took the second reply
+    await asyncio.sleep(0.6)
+    assert next(llm._script) == "second"
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_primary_is_fast():
+    llm = ScriptedChatModel(responses=["only"], latency=0.0)
+    hedger = HedgedInvoker(initial_delay=0.05, budget=1.0)
+    assert (await hedger.ainvoke(llm, "hi")).content == "only"
+    assert llm.calls == 1 and hedger.hedges == 0
+
+
+@pytest.mark.asyncio
+async def test_hedges_stay_within_budget():
+    llm = ScriptedChatModel(responses=["ok"], cycle=True, latency=0.03)
+    hedger = HedgedInvoker(initial_delay=0.01, budget=0.5, min_samples=100)
+    for n in range(1, 9):
+        await hedger.ainvoke(llm, "hi")
+        assert hedger.hedges <= max(1.0, hedger.budget * n)
+    assert hedger.hedges == 4
+    assert llm.calls == 8 + 4
+
+
+@pytest.mark.asyncio
+async def test_both_attempts_fail_reraises_primary_error():
+    # the hedge finishes first and takes the first scripted reply
+    llm = ScriptedChatModel(
+        responses=[fail("hedge"), fail("primary")], latency=latencies(0.1, 0.01)
+    )
+    hedger = HedgedInvoker(initial_delay=0.02, budget=1.0)
+    with pytest.raises(RuntimeError, match="primary"):
+        await hedger.ainvoke(llm, "hi")
+    assert llm.calls == 2
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# ModelRouter
+# ────────────────────────────────────────────────────────────────────────────
+def test_router_switches_to_strong_tier_after_tool_error():
+    router = ModelRouter(
+        ModelTier("fast", ScriptedChatModel(), "gpt-3.5-turbo"),
+        ModelTier("strong", ScriptedChatModel(), "gpt-4o"),
+    )
+    ok = ToolMessage(tool_call_id="1", content='{"ok": true}', artifact={"ok": True})
+    failed = ToolMessage(tool_call_id="2", content="[error] Cal.com returned 500")
+
+    assert router.pick().name == "fast"
+    assert router.pick([ok]).name == "fast"
+    assert router.pick([ok, failed]).name == "strong"
+    assert router.picks == {"fast": 2, "strong": 1}
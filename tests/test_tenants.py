@@ -0,0 +1,249 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from app.cal_client import BookingPayload, CalComClient
+from app.di import resolve_tenant, tenant_client
+from app.tenants import (
+    DEFAULT_TENANT,
+    FairScheduler,
+    TenantClient,
+    TenantConfig,
+    TenantPool,
+    TenantRegistry,
+    UnknownTenant,
+)
+from bench import calcom_stub
+
+STUB = {"base_url": "http://stub/v1", "base_url_v2": "http://stub/v2"}
+
+
+@pytest.fixture(autouse=True)
+def stub():
+    calcom_stub.app.state.latency = 0
+    calcom_stub.app.state.calls.clear()
+    calcom_stub.BOOKINGS.clear()
+    yield calcom_stub.app
+
+
+def registry() -> TenantRegistry:
+    return TenantRegistry({
+        "acme": TenantConfig(api_key="k-acme", secret="s-acme", domains=["Acme.com"], **STUB),
+        "globex": TenantConfig(api_key="k-globex", domains=["globex.com"], **STUB),
+    })
+
+
+def pool(max_clients: int = 64, close_grace: float = 60.0) -> TenantPool:
+    transport = httpx.ASGITransport(app=calcom_stub.app)
+
+    def factory(api_key, **kw):
+        return CalComClient.pooled(api_key, transport=transport, **kw)
+
+    default = TenantClient(DEFAULT_TENANT, factory("k-default", **STUB), [])
+    return TenantPool(
+        registry(), default, lambda client: [], FairScheduler(4),
+        max_clients=max_clients, close_grace=close_grace, client_factory=factory,
+    )
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# TenantRegistry.resolve
+# ────────────────────────────────────────────────────────────────────────────
+def test_resolve_by_email_domain():
+    reg = registry()
+    assert reg.resolve(None, "bob@ACME.com") == "acme"
+    assert reg.resolve(None, "bob@example.com") == DEFAULT_TENANT
+    assert reg.resolve() == DEFAULT_TENANT
+
+
+def test_explicit_tenant_needs_its_secret():
+    reg = registry()
+    assert reg.resolve("acme", "bob@example.com", secret="s-acme") == "acme"
+    # unauthenticated or wrong secret: the e-mail domain decides
+    assert reg.resolve("acme", "bob@example.com") == DEFAULT_TENANT
+    assert reg.resolve("acme", "bob@globex.com", secret="nope") == "globex"
+    # another tenant's secret does not unlock it, nor does a tenant without one
+    assert reg.resolve("globex", "bob@acme.com", secret="s-acme") == "acme"
+
+
+def test_trusted_explicit_tenant():
+    reg = registry()
+    assert reg.resolve("globex", "bob@acme.com", trusted=True) == "globex"
+    with pytest.raises(UnknownTenant):
+        reg.resolve("initech", trusted=True)
+    # unknown and unauthenticated: ignored
+    assert reg.resolve("initech", "bob@acme.com") == "acme"
+
+
+def test_secret_from_env(monkeypatch):
+    monkeypatch.setenv("ACME_TENANT_SECRET", "from-env")
+    cfg = TenantConfig(api_key="k", secret_env="ACME_TENANT_SECRET")
+    assert TenantRegistry({"acme": cfg}).resolve("acme", secret="from-env") == "acme"
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# FairScheduler
+# ────────────────────────────────────────────────────────────────────────────
+async def _hold(scheduler: FairScheduler, tenant: str, order: list, release: asyncio.Event):
+    async with scheduler.slot(tenant):
+        order.append(tenant)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_round_robin():
+    scheduler = FairScheduler(1)
+    order: list = []
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(_hold(scheduler, "noisy", order, gate))
+    await asyncio.sleep(0)
+    release = asyncio.Event()
+    release.set()
+    waiters = [asyncio.create_task(_hold(scheduler, "noisy", order, release)) for _ in range(3)]
+    await asyncio.sleep(0)
+    waiters.append(asyncio.create_task(_hold(scheduler, "quiet", order, release)))
+    await asyncio.sleep(0)
+    assert scheduler.stats()["waiting"] == {"noisy": 3, "quiet": 1}
+
+    gate.set()
+    await asyncio.gather(blocker, *waiters)
+    # the quiet tenant is served right after the first noisy waiter, not last
+    assert order == ["noisy", "noisy", "quiet", "noisy", "noisy"]
+    assert scheduler.active == 0
+    assert scheduler.stats()["granted"] == {"noisy": 4, "quiet": 1}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancelled_waiter_leaves_queue():
+    scheduler = FairScheduler(1)
+    order: list = []
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(_hold(scheduler, "a", order, gate))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(scheduler, "b", order, gate))
+    await asyncio.sleep(0)
+    assert scheduler.stats()["waiting"] == {"b": 1}
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.stats()["waiting"] == {}
+    gate.set()
+    await blocker
+    assert scheduler.active == 0
+    assert order == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancel_after_grant_hands_slot_on():
+    scheduler = FairScheduler(1)
+    order: list = []
+    release = asyncio.Event()
+    release.set()
+    async with scheduler.slot("a"):
+        granted = asyncio.create_task(_hold(scheduler, "b", order, release))
+        after = asyncio.create_task(_hold(scheduler, "c", order, release))
+        await asyncio.sleep(0)
+    # leaving the slot granted it to "b"; cancel "b" before it gets to run
+    granted.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await granted
+    await after
+    assert order == ["c"]
+    assert scheduler.active == 0
+    assert scheduler.stats()["granted"] == {"a": 1, "b": 1, "c": 1}
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# TenantPool against the Cal.com stub
+# ────────────────────────────────────────────────────────────────────────────
+@pytest.mark.asyncio
+async def test_pool_clients_use_their_tenant_key():
+    p = pool()
+    acme, globex = p.get("acme"), p.get("globex")
+    assert p.get("acme") is acme
+    assert p.get(DEFAULT_TENANT) is p.default
+    payload = BookingPayload(
+        start="2030-01-01T10:00:00Z", end="2030-01-01T10:30:00Z",
+        responses={"name": "Bob", "email": "bob@example.com"},
+    )
+    assert (await acme.client.create_booking(payload)).ok
+
+    acme_list = await acme.client.list_bookings("bob@example.com")
+    globex_list = await globex.client.list_bookings("bob@example.com")
+    assert len(acme_list.data["data"]) == 1
+    assert globex_list.data["data"] == []
+    assert calcom_stub.app.state.calls == {"k-acme": 2, "k-globex": 1}
+    assert p.scheduler.stats()["granted"] == {"acme": 2, "globex": 1}
+    await p.aclose()
+    await p.default.client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pool_evicts_least_recently_used():
+    p = pool(max_clients=1, close_grace=0)
+    acme = p.get("acme")
+    p.get("globex")
+    assert p.evictions == 1
+    assert p.stats()["clients"] == ["globex"]
+    await asyncio.sleep(0.01)        # grace period over: evicted client closed
+    assert acme.client._http.is_closed
+    # built again on next use
+    assert p.get("acme") is not acme
+    assert p.evictions == 2
+    await p.aclose()
+    await p.default.client.aclose()
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# tenant selection on requests (di.tenant_client)
+# ────────────────────────────────────────────────────────────────────────────
+@pytest.mark.asyncio
+async def test_request_tenant_selection(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "admin")
+    monkeypatch.delenv("CALCOM_TENANT_HEADER_TRUSTED", raising=False)
+    app = FastAPI()
+    app.state.tenants = pool()
+
+    @app.post("/who")
+    async def who(tenant: TenantClient = Depends(tenant_client)):
+        return tenant.tenant
+
+    async def ask(email: str, **headers: str) -> str:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            resp = await c.post("/who", json={"email": email}, headers=headers)
+            return resp.json() if resp.status_code == 200 else resp.status_code
+
+    assert await ask("bob@globex.com") == "globex"
+    # a bare X-Tenant-Id is ignored …
+    assert await ask("bob@globex.com", **{"X-Tenant-Id": "acme"}) == "globex"
+    # … unless it comes with the tenant's secret or the admin token
+    assert await ask("bob@globex.com", **{"X-Tenant-Id": "acme", "X-Tenant-Secret": "s-acme"}) == "acme"
+    assert await ask("bob@example.com", **{"X-Tenant-Id": "globex", "X-Admin-Token": "admin"}) == "globex"
+    assert await ask("bob@example.com", **{"X-Tenant-Id": "initech", "X-Admin-Token": "admin"}) == 403
+
+    monkeypatch.setenv("CALCOM_TENANT_HEADER_TRUSTED", "1")
+    assert await ask("bob@example.com", **{"X-Tenant-Id": "acme"}) == "acme"
+    await app.state.tenants.aclose()
+    await app.state.tenants.default.client.aclose()
+
+
+def test_websocket_tenant_fixed_at_handshake():
+    app = FastAPI()
+    app.state.tenants = pool()
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket, tenant: TenantClient = Depends(tenant_client)):
+        await websocket.accept()
+        email = await websocket.receive_text()
+        await websocket.send_json([tenant.tenant, resolve_tenant(websocket, email)])
+
+    with TestClient(app).websocket_connect("/ws?email=bob@acme.com") as conn:
+        conn.send_text("bob@globex.com")
+        assert conn.receive_json() == ["acme", "globex"]
+    with TestClient(app).websocket_connect("/ws?tenant=acme&tenant_secret=s-acme") as conn:
+        conn.send_text("bob@example.com")
+        assert conn.receive_json() == ["acme", "acme"]